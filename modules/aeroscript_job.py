@@ -0,0 +1,500 @@
+"""
+Compile a cut job into one AeroScript program that runs on a controller task.
+
+The Python cutting routines (cutcamming, cutlens_segments, cutalumina) queue every command
+over the API and drain the queue after each line. The compilers here build the same command
+sequence ahead of time into a list of Op records, render it as a single AeroScript program
+with camming tables loaded from controller files (CammingLoadTableFromFile), and write the
+program plus the table files for upload. Python only starts the task and monitors progress.
+
+The compilers run the core_utils routines themselves against a ProgramBuilder, which takes
+the same cq.commands.motion / io / advanced_motion calls as a command queue and records them
+instead of sending them, so a compiled job always follows the current routine (bundles,
+bidirectional lines, schedulers, plans). check_equivalence() runs the Python routine and
+the compiled program on the simulated controller (sim_automation1) and compares the recorded
+command sequences.
+"""
+import posixpath
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+import core_utils
+
+
+Op = namedtuple("Op", ["group", "name", "args"])
+Op.__doc__ = """
+One program statement. group is "motion", "io", "advanced_motion", "execute", "progress" or
+"comment"; name and args mirror the command queue call (e.g. motion.moveabsolute).
+"""
+
+CamTable = namedtuple("CamTable", ["filename", "leader", "follower"])
+
+CompiledJob = namedtuple("CompiledJob", ["name", "ops", "cam_tables", "lines", "progress_index"])
+CompiledJob.__doc__ = """
+ops : list[Op]
+cam_tables : dict controller filename -> CamTable (values written by write_job)
+lines : list of cam numbers in cut order
+progress_index : $iglobal index the program writes the number of finished lines to
+"""
+
+
+# ---------------------------------------------------------------------------------------
+# builder
+# ---------------------------------------------------------------------------------------
+
+def _axes(axes):
+    return [axes] if isinstance(axes, str) else list(axes)
+
+
+class _Group:
+    def __init__(self, builder, group):
+        self._builder = builder
+        self._group = group
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            self._builder._record(self._group, name, args, kwargs)
+        return record
+
+
+class _Commands:
+    def __init__(self, builder):
+        self.motion = _Group(builder, "motion")
+        self.io = _Group(builder, "io")
+        self.advanced_motion = _Group(builder, "advanced_motion")
+
+
+# positional parameter names of the queue commands the cut routines use
+_SIGNATURES = {
+    "enable": ["axes"],
+    "moveabsolute": ["axes", "positions", "speeds"],
+    "waitforinposition": ["axes"],
+    "waitformotiondone": ["axes"],
+    "movedelay": ["axes", "delay_time"],
+    "digitaloutputset": ["axis", "output_num", "value"],
+    "cammingfreetable": ["table_num"],
+    "cammingloadtablefromarray": ["table_num", "leader_values", "follower_values", "num_values",
+                                  "units_mode", "interpolation_mode", "wrap_mode", "table_offset"],
+    "cammingoff": ["follower_axis"],
+    "cammingon": ["follower_axis", "leader_axis", "table_num", "source", "output"],
+}
+
+
+class ProgramBuilder:
+    """
+    Records command-queue calls as Ops instead of sending them.
+
+    Passed as the cq of a core_utils cut routine (see compile_job). Supports
+    cq.commands.motion/io/advanced_motion.<command>(...) and cq.execute(script), so the
+    routine runs unchanged. Each cammingloadtablefromarray becomes a table file under cam_dir,
+    loaded with CammingLoadTableFromFile. pause/resume/wait_for_empty are accepted and
+    ignored: the program runs in order on the task, with no Python barriers. The routine
+    reports each finished line (line_done), which the program writes to $iglobal[progress_index].
+    """
+
+    compiling = True
+
+    def __init__(self, cam_dir="", progress_index=0):
+        self.ops = []
+        self.cam_tables = {}
+        self.lines = []
+        self.cam_dir = cam_dir
+        self.progress_index = progress_index
+        self.commands = _Commands(self)
+
+    def _record(self, group, name, args, kwargs):
+        names = _SIGNATURES.get(name)
+        if names is None:
+            raise NotImplementedError(f"{group}.{name} is not supported by the AeroScript compiler")
+        params = dict(zip(names, args))
+        params.update(kwargs)
+        params.pop("execution_task_index", None)
+        if "axes" in params:
+            params["axes"] = _axes(params["axes"])
+        if name == "cammingloadtablefromarray":
+            self._load_table(params)
+            return
+        self.ops.append(Op(group, name, params))
+
+    def _load_table(self, params):
+        leader = np.asarray(params["leader_values"], dtype=np.float64)
+        follower = np.asarray(params["follower_values"], dtype=np.float64)
+        filename = posixpath.join(self.cam_dir, f"table{len(self.cam_tables):04d}.cam")
+        self.cam_tables[filename] = CamTable(filename, leader, follower)
+        self.ops.append(Op("advanced_motion", "cammingloadtablefromfile",
+                           {"table_num": params["table_num"], "filename": filename, "num_values": int(leader.size)}))
+
+    def execute(self, script):
+        self.ops.append(Op("execute", "execute", {"script": script}))
+
+    def pause(self):
+        pass
+
+    def resume(self):
+        pass
+
+    def wait_for_empty(self):
+        pass
+
+    def line_done(self, camnum):
+        self.lines.append(f"{int(camnum):04d}")
+        self.ops.append(Op("progress", "progress", {"index": self.progress_index, "value": len(self.lines)}))
+
+    def comment(self, text):
+        self.ops.append(Op("comment", "comment", {"text": text}))
+
+
+class _Runtime:
+    class commands:
+        @staticmethod
+        def end_command_queue(cq):
+            pass
+
+
+class _CompileController:
+    # the controller argument of a cut routine; only end_command_queue is called on it
+    runtime = _Runtime()
+
+
+# ---------------------------------------------------------------------------------------
+# compilers
+# ---------------------------------------------------------------------------------------
+
+def compile_job(routine, *args, name=None, cam_dir="", progress_index=0, **kwargs):
+    """
+    Compile a core_utils cut routine into a CompiledJob by running it against a ProgramBuilder.
+
+    Parameters
+    ----------
+    routine : callable
+        core_utils.cutcamming, cutlens_segments or cutalumina.
+    *args, **kwargs :
+        The routine's arguments after controller and cq.
+    name : str, optional
+        Program name (default: the routine's name).
+    cam_dir : str
+        Controller folder the table files are uploaded to (see write_job).
+    progress_index : int
+        $iglobal index the program counts finished lines in.
+    """
+    cq = ProgramBuilder(cam_dir, progress_index)
+    routine(_CompileController(), cq, *args, **kwargs)
+    return CompiledJob(name or routine.__name__, cq.ops, cq.cam_tables, cq.lines, progress_index)
+
+
+def compile_cutcamming(path, *args, cam_dir="", progress_index=0, **kwargs):
+    """
+    Compile core_utils.cutcamming (same arguments, minus controller/cq).
+    """
+    return compile_job(core_utils.cutcamming, path, *args, name=f"cutcamming {Path(path).name}",
+                       cam_dir=cam_dir, progress_index=progress_index, **kwargs)
+
+
+def compile_cutlens_segments(path, spindle, zaxis, cuttype, *args, cam_dir="", progress_index=0, **kwargs):
+    """
+    Compile core_utils.cutlens_segments (same arguments, minus controller/cq).
+
+    The test touches are compiled in; the vision cycle needs Python between touches, so
+    vision_config must be None (run those jobs with cutlens_segments).
+    """
+    if kwargs.get("vision_config") is not None or (len(args) > 8 and args[8] is not None):
+        raise ValueError("the test touch vision cycle runs in Python; use cutlens_segments for vision jobs")
+    return compile_job(core_utils.cutlens_segments, path, spindle, zaxis, cuttype, *args,
+                       name=f"cutlens_segments {spindle} {cuttype}", cam_dir=cam_dir,
+                       progress_index=progress_index, **kwargs)
+
+
+def compile_cutalumina(path, *args, cam_dir="", progress_index=0, max_lines=None, **kwargs):
+    """
+    Compile core_utils.cutalumina (same arguments, minus controller/cq).
+
+    The wear-shifted tables cutalumina uploads become the table files. Every line of the
+    job is compiled unless max_lines is given (cutalumina's own default stops after 4).
+    """
+    return compile_job(core_utils.cutalumina, path, *args, name=f"cutalumina {Path(path).name}",
+                       cam_dir=cam_dir, progress_index=progress_index, max_lines=max_lines, **kwargs)
+
+
+# ---------------------------------------------------------------------------------------
+# AeroScript rendering and files
+# ---------------------------------------------------------------------------------------
+
+def _num(v):
+    v = float(v)
+    return str(int(v)) if v.is_integer() else repr(v)
+
+
+def _axis_list(axes):
+    return "[" + ", ".join(axes) + "]"
+
+
+def _num_list(values):
+    return "[" + ", ".join(_num(v) for v in values) + "]"
+
+
+def _enum(prefix, value):
+    value = getattr(value, "name", value)
+    return f"{prefix}.{value}"
+
+
+def render_op(op):
+    """
+    One AeroScript statement for op.
+    """
+    a = op.args
+    if op.group == "comment":
+        return f"// {a['text']}"
+    if op.group == "progress":
+        return f"$iglobal[{a['index']}] = {a['value']}"
+    if op.group == "execute":
+        return a["script"]
+    if op.name == "enable":
+        return f"Enable({_axis_list(a['axes'])})"
+    if op.name == "moveabsolute":
+        return f"MoveAbsolute({_axis_list(a['axes'])}, {_num_list(a['positions'])}, {_num_list(a['speeds'])})"
+    if op.name == "waitforinposition":
+        return f"WaitForInPosition({_axis_list(a['axes'])})"
+    if op.name == "waitformotiondone":
+        return f"WaitForMotionDone({_axis_list(a['axes'])})"
+    if op.name == "movedelay":
+        return f"MoveDelay({_axis_list(a['axes'])}, {int(a['delay_time'])})"
+    if op.name == "digitaloutputset":
+        return f"DigitalOutputSet({a['axis']}, {int(a['output_num'])}, {int(a['value'])})"
+    if op.name == "cammingfreetable":
+        return f"CammingFreeTable({int(a['table_num'])})"
+    if op.name == "cammingloadtablefromfile":
+        return (f"CammingLoadTableFromFile({int(a['table_num'])}, \"{a['filename']}\", CammingUnits.Primary, "
+                f"CammingInterpolation.Linear, CammingWrapping.NoWrap, 0.0)")
+    if op.name == "cammingon":
+        return (f"CammingOn({a['follower_axis']}, {a['leader_axis']}, {int(a['table_num'])}, "
+                f"{_enum('CammingSource', a['source'])}, {_enum('CammingOutput', a['output'])})")
+    if op.name == "cammingoff":
+        return f"CammingOff({a['follower_axis']})"
+    raise NotImplementedError(f"no AeroScript rendering for {op.group}.{op.name}")
+
+
+def render_aeroscript(job):
+    """
+    Render a CompiledJob as an AeroScript program (str).
+    """
+    body = [render_op(op) for op in job.ops]
+    header = [
+        f"// {job.name}: {len(job.lines)} lines, generated by aeroscript_job",
+        f"// $iglobal[{job.progress_index}] counts finished lines",
+        "program",
+        f"    $iglobal[{job.progress_index}] = 0",
+    ]
+    return "\n".join(header + ["    " + line for line in body] + ["end", ""])
+
+
+def write_cam_table(table, path):
+    """
+    Write a CamTable in the .Cam layout (three header lines, then index leader follower).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    n = table.leader.size
+    rows = np.column_stack([np.arange(1, n + 1), table.leader, table.follower])
+    with open(path, "w") as f:
+        f.write(f"Number of Points {n}\nMaster Units (PRIMARY)\nSlave Units (PRIMARY)\n")
+        np.savetxt(f, rows, fmt=["%04d", "%.10f", "%.10f"])
+    return path
+
+
+def write_job(job, out_dir, program_name="cutjob.ascript"):
+    """
+    Write the program and every table file under out_dir, laid out as they go on the controller.
+
+    Returns the program path. Upload out_dir's contents to the controller file system so the
+    table filenames in the program resolve (see run_compiled_job).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for filename, table in job.cam_tables.items():
+        write_cam_table(table, out_dir / filename)
+    program_path = out_dir / program_name
+    program_path.write_text(render_aeroscript(job))
+    return program_path
+
+
+def run_compiled_job(controller, out_dir, program_name="cutjob.ascript", task=1):
+    """
+    Upload a job written by write_job and start it on task.
+
+    Uses controller.files.upload and controller.runtime.tasks[task].program.run from the
+    Automation1 Python API. Python is free afterwards; use monitor_job to follow progress.
+    """
+    out_dir = Path(out_dir)
+    for local in sorted(out_dir.rglob("*")):
+        if local.is_file():
+            controller.files.upload(str(local), local.relative_to(out_dir).as_posix())
+    controller.runtime.tasks[task].program.run(program_name)
+
+
+def monitor_job(poller, zaxis, nlines, timeout=None, on_line=None):
+    """
+    Follow a running compiled job from its camming bit: each off->on edge of zaxis is a
+    line starting, the last on->off edge the last line finishing.
+
+    Parameters
+    ----------
+    poller : StatusPoller
+        Running poller sampling zaxis.
+    nlines : int
+        Lines in the job (len(job.lines)).
+    on_line : callable, optional
+        Called with the 1-based line number as each line starts.
+
+    Returns the number of lines seen.
+    """
+    seen = 0
+    engaged = poller.camming(zaxis)
+    while seen < nlines or engaged:
+        sample = poller.wait_until(lambda s: bool(s.axis_status[zaxis] & core_utils.CAMMING_MASK) != engaged,
+                                   timeout=timeout)
+        engaged = bool(sample.axis_status[zaxis] & core_utils.CAMMING_MASK)
+        if engaged:
+            seen += 1
+            print(f"{zaxis}: cutting line {seen}/{nlines}")
+            if on_line is not None:
+                on_line(seen)
+    return seen
+
+
+# ---------------------------------------------------------------------------------------
+# equivalence check
+# ---------------------------------------------------------------------------------------
+
+def replay_on_queue(job, cq, api):
+    """
+    Send a CompiledJob's ops to a command queue (normally a sim_automation1 queue). File table
+    loads are sent as cammingloadtablefromarray with the values the file holds.
+    """
+    for op in job.ops:
+        if op.group in ("comment", "progress"):
+            continue
+        if op.group == "execute":
+            cq.execute(op.args["script"])
+            continue
+
+        group = getattr(cq.commands, op.group)
+        a = dict(op.args)
+        if op.name == "cammingloadtablefromfile":
+            table = job.cam_tables[a["filename"]]
+            group.cammingloadtablefromarray(
+                table_num=a["table_num"],
+                leader_values=table.leader.tolist(),
+                follower_values=table.follower.tolist(),
+                num_values=int(table.leader.size),
+                units_mode=api.CammingUnits.Primary,
+                interpolation_mode=api.CammingInterpolation.Linear,
+                wrap_mode=api.CammingWrapping.NoWrap,
+                table_offset=0.0)
+        elif op.name == "cammingon":
+            a["source"] = getattr(api.CammingSource, getattr(a["source"], "name", a["source"]))
+            a["output"] = getattr(api.CammingOutput, getattr(a["output"], "name", a["output"]))
+            group.cammingon(**a)
+        else:
+            getattr(group, op.name)(**a)
+
+
+def _normalize(args):
+    out = {}
+    for k, v in args.items():
+        if isinstance(v, (list, tuple)):
+            v = [float(x) if isinstance(x, (int, float)) and not isinstance(x, bool) else x for x in v]
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            v = float(v)
+        out[k] = getattr(v, "name", v)
+    return out
+
+
+def compare_command_logs(expected, actual, ignore=("end_command_queue",), tol=1e-9):
+    """
+    Compare two sim command logs by command name and arguments (not timing).
+
+    Returns a list of human-readable mismatches (empty if equivalent).
+    """
+    a = [c for c in expected if c.name not in ignore]
+    b = [c for c in actual if c.name not in ignore]
+    mismatches = []
+    for k, (ca, cb) in enumerate(zip(a, b)):
+        na, nb = _normalize(ca.args), _normalize(cb.args)
+        same = ca.name == cb.name and na.keys() == nb.keys()
+        if same:
+            for key in na:
+                va, vb = na[key], nb[key]
+                if isinstance(va, list) and isinstance(vb, list):
+                    same = len(va) == len(vb) and all(
+                        abs(x - y) <= tol if isinstance(x, float) and isinstance(y, float) else x == y
+                        for x, y in zip(va, vb))
+                elif isinstance(va, float) and isinstance(vb, float):
+                    same = abs(va - vb) <= tol
+                else:
+                    same = va == vb
+                if not same:
+                    break
+        if not same:
+            mismatches.append(f"#{k}: expected {ca.name}{ca.args}, got {cb.name}{cb.args}")
+    if len(a) != len(b):
+        mismatches.append(f"length: expected {len(a)} commands, got {len(b)}")
+    return mismatches
+
+
+def check_equivalence(job, run_python, sim=None, **controller_kwargs):
+    """
+    Run the Python routine and the compiled job on fresh simulated controllers and compare.
+
+    Parameters
+    ----------
+    job : CompiledJob
+    run_python : callable
+        run_python(controller, cq) runs the routine the job was compiled from, e.g.
+        lambda c, cq: core_utils.cutlens_segments(c, cq, path, "SpindleC", "ZC", ...).
+    sim : module, optional
+        Simulator module (default sim_automation1; it must already be installed as
+        automation1 before core_utils was imported).
+
+    Returns
+    -------
+    dict
+        equivalent (bool), mismatches (list[str]), python_s and compiled_s (virtual machine
+        time of each run) and the two controllers.
+    """
+    if sim is None:
+        import sim_automation1 as sim
+
+    def fresh():
+        c = sim.Controller.connect(**controller_kwargs)
+        c.start()
+        return c, c.runtime.commands.begin_command_queue(task=1, command_capacity=64, should_block_if_full=True)
+
+    c_py, cq_py = fresh()
+    with sim.virtual_sleep():
+        run_python(c_py, cq_py)
+    cq_py.wait_for_empty()
+
+    c_job, cq_job = fresh()
+    replay_on_queue(job, cq_job, sim)
+    cq_job.wait_for_empty()
+
+    mismatches = compare_command_logs(c_py.command_log, c_job.command_log)
+    result = {
+        "equivalent": not mismatches,
+        "mismatches": mismatches,
+        "python_s": c_py.now,
+        "compiled_s": c_job.now,
+        "python_controller": c_py,
+        "compiled_controller": c_job,
+    }
+    status = "equivalent" if not mismatches else f"{len(mismatches)} mismatches"
+    print(f"{job.name}: {status}; {len(c_job.command_log)} commands, "
+          f"machine time python {c_py.now:.1f} s, compiled {c_job.now:.1f} s")
+    for m in mismatches[:10]:
+        print("  " + m)
+    return result
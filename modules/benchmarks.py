@@ -0,0 +1,376 @@
+import time
+import tempfile
+from pathlib import Path
+
+import core_utils
+
+
+def _time_call(fn, *args, repeat=1, **kwargs):
+    """
+    Return the best wall time (s) of repeat calls to fn.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def write_synthetic_master(path, nrows):
+    """
+    Write a Master.txt with nrows rows of camnum X ystart zstart yend.
+    """
+    path = Path(path)
+    with open(path, "w") as f:
+        for i in range(nrows):
+            f.write(f"{i:04d} {100.0 + 0.05 * i:.4f} 250.0000 -60.1250 450.0000\n")
+    return path
+
+
+def benchmark_master_lookup(sizes=(100, 1_000, 10_000), sample_lookups=20, workdir=None):
+    """
+    Compare per-line read_startend_coords against a MasterIndex built once.
+
+    Parameters
+    ----------
+    sizes : tuple[int]
+        Master.txt row counts to benchmark.
+    sample_lookups : int
+        Number of lookups timed on the per-line path; the full job cost is
+        extrapolated from these since the old path is O(N) per line.
+    workdir : str or Path, optional
+        Where to write the synthetic Master.txt files. Defaults to a temp directory.
+
+    Returns
+    -------
+    list[dict]
+        One entry per size with per-lookup times and projected per-job totals (s).
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(workdir) if workdir is not None else Path(tmp)
+
+        for n in sizes:
+            master_path = write_synthetic_master(workdir / f"Master_{n}.txt", n)
+            camnums = [f"{i:04d}" for i in range(0, n, max(1, n // sample_lookups))][:sample_lookups]
+
+            t0 = time.perf_counter()
+            for camnum in camnums:
+                core_utils.read_startend_coords(master_path=master_path, camnum=camnum)
+            per_line_old = (time.perf_counter() - t0) / len(camnums)
+
+            build = _time_call(core_utils.MasterIndex, master_path, repeat=3)
+            index = core_utils.MasterIndex(master_path)
+
+            t0 = time.perf_counter()
+            for i in range(n):
+                index.coords(i)
+            per_line_index = (time.perf_counter() - t0) / n
+
+            results.append({
+                "rows": n,
+                "per_line_read_startend_coords_s": per_line_old,
+                "index_build_s": build,
+                "per_line_index_s": per_line_index,
+                "job_total_old_s": per_line_old * n,
+                "job_total_index_s": build + per_line_index * n,
+            })
+
+    for r in results:
+        print(f"{r['rows']:>6} rows | old {r['job_total_old_s']:10.3f} s/job "
+              f"({r['per_line_read_startend_coords_s'] * 1e3:.2f} ms/line) | "
+              f"index {r['job_total_index_s']:8.4f} s/job (build {r['index_build_s'] * 1e3:.1f} ms)")
+
+    return results
+
+
+def write_synthetic_cam(path, npoints, z0=0.0):
+    """
+    Write a .Cam file with the usual three header lines and npoints index/leader/follower rows.
+    Leader runs from 250 in 0.01 steps, follower from z0 in -0.0001 steps.
+    """
+    path = Path(path)
+    with open(path, "w") as f:
+        f.write(f"Number of Points {npoints}\nMaster Units (PRIMARY)\nSlave Units (PRIMARY)\n")
+        for i in range(npoints):
+            f.write(f"{i + 1:04d} {250.0 + 0.01 * i:.6f} {z0 - 0.0001 * i:.6f}\n")
+    return path
+
+
+def benchmark_cam_loader(sizes=(1_000, 10_000, 100_000), repeat=3, workdir=None):
+    """
+    Compare the line-by-line .Cam parser with the vectorized parser and the sidecar cache.
+
+    Returns
+    -------
+    list[dict]
+        One entry per size with best-of-repeat times (s) for the line parser,
+        the vectorized parser (no cache), a cold cached load (parse + sidecar write)
+        and a warm cached load.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(workdir) if workdir is not None else Path(tmp)
+
+        for n in sizes:
+            campath = write_synthetic_cam(workdir / f"CutCamBench{n:07d}.Cam", n)
+            npy_path, key_path = core_utils._cam_cache_paths(campath)
+
+            def line_parse():
+                with open(campath, "r") as f:
+                    core_utils._parse_cam_lines(f)
+
+            def cold():
+                npy_path.unlink(missing_ok=True)
+                key_path.unlink(missing_ok=True)
+                core_utils.load_cutcam_arrays(campath)
+
+            line = _time_call(line_parse, repeat=repeat)
+            vectorized = _time_call(core_utils.load_cutcam_arrays, campath, use_cache=False, repeat=repeat)
+            cold_cache = _time_call(cold, repeat=repeat)
+            warm_cache = _time_call(core_utils.load_cutcam_arrays, campath, repeat=repeat)
+
+            results.append({
+                "points": n,
+                "line_parse_s": line,
+                "vectorized_s": vectorized,
+                "cold_cache_s": cold_cache,
+                "warm_cache_s": warm_cache,
+            })
+
+    for r in results:
+        print(f"{r['points']:>7} pts | line {r['line_parse_s'] * 1e3:8.2f} ms | "
+              f"vectorized {r['vectorized_s'] * 1e3:7.2f} ms | "
+              f"cold cache {r['cold_cache_s'] * 1e3:7.2f} ms | warm cache {r['warm_cache_s'] * 1e3:6.3f} ms")
+
+    return results
+
+
+def benchmark_preflight(njobs=4, cams_per_job=50, npoints=20_001, workers=(1, None), workdir=None):
+    """
+    Time preflight over synthetic rotation folders, serial (workers=1) vs on a process pool.
+
+    Sidecar caches are removed before each run so every run parses all cams. Call from
+    under `if __name__ == "__main__":` on Windows (the pool re-imports the main module).
+
+    Returns
+    -------
+    list[dict]
+        max_workers, seconds and problem count per run.
+    """
+    import preflight
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(workdir) if workdir is not None else Path(tmp)
+        for j in range(njobs):
+            job = root / f"rot{j}" / "CutCamming"
+            job.mkdir(parents=True, exist_ok=True)
+            write_synthetic_master(job / "Master.txt", cams_per_job)
+            for i in range(cams_per_job):
+                write_synthetic_cam(job / f"CutCam{i:04d}.Cam", npoints, z0=-60.125)
+
+        for max_workers in workers:
+            for npy in root.rglob("*.npy*"):
+                npy.unlink()
+            report = preflight.preflight(root, safelift=5.0, max_workers=max_workers)
+            results.append({"max_workers": max_workers, "seconds": report.seconds,
+                            "problems": len(report.problems)})
+
+    for r in results:
+        print(f"workers {str(r['max_workers']):>4} | {r['seconds']:7.2f} s | {r['problems']} problems")
+
+    return results
+
+
+def benchmark_gauge_read(reads=3, reply_delay=0.02, old_timeout=3.0):
+    """
+    Per-point gauge read time: old ser.read(2048) with a timeout vs Gauge.read, against a FakeGauge.
+
+    Returns
+    -------
+    dict
+        Mean seconds per read for each path.
+    """
+    import serial
+    from gauge import Gauge, FakeGauge
+
+    with FakeGauge(values=lambda: 1.0, reply_delay=reply_delay) as fake:
+        ser = serial.Serial(fake.port, 9600, timeout=old_timeout)
+        t0 = time.perf_counter()
+        for _ in range(reads):
+            ser.write(b"RMD0\r\n")
+            ser.read(2048)
+        old = (time.perf_counter() - t0) / reads
+        ser.close()
+
+        with Gauge(fake.port) as gauge:
+            t0 = time.perf_counter()
+            for _ in range(reads):
+                gauge.read()
+            new = (time.perf_counter() - t0) / reads
+
+    print(f"ser.read(2048) {old:.3f} s/point | Gauge.read {new:.3f} s/point")
+
+    return {"read_2048_s": old, "gauge_read_s": new}
+
+
+def benchmark_camera_capture(captures=12, open_s=1.0, capture_s=0.05, close_s=0.2, workdir=None):
+    """
+    Per-capture latency: a session opened and closed per capture (as capture_test_touch_image
+    did) vs one CameraSession kept open, against a FakeDinoLiteSession.
+
+    Returns
+    -------
+    dict
+        Mean seconds per capture for each path.
+    """
+    from functools import partial
+    from test_touch_vision import CameraSession, FakeDinoLiteSession
+
+    fake_kwargs = {"open_s": open_s, "capture_s": capture_s, "close_s": close_s}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(workdir) if workdir is not None else Path(tmp)
+
+        t0 = time.perf_counter()
+        for i in range(captures):
+            with FakeDinoLiteSession(**fake_kwargs) as s:
+                s.capture_image(root / f"per_capture_{i:03d}.png")
+        old = (time.perf_counter() - t0) / captures
+
+        t0 = time.perf_counter()
+        with CameraSession(session_factory=partial(FakeDinoLiteSession, **fake_kwargs)) as camera:
+            for i in range(captures):
+                camera.capture_image(root / f"shared_{i:03d}.png")
+        new = (time.perf_counter() - t0) / captures
+
+    print(f"session per capture {old:.3f} s/capture | shared CameraSession {new:.3f} s/capture "
+          f"({captures} captures)")
+
+    return {"per_capture_s": old, "shared_session_s": new}
+
+
+def benchmark_vision_runtime(unet_model_path, delta_model_path, device="cpu", shape=(1080, 1920, 3),
+                             batch_sizes=(1, 4), repeat=3, num_threads=None):
+    """
+    Per-image stage latencies of a warm VisionRuntime at each batch size, on blank frames.
+
+    Needs the real model weights (and torch). The first load_vision_models inference is
+    timed too, as the cold-start cost the warm-up passes take off the first touch.
+
+    Returns
+    -------
+    dict
+        cold_first_s and, per batch size, mean ms per image for each stage.
+    """
+    import numpy as np
+    import test_touch_vision as tv
+
+    blank = np.zeros(shape, dtype=np.uint8)
+
+    models = tv.load_vision_models(unet_model_path, delta_model_path, device)
+    t0 = time.perf_counter()
+    tv.predict_unet_mask_from_array(blank, models["unet_model"], device, 0.22)
+    cold = time.perf_counter() - t0
+    print(f"cold first UNet pass {cold:.3f} s")
+
+    runtime = tv.VisionRuntime(unet_model_path, delta_model_path, device, num_threads=num_threads,
+                               warmup_shape=shape)
+    results = {"cold_first_s": cold}
+    for n in batch_sizes:
+        runtime.reset_timings()
+        for _ in range(repeat):
+            runtime.analyze_batch([blank] * n, [1.0] * n, [f"bench{i}" for i in range(n)])
+        per_image = {stage: ms / n if stage != "regression" else ms
+                     for stage, ms in runtime.timing_summary().items() if ms is not None}
+        results[n] = per_image
+        print(f"batch {n:>3} | " + " | ".join(f"{stage} {ms:8.2f} ms" for stage, ms in per_image.items())
+              + " (per image)")
+
+    return results
+
+
+def benchmark_bidirectional(path, spindle="SpindleC", zaxis="ZC", cuttype="", safelift=5.0, feedspeed=10.0,
+                            floodport=6, testtouchpath=None, lines_per_test=None, cam_tables=(1,)):
+    """
+    cutlens_segments forward vs bidirectional on the simulator, against the cycle_time estimate.
+
+    Call sim_automation1.install() before core_utils is first imported. Without
+    lines_per_test no test touches are made. The lockfile a simulated run leaves is removed
+    again (unless it was already there).
+
+    Returns
+    -------
+    dict
+        Simulated and estimated job seconds per mode.
+    """
+    import core_utils
+    import cycle_time
+
+    cutpath = Path(path) / spindle / f"CutCamming{cuttype}"
+    lockfile = cutpath / "lockfile.lock"
+    lines_per_test = lines_per_test or 10 ** 9
+
+    results = {}
+    for bidirectional in (False, True):
+        had_lock = lockfile.exists()
+        run = run_sim_job(lambda c, cq: core_utils.cutlens_segments(
+            c, cq, path, spindle, zaxis, cuttype, safelift, feedspeed, testtouchpath, lines_per_test, floodport,
+            cam_tables=cam_tables, bidirectional=bidirectional))
+        if not had_lock and lockfile.exists():
+            lockfile.unlink()
+        est = cycle_time.estimate_cut_job(
+            cutpath, cycle_time.LENS_PROFILE, feedspeed=feedspeed, safelift=safelift,
+            lines_per_test=lines_per_test, cuttype=cuttype, testtouchpath=testtouchpath,
+            bidirectional=bidirectional, verbose=False)
+        results["bidirectional" if bidirectional else "forward"] = {"simulated_s": run["virtual_s"],
+                                                                     "estimated_s": est.total_s}
+
+    fwd, bid = results["forward"], results["bidirectional"]
+    print(f"saved: simulated {fwd['simulated_s'] - bid['simulated_s']:.1f} s "
+          f"({fwd['simulated_s']:.1f} -> {bid['simulated_s']:.1f}) | "
+          f"estimated {fwd['estimated_s'] - bid['estimated_s']:.1f} s "
+          f"({fwd['estimated_s']:.1f} -> {bid['estimated_s']:.1f})")
+
+    return results
+
+
+def run_sim_job(job, task=1, command_capacity=64, **controller_kwargs):
+    """
+    Run job(controller, cq) against a simulated controller and report virtual and wall time.
+
+    Call sim_automation1.install() before core_utils / metrology are first imported so they
+    pick up the simulator. Python sleeps inside the job advance the virtual clock.
+
+    Example
+    -------
+    import sim_automation1; sim_automation1.install()
+    import core_utils, benchmarks
+    benchmarks.run_sim_job(lambda c, cq: core_utils.cutcamming(c, cq, path, "ZC", "", 5.0, 10.0, 6))
+
+    Returns
+    -------
+    dict
+        virtual_s (machine time), wall_s (Python time), profile (per-command count and
+        queue time, see Controller.profile) and the controller for further inspection.
+    """
+    import sim_automation1
+
+    controller = sim_automation1.Controller.connect(**controller_kwargs)
+    controller.start()
+    cq = controller.runtime.commands.begin_command_queue(
+        task=task, command_capacity=command_capacity, should_block_if_full=True
+    )
+
+    t0 = time.perf_counter()
+    with sim_automation1.virtual_sleep():
+        job(controller, cq)
+    wall = time.perf_counter() - t0
+
+    print(f"virtual {controller.now:.1f} s | wall {wall:.3f} s | {len(controller.command_log)} commands")
+    for name, (count, busy) in list(controller.profile().items())[:8]:
+        print(f"  {name:<28} {count:>6} x  {busy:9.2f} s")
+
+    return {"virtual_s": controller.now, "wall_s": wall, "profile": controller.profile(), "controller": controller}
@@ -2,16 +2,44 @@ import automation1 as a1
 import time
 import logging
 
+import io
+import os
+import json
+import hashlib
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import re
+from collections import namedtuple
 
 import sys
 sys.path.append('C:\\Users\\UNIVERSITY\\git\\')
 sys.path.append('C:\\Users\\UNIVERSITY\\git\\metalens\\')
-import metalens
-from metalens import core_utils as cu
-from test_touch_vision import perform_test_touch_vision_cycle
+# metalens and test_touch_vision (camera + UNet stack) are imported where they are used,
+# so this module (and the simulator benchmarks) import without them
+
+
+CAMMING_MASK = 1 << 16  # AeroBasic INDEXTOMASK(16) == 65536
+
+
+def _check_lockfile(path):
+    from metalens import core_utils as cu
+    cu._check_lockfile(path)
+
+
+def _compiling(cq):
+    # aeroscript_job.ProgramBuilder records the queue calls of a cut routine into a program
+    # instead of running them: nothing is cut, so no lockfile and no log entries are written
+    return getattr(cq, "compiling", False)
+
+
+def _log_file(cq, log_path):
+    return os.devnull if _compiling(cq) else log_path
+
+
+def _line_done(cq, camnum):
+    if _compiling(cq):
+        cq.line_done(camnum)
 
 
 def check_io_status(controller, port, name, axis='X', execution_task_index=1):
@@ -173,7 +201,7 @@ def prepare_zaxes(controller, cq, z_axes, spindle_ports, flood_ports, active_z,
         print(status)
 
 
-def check_axis_status_position(controller, axis):
+def check_axis_status_position(controller, axis, poller=None):
     """
     Check drive status and program position for a given axis.
 
@@ -183,7 +211,19 @@ def check_axis_status_position(controller, axis):
         Automation1 controller instance.
     axis : str
         Axis name (e.g., "ZA", "ZB", "ZC").
+    poller : StatusPoller, optional
+        If given, read the latest shared sample instead of making a round trip. Before
+        its first sample, or if it does not sample axis, the controller is queried directly.
     """
+    sample = poller.latest() if poller is not None else None
+    if sample is not None and axis in sample.axis_status:
+        return {
+            "axis": axis,
+            "camming_bit": bool(sample.axis_status[axis] & CAMMING_MASK),
+            "program_position": sample.program_position[axis],
+            "axis_status_raw": sample.axis_status[axis]
+        }
+
     cfg = a1.StatusItemConfiguration()
     cfg.axis.add(a1.AxisStatusItem.AxisStatus, axis)
     cfg.axis.add(a1.AxisStatusItem.ProgramPosition, axis)
@@ -195,7 +235,7 @@ def check_axis_status_position(controller, axis):
     program_pos  = results.axis.get(a1.AxisStatusItem.ProgramPosition, axis).value
 
     # Convert drive status to int and mask off camming bit (bit 16)
-    camming_bit = int(axis_status) & (1 << 16)
+    camming_bit = int(axis_status) & CAMMING_MASK
 
     return {
         "axis": axis,
@@ -205,7 +245,86 @@ def check_axis_status_position(controller, axis):
     }
 
 
+def camming_wait_script(axis, engaged, timeout_ms=None):
+    """
+    Build an AeroScript wait on the camming bit (AxisStatus bit 16) of an axis.
+
+    Parameters
+    ----------
+    axis : str
+        Follower axis name (e.g., "ZC").
+    engaged : bool
+        True to wait for camming on, False to wait for camming off.
+    timeout_ms : int, optional
+        If given, the wait times out after this many ms and the controller raises a
+        task error instead of cutting in the wrong camming state.
+
+    Returns
+    -------
+    str
+        AeroScript statement, e.g.
+        wait((StatusGetAxisItem(ZC, AxisStatusItem.AxisStatus) & 65536) != 0)
+    """
+    compare = "!=" if engaged else "=="
+    condition = f"(StatusGetAxisItem({axis}, AxisStatusItem.AxisStatus) & {CAMMING_MASK}) {compare} 0"
+
+    if timeout_ms is None:
+        return f"wait({condition})"
+    return f"wait({condition}, {int(timeout_ms)})"
+
+
+def queue_camming_wait(cq, axis, engaged, timeout_ms=None):
+    """
+    Queue a controller-side wait on the camming bit of axis.
+
+    The controller holds the queue until the bit reaches the requested state, so
+    Python does not need to drain the queue and poll check_axis_status_position.
+    See camming_wait_script for the parameters.
+    """
+    cq.execute(camming_wait_script(axis, engaged, timeout_ms=timeout_ms))
+
+
+def global_set_script(index, value):
+    """
+    AeroScript statement setting controller global integer $iglobal[index] to value.
+    """
+    return f"$iglobal[{int(index)}] = {int(value)}"
+
+
+def global_wait_script(index, value, timeout_ms=None):
+    """
+    AeroScript wait until controller global integer $iglobal[index] >= value.
+
+    Globals are shared by all tasks, so one command queue can hold until another has
+    reached a point in its sequence (the other queue sets the global when it gets there).
+    timeout_ms works as in camming_wait_script.
+    """
+    condition = f"$iglobal[{int(index)}] >= {int(value)}"
+
+    if timeout_ms is None:
+        return f"wait({condition})"
+    return f"wait({condition}, {int(timeout_ms)})"
+
+
+def queue_set_global(cq, index, value):
+    """
+    Queue setting $iglobal[index] = value (see global_set_script).
+    """
+    cq.execute(global_set_script(index, value))
+
+
+def queue_wait_global(cq, index, value, timeout_ms=None):
+    """
+    Queue a controller-side wait until $iglobal[index] >= value (see global_wait_script).
+    """
+    cq.execute(global_wait_script(index, value, timeout_ms=timeout_ms))
+
+
 def read_startend_coords(master_path, camnum):
+    """
+    Look up (xstart, ystart, zstart, yend) for one cam number by re-reading Master.txt.
+    Inside cutting loops use MasterIndex.coords instead, which parses the file once.
+    """
     df = load_master_table(master_path)
 
     # make sure camnum is a string with leading zeros like in the file
@@ -251,34 +370,108 @@ def load_master_table(master_path):
     return df
 
 
-def iter_cam_paths_from_master(master_path, base_path, cuttype):
+MasterRow = namedtuple("MasterRow", ["row_idx", "camnum", "x", "ystart", "zstart", "yend", "cam_path"])
+
+
+class MasterIndex:
     """
-    Yields (row_idx, camnum_int, cam_filename, cam_path, row) for each row in Master.txt.
-    - camnum_int is the integer form for formatting (7 → '0007')
-    - row is the entire pandas row if you want X/Y/Z/feed later
+    Master.txt parsed once per job and indexed by cam number.
+
+    Replaces calling read_startend_coords on every cut line, which re-reads and
+    filters the whole master file each time.
+
+    Parameters
+    ----------
+    master_path : str or Path
+        Path to Master.txt.
+    base_path : str or Path, optional
+        Directory holding the .Cam files. Defaults to the Master.txt directory.
+    cuttype : str, optional
+        Cut type used in the cam file names, CutCam{cuttype}{camnum:04d}.Cam.
+
+    Notes
+    -----
+    Iterating yields MasterRow tuples in file order. Lookups by cam number are
+    dict lookups; if a cam number appears twice the first row wins, which matches
+    read_startend_coords.
     """
-    base_path = Path(base_path)
-    df = load_master_table(master_path)
-    campaths = []
-    for i, row in df.iterrows():
-        camnum_str = str(row[0]).strip()
 
-        # Be forgiving: extract digits just in case (e.g., '0007' or '0007,' etc.)
-        m = re.search(r"(\d+)", camnum_str)
-        if not m:
-            print(f"[warn] row {i}: could not parse cam number from '{camnum_str}'")
-            continue
+    def __init__(self, master_path, base_path=None, cuttype=""):
+        self.master_path = Path(master_path)
+        self.base_path = Path(base_path) if base_path is not None else self.master_path.parent
+        self.cuttype = cuttype
 
-        camnum_int = int(m.group(1))  # 7, 12, etc.
-        cam_filename = f"CutCam{cuttype}{camnum_int:04d}.Cam"
-        cam_path = base_path / cam_filename
-        campaths.append(cam_path)
+        df = load_master_table(self.master_path)
 
-        if not cam_path.exists():
-            print(f"[warn] row {i}: missing {cam_path}")
+        self._rows = []
+        self._by_camnum = {}
+        for values in df.itertuples(index=True, name=None):
+            i, camnum_str = values[0], str(values[1]).strip()
+
+            # Be forgiving: extract digits just in case (e.g., '0007' or '0007,' etc.)
+            m = re.search(r"(\d+)", camnum_str)
+            if not m:
+                print(f"[warn] row {i}: could not parse cam number from '{camnum_str}'")
+                continue
+
+            camnum_int = int(m.group(1))  # 7, 12, etc.
+            cam_path = self.base_path / f"CutCam{cuttype}{camnum_int:04d}.Cam"
+            row = MasterRow(i, camnum_int, float(values[2]), float(values[3]),
+                            float(values[4]), float(values[5]), cam_path)
+
+            self._rows.append(row)
+            self._by_camnum.setdefault(camnum_int, row)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __contains__(self, camnum):
+        return int(camnum) in self._by_camnum
+
+    def row(self, camnum):
+        """
+        Return the MasterRow for a cam number (int or zero-padded string like '0007').
+        """
+        try:
+            return self._by_camnum[int(camnum)]
+        except KeyError:
+            raise ValueError(f"camnum {str(camnum).zfill(4)} not found in {self.master_path}") from None
+
+    def coords(self, camnum):
+        """
+        Return (xstart, ystart, zstart, yend) for a cam number, like read_startend_coords.
+        """
+        row = self.row(camnum)
+        return row.x, row.ystart, row.zstart, row.yend
+
+    def cam_path(self, camnum):
+        """
+        Return the .Cam path for a cam number.
+        """
+        return self.row(camnum).cam_path
+
+
+def iter_cam_paths_from_master(master_path, base_path, cuttype, index=None):
+    """
+    Returns the cam path for each row in Master.txt, in file order.
+    - cam paths are built as CutCam{cuttype}{camnum:04d}.Cam under base_path
+    - index is an already built MasterIndex for this Master.txt; if None, one is built here
+    """
+    if index is None:
+        index = MasterIndex(master_path, base_path=base_path, cuttype=cuttype)
+
+    campaths = []
+    for row in index:
+        campaths.append(row.cam_path)
+
+        if not row.cam_path.exists():
+            print(f"[warn] row {row.row_idx}: missing {row.cam_path}")
             continue
 
-    return campaths# i, camnum_int, cam_filename, cam_path, row
+    return campaths
 
 
 def loadcampath(master_path, base_path, cuttype, camnum):
@@ -311,35 +504,241 @@ def loadcampath(master_path, base_path, cuttype, camnum):
     return campaths# i, camnum_int, cam_filename, cam_path, row
 
 
-def get_cutcam_coords(campath):
+def _parse_cam_lines(lines):
     """
+    Line-by-line .Cam parse: split on commas/whitespace, skip lines with fewer than
+    two fields or a non-numeric leader/follower, take columns 1 and 2.
     """
     leader_values = []
     follower_values = []
 
-    with open(campath, "r") as f:
-        for ln in f:
-            s = ln.strip()
-            parts = s.replace(",", " ").split()
-            if len(parts) < 2:
-                continue
-            try:
-                leader = float(parts[1]) # was 0 
-                follower = float(parts[2]) # was 1
-            except ValueError:
-                #print(f"[warn] Skipping non-numeric line: {s}")
-                continue
-            leader_values.append(leader)
-            follower_values.append(follower)
-
+    for ln in lines:
+        s = ln.strip()
+        parts = s.replace(",", " ").split()
+        if len(parts) < 2:
+            continue
+        try:
+            leader = float(parts[1]) # was 0
+            follower = float(parts[2]) # was 1
+        except ValueError:
+            #print(f"[warn] Skipping non-numeric line: {s}")
+            continue
+        leader_values.append(leader)
+        follower_values.append(follower)
 
     return leader_values, follower_values
 
 
-def cutcamming(controller, cq, path, zaxis, cuttype, safelift, feedspeed, floodport, rot=None):
+def parse_cam_text(text):
+    """
+    Parse .Cam file text into contiguous float64 (leader, follower) arrays.
+
+    Header lines are skipped with the same rules as _parse_cam_lines. The numeric
+    block after the header is handed to np.loadtxt in one call; if that block has
+    anything irregular in it (comments, ragged rows, stray text), the whole file is
+    re-parsed line by line so malformed lines are treated exactly as before.
+    """
+    lines = text.splitlines()
+
+    # find the first line the line parser would keep
+    start = 0
+    for start, ln in enumerate(lines):
+        leader, _ = _parse_cam_lines([ln])
+        if leader:
+            break
+    else:
+        return np.empty(0), np.empty(0)
+
+    try:
+        block = np.loadtxt(
+            io.StringIO("\n".join(lines[start:]).replace(",", " ")),
+            dtype=np.float64,
+            comments=None,
+            ndmin=2,
+        )
+    except ValueError:
+        block = None
+
+    if block is None or block.shape[1] < 3:
+        leader_values, follower_values = _parse_cam_lines(lines)
+        return np.asarray(leader_values, dtype=np.float64), np.asarray(follower_values, dtype=np.float64)
+
+    return np.ascontiguousarray(block[:, 1]), np.ascontiguousarray(block[:, 2])
+
+
+def _cam_cache_paths(campath):
+    campath = Path(campath)
+    return campath.with_name(campath.name + ".npy"), campath.with_name(campath.name + ".npy.key")
+
+
+def load_cutcam_arrays(campath, use_cache=True):
+    """
+    Load a .Cam file as contiguous float64 (leader, follower) arrays.
+
+    Parameters
+    ----------
+    campath : str or Path
+        Path to the .Cam file.
+    use_cache : bool
+        If True, keep a binary sidecar next to the cam file (CutCam....Cam.npy plus a
+        .npy.key file holding size, mtime and sha1 of the text file). A matching size
+        and mtime reuses the sidecar without reading the text file; if only the hash
+        matches (e.g. the file was copied) the key is refreshed. The sidecar is
+        memory-mapped, so re-runs and resumed jobs skip text parsing completely.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        Leader (Y) and follower (Z) values.
+    """
+    campath = Path(campath)
+    if not use_cache:
+        return parse_cam_text(campath.read_text())
+
+    npy_path, key_path = _cam_cache_paths(campath)
+    st = campath.stat()
+
+    key = None
+    if npy_path.exists() and key_path.exists():
+        try:
+            key = json.loads(key_path.read_text())
+        except ValueError:
+            key = None
+
+    if key is not None and key.get("size") == st.st_size and key.get("mtime_ns") == st.st_mtime_ns:
+        table = np.load(npy_path, mmap_mode="r")
+        return table[0], table[1]
+
+    data = campath.read_bytes()
+    sha1 = hashlib.sha1(data).hexdigest()
+    new_key = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": sha1}
+
+    if key is not None and key.get("sha1") == sha1:
+        key_path.write_text(json.dumps(new_key))
+        table = np.load(npy_path, mmap_mode="r")
+        return table[0], table[1]
+
+    leader, follower = parse_cam_text(data.decode())
+
+    # write to temp files and rename, so a reader never sees a half-written sidecar
+    tmp_npy = npy_path.with_name(npy_path.name + f".{os.getpid()}.tmp")
+    with open(tmp_npy, "wb") as f:
+        np.save(f, np.vstack([leader, follower]))
+    os.replace(tmp_npy, npy_path)
+    tmp_key = key_path.with_name(key_path.name + f".{os.getpid()}.tmp")
+    tmp_key.write_text(json.dumps(new_key))
+    os.replace(tmp_key, key_path)
+
+    return leader, follower
+
+
+def get_cutcam_coords(campath, use_cache=True):
+    """
+    Return (leader_values, follower_values) lists for a .Cam file.
+    Thin list wrapper around load_cutcam_arrays.
+    """
+    leader, follower = load_cutcam_arrays(campath, use_cache=use_cache)
+
+    return leader.tolist(), follower.tolist()
+
+
+def load_camming_table(cq, table_num, leader_values, follower_values):
+    """
+    Free a controller camming table and load it from leader/follower arrays.
+
+    Parameters
+    ----------
+    cq : object
+        Command queue the free/load commands are enqueued on.
+    table_num : int
+        Controller camming table number.
+    leader_values : array_like
+        Leader (Y) positions from the .Cam file.
+    follower_values : array_like
+        Follower (Z) positions from the .Cam file.
+
+    Notes
+    -----
+    The commands are queued, not executed immediately, so loading a table that
+    is not the one currently camming can overlap with motion already in the queue.
+    """
+    leader_values = np.asarray(leader_values, dtype=np.float64).tolist()
+    follower_values = np.asarray(follower_values, dtype=np.float64).tolist()
+
+    am = cq.commands.advanced_motion
+    am.cammingfreetable(table_num)
+    am.cammingloadtablefromarray(
+        table_num=table_num,
+        leader_values=leader_values,
+        follower_values=follower_values,
+        num_values=len(leader_values),
+        units_mode=a1.CammingUnits.Primary,
+        interpolation_mode=a1.CammingInterpolation.Linear,
+        wrap_mode=a1.CammingWrapping.NoWrap,
+        table_offset=0.0)
+
+
+def line_table(leader_values, follower_values, ystart, yend, reverse=False):
+    """
+    Camming table for cutting a line forward (ystart -> yend) or reversed (yend -> ystart).
+
+    The output is RelativePosition, so the follower is added to Z at cammingon. Reversed,
+    the table is shifted to 0 at yend and Z is plunged to zstart + z_entry there, so Z
+    follows the same absolute profile as a forward cut. The leader stays ascending (the
+    controller needs that); only the direction of the Y feed changes.
+
+    Returns
+    -------
+    leader_values, follower_values, z_entry
+        z_entry is 0.0 forward.
+    """
+    if not reverse:
+        return leader_values, follower_values, 0.0
+    leader_values = np.asarray(leader_values, dtype=np.float64)
+    follower_values = np.asarray(follower_values, dtype=np.float64)
+    z_entry = float(np.interp(yend, leader_values, follower_values))
+    return leader_values, follower_values - z_entry, z_entry
+
+
+def _check_bundle(bundle, cutpath, cuttype):
+    # a bundle passed to a cut routine has to be of the job it is cutting
+    assert Path(bundle.base_path).resolve() == Path(cutpath).resolve(), \
+        f"bundle {bundle.bundle_path} is of {bundle.base_path}, not {cutpath}"
+    assert bundle.cuttype == cuttype, \
+        f"bundle {bundle.bundle_path} has cuttype {bundle.cuttype!r}, not {cuttype!r}"
+
+
+def check_cam_tables(cam_tables):
+    """
+    Raise ValueError unless the camming table numbers are distinct. The next line's table
+    is freed and loaded while the current one cams, so a repeated entry would overwrite
+    the table that is camming.
+    """
+    if len(set(cam_tables)) != len(cam_tables):
+        raise ValueError(f"cam_tables must be distinct, got {tuple(cam_tables)}")
+
+
+def cutcamming(controller, cq, path, zaxis, cuttype, safelift, feedspeed, floodport, rot=None,
+               cam_tables=(1,), camming_timeout_ms=None, bundle=None, bidirectional=False):
     """
     path = path straight up to the cutcamming file
     add docstrings here
+
+    cam_tables is the controller camming tables to cycle through. With one table (default)
+    every line frees and loads table 1 like before. With two or more, e.g. (1, 2), the next
+    line's table is parsed and queued for upload while the current line's Y feed is running.
+    The entries must be distinct (ValueError otherwise).
+
+    The camming on/off checks are queued as controller-side waits (queue_camming_wait);
+    camming_timeout_ms, if given, makes those waits fault the task instead of hanging.
+
+    bundle is an optional JobBundle (job_bundle.load_job) of this job; lines and cam tables
+    then come from the validated bundle instead of Master.txt and the .Cam files. Its
+    base_path and cuttype have to match path and cuttype.
+
+    bidirectional cuts every other line (the 2nd, 4th, ...) from yend back to ystart, with
+    the lead-in at yend and the table shifted by line_table, so the Y traverse back to
+    ystart between lines goes away.
     """
     path = Path(path)
     assert path.exists(), f"Base path not found: {path}"
@@ -347,15 +746,22 @@ def cutcamming(controller, cq, path, zaxis, cuttype, safelift, feedspeed, floodp
     mastername = "Master.txt"
     masterpath = Path(path) / mastername
     assert masterpath.exists(), f"Master file not found: {masterpath}"
+    check_cam_tables(cam_tables)
 
     lockfile = Path(path) / 'lockfile.lock'
     if lockfile.exists():
         # warn if lockfile exists
-        logger.info('LOCKFILE EXISTS FOR TEST CUTS. Proceeding to overwrite.')
+        print('[warn] LOCKFILE EXISTS FOR TEST CUTS. Proceeding to overwrite.')
     else:
         print("Lockfile not present, moving forward.")
 
-    campaths = iter_cam_paths_from_master(master_path=masterpath, base_path=path, cuttype=cuttype)
+    if bundle is not None:
+        _check_bundle(bundle, path, cuttype)
+        index, campaths, load_cam = bundle, bundle.campaths, bundle.cam_arrays
+    else:
+        index = MasterIndex(masterpath, base_path=path, cuttype=cuttype)
+        campaths = iter_cam_paths_from_master(master_path=masterpath, base_path=path, cuttype=cuttype, index=index)
+        load_cam = load_cutcam_arrays
 
     if rot is not None:
         rot = float(rot)
@@ -373,7 +779,7 @@ def cutcamming(controller, cq, path, zaxis, cuttype, safelift, feedspeed, floodp
     if logger.hasHandlers():
         logger.handlers.clear()
 
-    fh = logging.FileHandler(log_path)
+    fh = logging.FileHandler(_log_file(cq, log_path))
     ch = logging.StreamHandler()
 
     formatter = logging.Formatter("%(asctime)s - %(message)s")
@@ -385,25 +791,26 @@ def cutcamming(controller, cq, path, zaxis, cuttype, safelift, feedspeed, floodp
 
 
     am = cq.commands.advanced_motion
-    for campath in campaths:
-        assert campath.exists(), f"Campath not found: {campath}"
-        yvals, zvals = get_cutcam_coords(campath)
-
-        # now set up aerotech camming conditions
-        am.cammingfreetable(1)
-        am.cammingloadtablefromarray(
-            table_num=1,
-            leader_values=yvals,
-            follower_values=zvals,
-            num_values=len(yvals),
-            units_mode=a1.CammingUnits.Primary,
-            interpolation_mode=a1.CammingInterpolation.Linear,
-            wrap_mode=a1.CammingWrapping.NoWrap,
-            table_offset=0.0)
-        print('Camming table loaded')
+    double_buffered = len(cam_tables) > 1
+    preloaded = None
+    for i, campath in enumerate(campaths):
+        assert bundle is not None or campath.exists(), f"Campath not found: {campath}"
+        table_num = cam_tables[i % len(cam_tables)]
 
         camnum = Path(campath).stem[-4:]
-        xstart, ystart, zstart, yend = read_startend_coords(master_path=masterpath, camnum=camnum)
+        xstart, ystart, zstart, yend = index.coords(camnum)
+        reverse = bidirectional and i % 2 == 1
+        y_entry, y_exit = (yend, ystart) if reverse else (ystart, yend)
+        direction = 1.0 if y_exit >= y_entry else -1.0
+
+        # now set up aerotech camming conditions (already queued if double buffered)
+        if preloaded != i:
+            yvals, zvals, z_entry = line_table(*load_cam(campath), ystart, yend, reverse)
+            load_camming_table(cq, table_num, yvals, zvals)
+        else:
+            z_entry = preloaded_z_entry
+        print(f'Camming table {table_num} loaded')
+        zplunge = zstart + z_entry
 
 
         SPEED_Y  = 30.0  # mm/s
@@ -413,80 +820,73 @@ def cutcamming(controller, cq, path, zaxis, cuttype, safelift, feedspeed, floodp
         SPEED_Z_TOUCH    = 0.1 #0.05  # (final settle at zstart)
 
         # move to start positions, wait for in position
-        cq.commands.motion.moveabsolute(["X", "Y"], [xstart, ystart], [SPEED_Y,  SPEED_X])
+        cq.commands.motion.moveabsolute(["X", "Y"], [xstart, y_entry], [SPEED_Y,  SPEED_X])
         cq.commands.motion.waitforinposition(["Y"])
         cq.commands.motion.waitforinposition(["X"])
         cq.commands.motion.movedelay(["X", "Y"], delay_time=400)
 
 
-        cq.commands.motion.moveabsolute([zaxis], [zstart + 2.0], [SPEED_Z])
+        cq.commands.motion.moveabsolute([zaxis], [zplunge + 2.0], [SPEED_Z])
         cq.commands.motion.waitforinposition([zaxis])
-        cq.commands.motion.moveabsolute([zaxis], [zstart+1], [1])
+        cq.commands.motion.moveabsolute([zaxis], [zplunge+1], [1])
         cq.commands.motion.waitforinposition([zaxis])
         cq.commands.motion.waitformotiondone([zaxis])
 
-        cq.commands.motion.moveabsolute([zaxis], [zstart], [SPEED_Z_TOUCH])
+        cq.commands.motion.moveabsolute([zaxis], [zplunge], [SPEED_Z_TOUCH])
         cq.commands.motion.waitforinposition([zaxis])
         cq.commands.motion.waitformotiondone([zaxis])
         cq.commands.motion.movedelay([zaxis], delay_time=500)
-        cq.wait_for_empty()
-
-
-        while True:
-            statuses = check_axis_status_position(controller=controller, axis=zaxis)
-            if statuses['camming_bit'] is False:
-                break # in desired state, stop looping
-            time.sleep(0.1)
 
+        # controller waits for camming off, engages, then waits for the camming bit
+        queue_camming_wait(cq, zaxis, engaged=False, timeout_ms=camming_timeout_ms)
         cq.commands.advanced_motion.cammingon(
             follower_axis=zaxis,
             leader_axis="Y",
-            table_num=1,
+            table_num=table_num,
             source=a1.CammingSource.PositionCommand,  # leader uses position
             output=a1.CammingOutput.RelativePosition
         )
-
-        ## TODO: there's gotta be something else we can do with the waitforinposition and wait for move done
-        ## TODO: something about InPositionTime value that we might be able to toggle
-        while True:
-            statuses = check_axis_status_position(controller=controller, axis=zaxis)
-            if statuses['camming_bit'] is True:
-                print(f"{zaxis} camming bit is True; ready to cut line {camnum}")
-                break # in desired state, stop looping
-            time.sleep(0.1)  
+        queue_camming_wait(cq, zaxis, engaged=True, timeout_ms=camming_timeout_ms)
+        print(f"{zaxis} camming queued; ready to cut line {camnum}")
 
         # when first cutting a line, for the first 10mm, go at a slower feedspeed, 5mm/s
-        cq.commands.motion.moveabsolute(["Y"], [ystart+17], [5.0])
+        cq.commands.motion.moveabsolute(["Y"], [y_entry + 17 * direction], [5.0])
         cq.commands.motion.waitforinposition(["Y"])
         cq.commands.motion.waitformotiondone(["Y"])
 
         # proceed to cutting the rest of the cut at assigned feedspeed
-        cq.commands.motion.moveabsolute(["Y"], [yend], [feedspeed])
+        cq.commands.motion.moveabsolute(["Y"], [y_exit], [feedspeed])
+
+        # double buffered: upload the next line's table while Y is feeding
+        if double_buffered and i + 1 < len(campaths):
+            next_campath = campaths[i + 1]
+            assert bundle is not None or next_campath.exists(), f"Campath not found: {next_campath}"
+            _, next_ystart, _, next_yend = index.coords(Path(next_campath).stem[-4:])
+            next_yvals, next_zvals, preloaded_z_entry = line_table(
+                *load_cam(next_campath), next_ystart, next_yend, bidirectional and (i + 1) % 2 == 1)
+            load_camming_table(cq, cam_tables[(i + 1) % len(cam_tables)], next_yvals, next_zvals)
+            preloaded = i + 1
+
         cq.commands.motion.waitforinposition(["Y"])
         cq.commands.motion.waitformotiondone(["Y"])
         cq.commands.motion.movedelay(["Y"], delay_time=1_000)
 
         am.cammingoff(follower_axis=zaxis)
+        queue_camming_wait(cq, zaxis, engaged=False, timeout_ms=camming_timeout_ms)
 
-        # check that camming bit status is False
-        while True:
-            statuses = check_axis_status_position(controller=controller, axis=zaxis)
-            if statuses['camming_bit'] is False:
-                break # in desired state, stop looping
-            time.sleep(0.1)
-        
-        # log for one line finished cutting
-        logger.info(f"{zaxis}: Finished cutting line #{camnum}")
-
-        # retract ZC and free table 1
+        # retract ZC and free the table used for this line
         cq.commands.motion.moveabsolute([zaxis], [zstart + safelift], [11])
         cq.commands.motion.waitforinposition([zaxis])
         cq.commands.motion.waitformotiondone([zaxis])
-        cq.commands.advanced_motion.cammingfreetable(1)
+        cq.commands.advanced_motion.cammingfreetable(table_num)
         cq.commands.motion.movedelay([zaxis], delay_time=1_000)
 
         # drain the queue before we are ready to cut the next line
         cq.wait_for_empty()
+        _line_done(cq, camnum)
+
+        # log for one line finished cutting
+        logger.info(f"{zaxis}: Finished cutting line #{camnum}")
 
     # turn off flood cooling
     cq.commands.io.digitaloutputset(axis='X', output_num=floodport, value=0)
@@ -499,56 +899,89 @@ def cutcamming(controller, cq, path, zaxis, cuttype, safelift, feedspeed, floodp
         logger.removeHandler(handler)
 
 
-    lockfile = path/'lockfile.lock'
-    with open(lockfile, "w") as f:
-        f.write("")
+    if not _compiling(cq):
+        lockfile = path/'lockfile.lock'
+        with open(lockfile, "w") as f:
+            f.write("")
 
 
 def cutalumina(controller, cq, path, zaxis, cuttype, safelift, feedspeed,
-               testtouchpath, wearshiftpath, lines_per_test):
+               testtouchpath, wearshiftpath, lines_per_test, cam_tables=(1,), camming_timeout_ms=None, bundle=None,
+               tt_scheduler=None, bidirectional=False, max_lines=4):
+    """
+    cam_tables, camming_timeout_ms and bundle work as in cutcamming; a bundle compiled with a
+    wear shift or test touch table also supplies the wear shifts or test touch positions.
+
+    tt_scheduler (test_touch_scheduler.TestTouchScheduler, usually built with the same
+    wear shift table) decides after each line whether to test touch and on which slot,
+    instead of every lines_per_test lines. It raises TestTouchBudgetError, stopping the job,
+    when the test-touch slots left cannot hold its tolerance.
+
+    bidirectional cuts every other line from yend back to ystart, as in cutcamming.
+
+    Only the first max_lines lines are cut (default 4, where this routine has always
+    stopped); None cuts every line.
+    """
     path = Path(path)
     assert path.exists(), f"Base path not found: {path}"
 
     mastername = "Master.txt"
     masterpath = Path(path) / mastername
     assert masterpath.exists(), f"Master file not found: {masterpath}"
+    check_cam_tables(cam_tables)
 
     # Load wear shift table
-    ws_table = load_wear_shift_table(wearshiftpath)
+    if bundle is not None and bundle.wear_shift_table:
+        ws_table = bundle.wear_shift_table
+    else:
+        ws_table = load_wear_shift_table(wearshiftpath)
+    tt_table = bundle.test_touch_table if bundle is not None and bundle.test_touch_table else None
 
-    cu._check_lockfile(path)
-    campaths = iter_cam_paths_from_master(master_path=masterpath, base_path=path, cuttype=cuttype)
+    _check_lockfile(path)
+    if bundle is not None:
+        _check_bundle(bundle, path, cuttype)
+        index, campaths, load_cam = bundle, bundle.campaths, bundle.cam_arrays
+    else:
+        index = MasterIndex(masterpath, base_path=path, cuttype=cuttype)
+        campaths = iter_cam_paths_from_master(master_path=masterpath, base_path=path, cuttype=cuttype, index=index)
+        load_cam = load_cutcam_arrays
 
     am = cq.commands.advanced_motion
-    for campath in campaths[0:4]:
-        assert campath.exists(), f"Campath not found: {campath}"
+    if max_lines is not None:
+        campaths = campaths[:max_lines]
+    if tt_scheduler is not None:
+        tt_scheduler.start(len(campaths))
+    double_buffered = len(cam_tables) > 1
+    preloaded = None
+    for i, campath in enumerate(campaths):
+        assert bundle is not None or campath.exists(), f"Campath not found: {campath}"
+        table_num = cam_tables[i % len(cam_tables)]
 
         camnum = Path(campath).stem[-4:]
         camnum_int = int(camnum)
         wearshift = ws_table.get(camnum_int, 0.0)
 
         # get coordinates, including original non-wear shifted z coordinate
-        yvals, zvals = get_cutcam_coords(campath)
-        xstart, ystart, zstart_raw, yend = read_startend_coords(master_path=masterpath, camnum=camnum)
+        xstart, ystart, zstart_raw, yend = index.coords(camnum)
+        reverse = bidirectional and i % 2 == 1
+        y_entry, y_exit = (yend, ystart) if reverse else (ystart, yend)
+        direction = 1.0 if y_exit >= y_entry else -1.0
 
-        # apply wear-shift to camming z-values and zstart value
-        zvals_shifted = [z + wearshift for z in zvals]
+        # apply wear-shift to zstart value
         zstart = zstart_raw + wearshift
         print(zstart)
 
-
-        # now set up aerotech camming conditions
-        am.cammingfreetable(1)
-        am.cammingloadtablefromarray(
-            table_num=1,
-            leader_values=yvals,
-            follower_values=zvals_shifted,
-            num_values=len(yvals),
-            units_mode=a1.CammingUnits.Primary,
-            interpolation_mode=a1.CammingInterpolation.Linear,
-            wrap_mode=a1.CammingWrapping.NoWrap,
-            table_offset=0.0)
-        print(f'Camming table loaded for {camnum} file with wear shift = {wearshift}')
+        # now set up aerotech camming conditions with wear-shifted z-values
+        # (already queued if double buffered)
+        if preloaded != i:
+            yvals, zvals = load_cam(campath)
+            zvals_shifted = zvals + wearshift
+            yvals, zvals_shifted, z_entry = line_table(yvals, zvals_shifted, ystart, yend, reverse)
+            load_camming_table(cq, table_num, yvals, zvals_shifted)
+        else:
+            z_entry = preloaded_z_entry
+        zplunge = zstart + z_entry
+        print(f'Camming table {table_num} loaded for {camnum} file with wear shift = {wearshift}')
 
         SPEED_Y  = 20.0  # mm/s
         SPEED_X  = 20.0
@@ -557,83 +990,88 @@ def cutalumina(controller, cq, path, zaxis, cuttype, safelift, feedspeed,
         SPEED_Z_TOUCH    = 0.1  # (final settle at zstart)
 
         # move to start positions, wait for in position
-        cq.commands.motion.moveabsolute(["X", "Y"], [xstart, ystart], [SPEED_Y,  SPEED_X])
+        cq.commands.motion.moveabsolute(["X", "Y"], [xstart, y_entry], [SPEED_Y,  SPEED_X])
         cq.commands.motion.waitforinposition(["Y"])
         cq.commands.motion.waitforinposition(["X"])
         cq.commands.motion.movedelay(["X", "Y"], delay_time=1_500)
 
-        cq.commands.motion.moveabsolute([zaxis], [zstart + 2.0], [SPEED_Z])
+        cq.commands.motion.moveabsolute([zaxis], [zplunge + 2.0], [SPEED_Z])
         cq.commands.motion.waitforinposition([zaxis])
-        cq.commands.motion.moveabsolute([zaxis], [zstart+1], [0.5])
+        cq.commands.motion.moveabsolute([zaxis], [zplunge+1], [0.5])
         cq.commands.motion.waitforinposition([zaxis])
         cq.commands.motion.waitformotiondone([zaxis])
 
-        cq.commands.motion.moveabsolute([zaxis], [zstart+0.5], [0.1])
+        cq.commands.motion.moveabsolute([zaxis], [zplunge+0.5], [0.1])
         cq.commands.motion.waitforinposition([zaxis])
         cq.commands.motion.waitformotiondone([zaxis])
 
-        cq.commands.motion.moveabsolute([zaxis], [zstart], [0.01])
+        cq.commands.motion.moveabsolute([zaxis], [zplunge], [0.01])
         cq.commands.motion.waitforinposition([zaxis])
         cq.commands.motion.waitformotiondone([zaxis])
 
         cq.commands.motion.movedelay([zaxis], delay_time=1_000)
 
-        while True:
-            statuses = check_axis_status_position(controller=controller, axis=zaxis)
-            if statuses['camming_bit'] is False:
-                break # in desired state, stop looping
-            time.sleep(0.1)
-
+        # controller waits for camming off, engages, then waits for the camming bit
+        queue_camming_wait(cq, zaxis, engaged=False, timeout_ms=camming_timeout_ms)
         cq.commands.advanced_motion.cammingon(
             follower_axis=zaxis,
             leader_axis="Y",
-            table_num=1,
+            table_num=table_num,
             source=a1.CammingSource.PositionCommand,  # leader uses position
-            output=a1.CammingOutput.RelativePositio
+            output=a1.CammingOutput.RelativePosition
         )
-
-        ## TODO: there's gotta be something else we can do with the waitforinposition and wait for move done
-        ## TODO: something about InPositionTime value that we might be able to toggle
-        while True:
-            statuses = check_axis_status_position(controller=controller, axis=zaxis)
-            if statuses['camming_bit'] is True:
-                print(f"{zaxis} camming bit is True; ready to cut line {camnum}")
-                break # in desired state, stop looping
-            time.sleep(0.1)
+        queue_camming_wait(cq, zaxis, engaged=True, timeout_ms=camming_timeout_ms)
+        print(f"{zaxis} camming queued; ready to cut line {camnum}")
 
         # move at slower feespeed for first 10 mm
-        cq.commands.motion.moveabsolute(["Y"], [ystart+10], [5])
+        cq.commands.motion.moveabsolute(["Y"], [y_entry + 10 * direction], [5])
         cq.commands.motion.waitforinposition(["Y"])
         cq.commands.motion.waitformotiondone(["Y"])
 
-        cq.commands.motion.moveabsolute(["Y"], [yend], [feedspeed])
+        cq.commands.motion.moveabsolute(["Y"], [y_exit], [feedspeed])
+
+        # double buffered: upload the next line's table while Y is feeding
+        if double_buffered and i + 1 < len(campaths):
+            next_campath = campaths[i + 1]
+            assert bundle is not None or next_campath.exists(), f"Campath not found: {next_campath}"
+            next_wearshift = ws_table.get(int(Path(next_campath).stem[-4:]), 0.0)
+            _, next_ystart, _, next_yend = index.coords(Path(next_campath).stem[-4:])
+            next_yvals, next_zvals = load_cam(next_campath)
+            next_yvals, next_zvals, preloaded_z_entry = line_table(
+                next_yvals, next_zvals + next_wearshift, next_ystart, next_yend,
+                bidirectional and (i + 1) % 2 == 1)
+            load_camming_table(cq, cam_tables[(i + 1) % len(cam_tables)], next_yvals, next_zvals)
+            preloaded = i + 1
+
         cq.commands.motion.waitforinposition(["Y"])
         cq.commands.motion.waitformotiondone(["Y"])
         cq.commands.motion.movedelay(["Y"], delay_time=2_000)
 
         am.cammingoff(follower_axis=zaxis)
+        queue_camming_wait(cq, zaxis, engaged=False, timeout_ms=camming_timeout_ms)
 
-        # check that camming bit status is False
-        while True:
-            statuses = check_axis_status_position(controller=controller, axis=zaxis)
-            if statuses['camming_bit'] is False:
-                print(f"{zaxis} camming status is off, {camnum} line finished cutting.")
-                break # in desired state, stop looping
-            time.sleep(0.1)
-
-        # retract ZC and free table 1
+        # retract ZC and free the table used for this line
         # TODO: PRIORITY 1-- CHECK IF THIS IS THE ONLY PLACE THAT SAFELIFT IS USED IN SOURCE CODE
         cq.commands.motion.moveabsolute([zaxis], [zstart + safelift], [SPEED_Z])
         cq.commands.motion.waitforinposition([zaxis])
         cq.commands.motion.waitformotiondone([zaxis])
-        cq.commands.advanced_motion.cammingfreetable(1)
+        cq.commands.advanced_motion.cammingfreetable(table_num)
         cq.commands.motion.movedelay([zaxis], delay_time=2_000)
 
         # drain the queue before we are ready to cut the next line
         cq.wait_for_empty()
+        _line_done(cq, camnum)
+        print(f"{zaxis} camming status is off, {camnum} line finished cutting.")
+
 
+        if tt_scheduler is not None:
+            tt_index = tt_scheduler.after_line(camnum_int)
+            touch_due = tt_index is not None
+        else:
+            tt_index = None
+            touch_due = (camnum_int + 1) % lines_per_test == 0
 
-        if (camnum_int + 1) % lines_per_test == 0:
+        if touch_due:
             info = run_alumina_test_touch(
                 controller = controller,
                 cq=cq,
@@ -642,6 +1080,9 @@ def cutalumina(controller, cq, path, zaxis, cuttype, safelift, feedspeed,
                 wearshiftpath=wearshiftpath,
                 zaxis=zaxis,
                 lines_per_test=lines_per_test,
+                tt_index=tt_index,
+                tt_table=tt_table,
+                ws_table=ws_table,
             )
             print(f"did test touch #{info['test_touch_index']}", info)
 
@@ -649,9 +1090,10 @@ def cutalumina(controller, cq, path, zaxis, cuttype, safelift, feedspeed,
     cq.commands.motion.moveabsolute([zaxis], [0.0], [15])
     controller.runtime.commands.end_command_queue(cq)
 
-    lockfile = path/'lockfile.lock'
-    with open(lockfile, "w") as f:
-        f.write("")
+    if not _compiling(cq):
+        lockfile = path/'lockfile.lock'
+        with open(lockfile, "w") as f:
+            f.write("")
 
 
 def run_alumina_test_touch(
@@ -662,13 +1104,22 @@ def run_alumina_test_touch(
     wearshiftpath,
     zaxis,
     lines_per_test,
+    tt_index=None,
+    tt_table=None,
+    ws_table=None,
 ):
+    """
+    tt_table / ws_table, if given (e.g. from a job bundle), are used instead of reading
+    testtouchpath / wearshiftpath.
+    """
     camnum = int(camnum)
 
-    tt_table = load_test_touch_table(testtouchpath)
-    ws_table = load_wear_shift_table(wearshiftpath)
+    if tt_table is None:
+        tt_table = load_test_touch_table(testtouchpath)
+    if ws_table is None:
+        ws_table = load_wear_shift_table(wearshiftpath)
 
-    tt_index = camnum // lines_per_test
+    tt_index = camnum // lines_per_test if tt_index is None else int(tt_index)
     print('tt index', tt_index)
     if tt_index not in tt_table:
         raise KeyError(f"Test-touch index {tt_index} not found in {test_touch_file}")
@@ -729,7 +1180,9 @@ def run_test_touch(
     lines_per_test,
     path,
     zshift = None,
-    ttrot = None
+    ttrot = None,
+    tt_index = None,
+    tt_table = None
 ):
     """
     Lines per test arg tells us how many lines we wanna cut between test touches
@@ -744,12 +1197,15 @@ def run_test_touch(
 
     NOTE THAT THIS FUNCTION DOES NOT END THE QUEUE AS IT WORKS INSIDE OTHER FUNCTIONS. IMPORTANT WARNING TO STATE
     path argument is path to where cut camming files are. i.e., /CCAT/180deg/ so we can log a test touch log file
+    tt_index overrides the camnum // lines_per_test test-touch table slot (adaptive scheduling)
+    tt_table, if given (e.g. from a job bundle), is used instead of reading testtouchpath
     """
     camnum = int(camnum)
 
-    tt_table = load_test_touch_table(testtouchpath)
+    if tt_table is None:
+        tt_table = load_test_touch_table(testtouchpath)
 
-    tt_index = camnum // lines_per_test
+    tt_index = camnum // lines_per_test if tt_index is None else int(tt_index)
 
     if tt_index not in tt_table:
         raise KeyError(f"Test-touch index {tt_index} not found in {testtouchpath}")
@@ -771,7 +1227,7 @@ def run_test_touch(
     if logger.hasHandlers():
         logger.handlers.clear()
 
-    fh = logging.FileHandler(log_path, mode="a")
+    fh = logging.FileHandler(_log_file(cq, log_path), mode="a")
     ch = logging.StreamHandler()
 
     formatter = logging.Formatter("%(asctime)s - %(message)s")
@@ -837,8 +1293,43 @@ def run_test_touch(
     return info
 
 
+def collect_vision_results(pending, on_result=None, wait=False):
+    """
+    Pick up finished background vision cycles (start_test_touch_vision_cycle results).
+
+    Parameters
+    ----------
+    pending : list[dict]
+        Cycles still waiting, each with a "future".
+    on_result : callable, optional
+        Called with (touch_info, result) for each finished cycle, in touch order.
+    wait : bool
+        Block until every pending cycle has finished.
+
+    Returns
+    -------
+    list[dict]
+        The cycles still pending. Results are handed over in order, so a finished cycle
+        behind an unfinished one waits for the next call.
+    """
+    pending = list(pending)
+    while pending and (wait or pending[0]["future"].done()):
+        cycle = pending.pop(0)
+        try:
+            result = cycle["future"].result()
+        except Exception as e:
+            print(f"[warn] test touch #{cycle['touch_info']['test_touch_index']} vision failed: {e!r}")
+            continue
+        print("test touch vision result:", result)
+        if on_result is not None:
+            on_result(cycle["touch_info"], result)
+    return pending
+
+
 def cutlens_segments(controller, cq, path, spindle, zaxis, cuttype, safelift, feedspeed,
-               testtouchpath, lines_per_test, floodport, cut_rot=None, ttrot=None, zshift=None, vision_config=None):
+               testtouchpath, lines_per_test, floodport, cut_rot=None, ttrot=None, zshift=None, vision_config=None,
+               cam_tables=(1,), camming_timeout_ms=None, bundle=None, z_compensator=None, tt_scheduler=None,
+               bidirectional=False, plan=None):
     """
     Cut lens segment mimic the cut alumina but instead of a wearshift file path it's given
     a zcorrection file path
@@ -855,17 +1346,66 @@ def cutlens_segments(controller, cq, path, spindle, zaxis, cuttype, safelift, fe
     spindle is string for path concatenation: 'SpindleC'
     zshift is any z correction we applied from shiftZ_silicon metalens function
     zaxis can be a list of axes ?
+    cam_tables, camming_timeout_ms and bundle work as in cutcamming; a bundle compiled with a
+    test touch table also supplies the test touch positions
+
+    vision_config runs the test touch vision cycle after each test touch. If it has a
+    "worker" (test_touch_vision.VisionWorker) only the camera move and capture block the
+    cut loop; inference, overlay and log run in the worker and each result is picked up at
+    the next line boundary (all of them before returning). vision_config["on_result"],
+    if given, is called with (touch_info, result) as each result comes in.
+    vision_config["camera"] (test_touch_vision.CameraSession) keeps the camera open across
+    the test touches; it is closed before returning. With it, vision_config["archiver"]
+    (test_touch_vision.ImageArchiver) makes the capture hand the frame to inference in
+    memory and write the image file on a background thread; it is flushed before returning.
+    vision_config["roi"] (dict of size_mm, margin_mm, spindle_to_camera_mm, axis_signs,
+    size_multiple; see test_touch_vision.roi_bounds) segments a crop around the expected
+    touch first and falls back to the full frame if no touch is found in it.
+
+    z_compensator (z_compensation.ZCompensator) closes the loop on depth: each test touch's
+    vision result updates its Z offset, and every line after that is plunged to zstart plus
+    the offset (the tables are RelativePosition, so the whole line moves with it). Test
+    touches stay at the nominal test-touch Z so they keep measuring the raw drift.
+
+    tt_scheduler (test_touch_scheduler.TestTouchScheduler) replaces the fixed lines_per_test
+    cadence; vision results feed it the measured depth drift. It raises TestTouchBudgetError
+    when the test-touch slots left cannot hold its tolerance.
+
+    bidirectional cuts every other line from yend back to ystart, as in cutcamming.
+
+    plan (cut_planner.CutPlan) cuts the plan's lines instead of Master.txt: in its order, each
+    at its own rotation (Z goes to 0 before U moves), direction and test touches (unless
+    tt_scheduler is given). path is then only where the logs go; cut_rot and bidirectional
+    are not used, and every cam directory of the plan gets its lockfile.
     """
     path = Path(path)
     assert path.exists(), f"Base path not found: {path}"
     cutpath = path / spindle / f"CutCamming{cuttype}/"
+    check_cam_tables(cam_tables)
 
-    mastername = "Master.txt"
-    masterpath = cutpath / mastername
-    assert masterpath.is_file(), f"Master file not found: {masterpath}"
-
-    cu._check_lockfile(cutpath)
-    campaths = iter_cam_paths_from_master(master_path=masterpath, base_path=cutpath, cuttype=cuttype)
+    if plan is not None:
+        cutpaths = plan.cut_dirs
+    else:
+        mastername = "Master.txt"
+        masterpath = cutpath / mastername
+        assert masterpath.is_file(), f"Master file not found: {masterpath}"
+        cutpaths = [cutpath]
+
+    for d in cutpaths:
+        _check_lockfile(d)
+    if plan is not None:
+        index, campaths, load_cam = plan, plan.campaths, plan.cam_arrays
+        cut_rot = plan.lines[0].rot if plan.lines else None
+    elif bundle is not None:
+        _check_bundle(bundle, cutpath, cuttype)
+        index, campaths, load_cam = bundle, bundle.campaths, bundle.cam_arrays
+    else:
+        index = MasterIndex(masterpath, base_path=cutpath, cuttype=cuttype)
+        campaths = iter_cam_paths_from_master(master_path=masterpath, base_path=cutpath, cuttype=cuttype, index=index)
+        load_cam = load_cutcam_arrays
+    tt_table = bundle.test_touch_table if bundle is not None and bundle.test_touch_table else None
+    if tt_scheduler is not None:
+        tt_scheduler.start(len(campaths))
 
     # always move the zaxis/zaxes to 0 
     cq.pause()
@@ -891,7 +1431,7 @@ def cutlens_segments(controller, cq, path, spindle, zaxis, cuttype, safelift, fe
     if logger.hasHandlers():
         logger.handlers.clear()
 
-    fh = logging.FileHandler(log_path)
+    fh = logging.FileHandler(_log_file(cq, log_path))
     ch = logging.StreamHandler()
 
     formatter = logging.Formatter("%(asctime)s - %(message)s")
@@ -902,27 +1442,63 @@ def cutlens_segments(controller, cq, path, spindle, zaxis, cuttype, safelift, fe
     logger.addHandler(ch)
 
 
+    if vision_config is not None:
+        from test_touch_vision import perform_test_touch_vision_cycle, start_test_touch_vision_cycle
+    vision_worker = vision_config.get("worker") if vision_config is not None else None
+    vision_pending = []
+    on_result = vision_config.get("on_result") if vision_config is not None else None
+    if z_compensator is not None or tt_scheduler is not None:
+        user_on_result = on_result
+
+        def on_result(touch_info, result):
+            if z_compensator is not None:
+                z_compensator.update(touch_info, result)
+            if tt_scheduler is not None:
+                tt_scheduler.update(touch_info, result)
+            if user_on_result is not None:
+                user_on_result(touch_info, result)
+
+    def line_coords(campath):
+        return index.coords(campath) if plan is not None else index.coords(Path(campath).stem[-4:])
+
+    def line_reverse(i):
+        return plan.lines[i].reverse if plan is not None else bidirectional and i % 2 == 1
+
     am = cq.commands.advanced_motion
-    for campath in campaths:
-        assert campath.exists(), f"Campath not found: {campath}"
+    double_buffered = len(cam_tables) > 1
+    preloaded = None
+    for i, campath in enumerate(campaths):
+        assert bundle is not None or campath.exists(), f"Campath not found: {campath}"
+        table_num = cam_tables[i % len(cam_tables)]
 
         camnum = Path(campath).stem[-4:]
         camnum_int = int(camnum)
 
-        yvals, zvals = get_cutcam_coords(campath)
-        xstart, ystart, zstart, yend = read_startend_coords(master_path=masterpath, camnum=camnum)
-
-        # now set up aerotech camming conditions
-        am.cammingfreetable(1)
-        am.cammingloadtablefromarray(
-            table_num=1,
-            leader_values=yvals,
-            follower_values=zvals,
-            num_values=len(yvals),
-            units_mode=a1.CammingUnits.Primary,
-            interpolation_mode=a1.CammingInterpolation.Linear,
-            wrap_mode=a1.CammingWrapping.NoWrap,
-            table_offset=0.0)
+        # plan: next rotation group, Z up before U moves
+        if plan is not None and plan.lines[i].rot is not None and plan.lines[i].rot != cut_rot:
+            cut_rot = float(plan.lines[i].rot)
+            cq.commands.motion.moveabsolute([zaxis], [0], [12.0])
+            cq.commands.motion.waitforinposition([zaxis])
+            cq.commands.motion.waitformotiondone([zaxis])
+            cq.commands.motion.moveabsolute(["U"], [cut_rot], [20])
+            cq.commands.motion.waitforinposition(["U"])
+            cq.commands.motion.waitformotiondone(["U"])
+            cq.commands.motion.movedelay(["U"], delay_time=1_000)
+
+        xstart, ystart, zstart, yend = line_coords(campath)
+        z_offset = z_compensator.offset_mm if z_compensator is not None else 0.0
+        zstart = zstart + z_offset
+        reverse = line_reverse(i)
+        y_entry, y_exit = (yend, ystart) if reverse else (ystart, yend)
+        direction = 1.0 if y_exit >= y_entry else -1.0
+
+        # now set up aerotech camming conditions (already queued if double buffered)
+        if preloaded != i:
+            yvals, zvals, z_entry = line_table(*load_cam(campath), ystart, yend, reverse)
+            load_camming_table(cq, table_num, yvals, zvals)
+        else:
+            z_entry = preloaded_z_entry
+        zplunge = zstart + z_entry
 
         SPEED_Y  = 30.0  # mm/s
         SPEED_X  = 30.0
@@ -931,84 +1507,96 @@ def cutlens_segments(controller, cq, path, spindle, zaxis, cuttype, safelift, fe
         SPEED_Z_TOUCH    = 0.1  # (final settle at zstart)
 
         # move to start positions, wait for in position
-        cq.commands.motion.moveabsolute(["X", "Y"], [xstart, ystart], [SPEED_Y,  SPEED_X])
+        cq.commands.motion.moveabsolute(["X", "Y"], [xstart, y_entry], [SPEED_Y,  SPEED_X])
         cq.commands.motion.waitforinposition(["Y"])
         cq.commands.motion.waitforinposition(["X"])
         cq.commands.motion.movedelay(["X", "Y"], delay_time=400)
 
 
-        cq.commands.motion.moveabsolute([zaxis], [zstart + 2.0], [SPEED_Z])
+        cq.commands.motion.moveabsolute([zaxis], [zplunge + 2.0], [SPEED_Z])
         cq.commands.motion.waitforinposition([zaxis])
-        cq.commands.motion.moveabsolute([zaxis], [zstart+1], [0.5])
+        cq.commands.motion.moveabsolute([zaxis], [zplunge+1], [0.5])
         cq.commands.motion.waitforinposition([zaxis])
         cq.commands.motion.waitformotiondone([zaxis])
 
-        cq.commands.motion.moveabsolute([zaxis], [zstart], [0.1])
+        cq.commands.motion.moveabsolute([zaxis], [zplunge], [0.1])
         cq.commands.motion.waitforinposition([zaxis])
         cq.commands.motion.waitformotiondone([zaxis])
         cq.commands.motion.movedelay([zaxis], delay_time=500)
-        cq.wait_for_empty()
-
-        while True:
-            statuses = check_axis_status_position(controller=controller, axis=zaxis)
-            if statuses['camming_bit'] is False:
-                break
-            time.sleep(0.1)
 
+        # controller waits for camming off, engages, then waits for the camming bit
+        queue_camming_wait(cq, zaxis, engaged=False, timeout_ms=camming_timeout_ms)
         cq.commands.advanced_motion.cammingon(
             follower_axis=zaxis,
             leader_axis="Y",
-            table_num=1,
+            table_num=table_num,
             source=a1.CammingSource.PositionCommand,
             output=a1.CammingOutput.RelativePosition
         )
-
-
-        while True:
-            statuses = check_axis_status_position(controller=controller, axis=zaxis)
-            if statuses['camming_bit'] is True:
-                break
-            time.sleep(0.1)
+        queue_camming_wait(cq, zaxis, engaged=True, timeout_ms=camming_timeout_ms)
 
 
         # move at slower feedspeed [feedspeed of 5] for first 20 mm 
 
-        cq.commands.motion.moveabsolute(["Y"], [ystart+20], [5])
+        cq.commands.motion.moveabsolute(["Y"], [y_entry + 20 * direction], [5])
         cq.commands.motion.waitforinposition(["Y"])
         cq.commands.motion.waitformotiondone(["Y"])
 
 
 
-        cq.commands.motion.moveabsolute(["Y"], [yend], [feedspeed])
+        cq.commands.motion.moveabsolute(["Y"], [y_exit], [feedspeed])
+
+        # double buffered: upload the next line's table while Y is feeding
+        if double_buffered and i + 1 < len(campaths):
+            next_campath = campaths[i + 1]
+            assert bundle is not None or next_campath.exists(), f"Campath not found: {next_campath}"
+            _, next_ystart, _, next_yend = line_coords(next_campath)
+            next_yvals, next_zvals, preloaded_z_entry = line_table(
+                *load_cam(next_campath), next_ystart, next_yend, line_reverse(i + 1))
+            load_camming_table(cq, cam_tables[(i + 1) % len(cam_tables)], next_yvals, next_zvals)
+            preloaded = i + 1
+
         cq.commands.motion.waitforinposition(["Y"])
         cq.commands.motion.waitformotiondone(["Y"])
         cq.commands.motion.movedelay(["Y"], delay_time=500)
 
         am.cammingoff(follower_axis=zaxis)
+        queue_camming_wait(cq, zaxis, engaged=False, timeout_ms=camming_timeout_ms)
 
-        # check that camming bit status is False
-        while True:
-            statuses = check_axis_status_position(controller=controller, axis=zaxis)
-            if statuses['camming_bit'] is False:
-                break
-            time.sleep(0.1)
-
-        # log for one line finished cutting
-        logger.info(f"{zaxis}: Finished cutting line #{camnum}")
-
-
-        # retract ZC and free table 1
+        # retract ZC and free the table used for this line
         cq.commands.motion.moveabsolute([zaxis], [zstart + safelift], [SPEED_Z])
         cq.commands.motion.waitforinposition([zaxis])
         cq.commands.motion.waitformotiondone([zaxis])
-        cq.commands.advanced_motion.cammingfreetable(1)
+        cq.commands.advanced_motion.cammingfreetable(table_num)
         cq.commands.motion.movedelay([zaxis], delay_time=500)
 
         # drain the queue before we are ready to cut the next line
         cq.wait_for_empty()
+        _line_done(cq, camnum)
 
-
-        if (camnum_int + 1) % lines_per_test == 0:
+        # log for one line finished cutting
+        message = f"{zaxis}: Finished cutting line #{camnum}"
+        if plan is not None:
+            message += f" | {Path(campath).parent} rot={cut_rot}"
+        if z_compensator is not None:
+            message += f" | z_offset={z_offset:+.6f}"
+        logger.info(message)
+
+        if vision_pending:
+            vision_pending = collect_vision_results(vision_pending, on_result=on_result)
+
+
+        if tt_scheduler is not None:
+            tt_index = tt_scheduler.after_line(camnum_int)
+            touch_due = tt_index is not None
+        elif plan is not None:
+            tt_index = plan.lines[i].tt_index
+            touch_due = tt_index is not None
+        else:
+            tt_index = None
+            touch_due = (camnum_int + 1) % lines_per_test == 0
+
+        if touch_due:
             # First ensure that the Zaxis moves to zero as we may have to rotate
             cq.commands.motion.moveabsolute([zaxis], [0], [SPEED_Z])
             cq.commands.motion.waitforinposition([zaxis])
@@ -1022,11 +1610,23 @@ def cutlens_segments(controller, cq, path, spindle, zaxis, cuttype, safelift, fe
                 lines_per_test=lines_per_test,
                 path=path,
                 zshift=zshift,
-                ttrot=ttrot
+                ttrot=ttrot,
+                tt_index=tt_index,
+                tt_table=tt_table
             )
 
             vision_result = None
-            if vision_config is not None:
+            if vision_worker is not None:
+                vision_pending.append(start_test_touch_vision_cycle(
+                    cq=cq,
+                    path=path,
+                    spindle=spindle,
+                    cuttype=cuttype,
+                    touch_info=info,
+                    vision_config=vision_config,
+                    worker=vision_worker,
+                ))
+            elif vision_config is not None:
                 vision_result = perform_test_touch_vision_cycle(
                     cq=cq,
                     path=path,
@@ -1037,6 +1637,8 @@ def cutlens_segments(controller, cq, path, spindle, zaxis, cuttype, safelift, fe
                 )
 
                 print("test touch vision result:", vision_result)
+                if on_result is not None:
+                    on_result(info, vision_result)
 
             if cut_rot is not None:
                 cut_rot = float(cut_rot)
@@ -1061,14 +1663,26 @@ def cutlens_segments(controller, cq, path, spindle, zaxis, cuttype, safelift, fe
     cq.commands.motion.moveabsolute([zaxis], [0.0], [11])
     controller.runtime.commands.end_command_queue(cq)
 
+    # inference still running in the vision worker
+    if vision_pending:
+        collect_vision_results(vision_pending, on_result=on_result, wait=True)
+
+    # camera session stays open across the job's test touches; archived images written last
+    if vision_config is not None and vision_config.get("camera") is not None:
+        vision_config["camera"].close()
+    if vision_config is not None and vision_config.get("archiver") is not None:
+        vision_config["archiver"].flush()
+
     # close logging file because windows computer:
     for handler in logger.handlers[:]:
         handler.close()
         logger.removeHandler(handler)
 
-    lockfile = cutpath /'lockfile.lock'
-    with open(lockfile, "w") as f:
-        f.write("")
+    if not _compiling(cq):
+        for d in cutpaths:
+            lockfile = Path(d) / 'lockfile.lock'
+            with open(lockfile, "w") as f:
+                f.write("")
 
 
 def load_wear_shift_table(path):
@@ -0,0 +1,424 @@
+"""
+Cut order planning across one or more rotation directories.
+
+Each cam directory (e.g. CCAT/180deg/SpindleC/CutCamming) is cut at its own U rotation, in
+Master.txt order, with a test touch after every lines_per_test cam numbers. plan_cuts merges
+the directories into one run and reorders the lines:
+
+- every rotation is visited once, going to the nearest remaining rotation next, so U only
+  moves (with Z up) between rotation groups and for the test touches;
+- inside a rotation the next line is the one with the shortest XY traverse from where the
+  head is, including where it is parked after a test touch (X out at -275);
+- lines at the same X in one directory are passes of the same groove and keep their
+  Master.txt order (material removal), as do whole directories with keep_order;
+- test touches keep each directory's camnum cadence (after camnum + 1 a multiple of
+  lines_per_test, as cutlens_segments): a directory is touched after as many of its lines
+  as in Master.txt order, so the plan has exactly the touches of the directories cut one
+  after the other. They go to the test-touch table slots 0, 1, 2, ... in turn.
+
+The CutPlan it returns is passed to cutlens_segments(..., plan=plan), or written with
+write_cut_plan for review and read back with load_cut_plan.
+"""
+import math
+import re
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+import core_utils
+from cycle_time import move_time
+
+
+CutGroup = namedtuple("CutGroup", ["cam_dir", "rot", "cuttype", "keep_order"], defaults=(None, "", False))
+CutGroup.__doc__ = """
+One cam directory (Master.txt and CutCam{cuttype}####.Cam) cut at U = rot (None: U is not
+moved). keep_order keeps the directory's lines in Master.txt order.
+"""
+
+PlanLine = namedtuple("PlanLine", [
+    "group", "camnum", "x", "ystart", "zstart", "yend", "rot", "cam_path", "reverse", "tt_index",
+])
+PlanLine.__doc__ = """
+One line of a plan, in cut order: its group number and Master.txt row, the U rotation, whether
+it is cut from yend back to ystart, and the test-touch table slot touched after it (or None).
+"""
+
+_ROT_DIR = re.compile(r"^(-?\d+(?:\.\d+)?)deg$")
+
+
+def rotation_groups(root, spindle="SpindleC", cuttype="", rots=None):
+    """
+    CutGroups for the rotation directories under root: root/<rot>deg/<spindle>/CutCamming{cuttype}.
+
+    rots limits (and orders) the rotations used; by default every <rot>deg directory with a
+    Master.txt is used, in increasing rotation.
+    """
+    root = Path(root)
+    found = {}
+    for d in root.iterdir():
+        m = _ROT_DIR.match(d.name)
+        cam_dir = d / spindle / f"CutCamming{cuttype}"
+        if m and (cam_dir / "Master.txt").is_file():
+            found[float(m.group(1))] = cam_dir
+
+    if rots is None:
+        rots = sorted(found)
+    groups = []
+    for rot in rots:
+        if float(rot) not in found:
+            raise ValueError(f"no {rot}deg/{spindle}/CutCamming{cuttype}/Master.txt under {root}")
+        groups.append(CutGroup(found[float(rot)], float(rot), cuttype))
+    return groups
+
+
+class CutPlan:
+    """
+    Lines of one run in cut order.
+
+    Works as the index of cutlens_segments(..., plan=plan): campaths in cut order, coords and
+    cam_arrays by cam path, and per line the rotation, direction and test touch.
+
+    Attributes
+    ----------
+    lines : list[PlanLine]
+    groups : list[CutGroup]
+    original_s, planned_s : float
+        Projected traverse, rotation and test-touch travel time of the directories cut one
+        after the other in Master.txt order, and of this plan. Everything else a line takes
+        (plunge, feed, retract) is the same in both.
+    """
+
+    def __init__(self, lines, groups, original_s=None, planned_s=None):
+        self.lines = list(lines)
+        self.groups = list(groups)
+        self.original_s = original_s
+        self.planned_s = planned_s
+        self.campaths = [line.cam_path for line in self.lines]
+        self._by_path = {str(line.cam_path): line for line in self.lines}
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __repr__(self):
+        saved = ""
+        if self.original_s is not None and self.planned_s is not None:
+            saved = f", {self.original_s - self.planned_s:.1f} s saved"
+        return f"CutPlan({len(self.lines)} lines in {len(self.groups)} group(s){saved})"
+
+    @property
+    def saved_s(self):
+        if self.original_s is None or self.planned_s is None:
+            return None
+        return self.original_s - self.planned_s
+
+    @property
+    def cut_dirs(self):
+        """
+        The cam directories of the run, each once.
+        """
+        return list(dict.fromkeys(Path(g.cam_dir) for g in self.groups))
+
+    def line(self, campath):
+        try:
+            return self._by_path[str(campath)]
+        except KeyError:
+            raise ValueError(f"{campath} is not in the plan") from None
+
+    def coords(self, campath):
+        """
+        (xstart, ystart, zstart, yend) of a line, by cam path.
+        """
+        line = self.line(campath)
+        return line.x, line.ystart, line.zstart, line.yend
+
+    def cam_arrays(self, campath):
+        """
+        (leader, follower) of a line; drop-in for core_utils.load_cutcam_arrays.
+        """
+        return core_utils.load_cutcam_arrays(campath)
+
+
+def _load_lines(groups):
+    lines = []
+    for g, group in enumerate(groups):
+        cam_dir = Path(group.cam_dir)
+        index = core_utils.MasterIndex(cam_dir / "Master.txt", base_path=cam_dir, cuttype=group.cuttype)
+        for row in index:
+            if not row.cam_path.exists():
+                print(f"[warn] row {row.row_idx}: missing {row.cam_path}")
+            lines.append(PlanLine(g, row.camnum, row.x, row.ystart, row.zstart, row.yend,
+                                  group.rot, row.cam_path, False, None))
+    return lines
+
+
+def _predecessors(lines, groups, x_tol):
+    """
+    For each line, the line that has to be cut before it (or -1): the previous line of the
+    same directory at the same X, or of the same directory with keep_order.
+    """
+    before = np.full(len(lines), -1, dtype=int)
+    last = {}
+    for k, line in enumerate(lines):
+        if groups[line.group].keep_order:
+            key = (line.group,)
+        else:
+            key = (line.group, int(round(line.x / x_tol)))
+        before[k] = last.get(key, -1)
+        last[key] = k
+    return before
+
+
+class _Travel:
+    """
+    Travel time of the head between lines, test touches and rotations.
+    """
+
+    def __init__(self, xy_speeds, accel, u_speed, u_dwell_ms, tt_table, tt_speed, xout):
+        self.xy_speeds = xy_speeds
+        self.accel = accel
+        self.u_speed = u_speed
+        self.u_dwell_s = u_dwell_ms / 1000.0
+        self.tt_table = tt_table
+        self.tt_speed = tt_speed
+        self.xout = xout
+
+    def xy(self, p, q, speeds=None):
+        if p is None:
+            return 0.0
+        vx, vy = speeds or self.xy_speeds
+        return max(move_time(q[0] - p[0], vx, self.accel), move_time(q[1] - p[1], vy, self.accel))
+
+    def rotate(self, u0, u1):
+        if u0 is None or u1 is None or u0 == u1:
+            return 0.0
+        return move_time(u1 - u0, self.u_speed, self.accel) + self.u_dwell_s
+
+    def touch(self, p, slot):
+        """
+        Time of the XY legs of a test touch from p, and where the head is left.
+        """
+        if self.tt_table is not None and slot in self.tt_table:
+            ttx, tty, _ = self.tt_table[slot]
+        else:
+            ttx, tty = p
+        t = self.xy(p, (ttx, tty), (self.tt_speed, self.tt_speed))
+        if self.xout is None:
+            return t, (ttx, tty)
+        t += move_time(self.xout[0] - ttx, self.xout[1], self.accel)
+        return t, (self.xout[0], tty)
+
+
+def _ends(line, reverse):
+    entry, exit_ = (line.yend, line.ystart) if reverse else (line.ystart, line.yend)
+    return (line.x, entry), (line.x, exit_)
+
+
+def _simulate(lines, travel, start_xy, start_rot, ttrot):
+    """
+    Travel time of lines cut in the given order, touching where tt_index is set.
+    """
+    total = 0.0
+    p, u = start_xy, start_rot
+    for line in lines:
+        entry, exit_ = _ends(line, line.reverse)
+        total += travel.rotate(u, line.rot) + travel.xy(p, entry)
+        u = line.rot if line.rot is not None else u
+        p = exit_
+        if line.tt_index is not None:
+            t, p = travel.touch(p, line.tt_index)
+            if ttrot is not None:
+                t += travel.rotate(u, ttrot) + travel.rotate(ttrot, u)
+            total += t
+    return total
+
+
+def _original_order(lines, lines_per_test):
+    """
+    The directories one after the other in Master.txt order, touching on the camnum cadence.
+    """
+    out = []
+    for line in lines:
+        tt_index = None
+        if lines_per_test and (line.camnum + 1) % lines_per_test == 0:
+            tt_index = line.camnum // lines_per_test
+        out.append(line._replace(tt_index=tt_index))
+    return out
+
+
+def _rotation_order(rots, start_rot):
+    """
+    Distinct rotations, each visited once, nearest remaining one next.
+    """
+    remaining = list(dict.fromkeys(rots))
+    order = []
+    u = start_rot
+    while remaining:
+        if u is None or None in remaining:
+            nxt = remaining[0]
+        else:
+            nxt = min(remaining, key=lambda r: abs(r - u))
+        order.append(nxt)
+        remaining.remove(nxt)
+        u = nxt if nxt is not None else u
+    return order
+
+
+def plan_cuts(groups, lines_per_test=None, testtouchpath=None, ttrot=None, bidirectional=False,
+              start_xy=None, start_rot=None, xy_speeds=(30.0, 30.0), accel=500.0, u_speed=20.0,
+              u_dwell_ms=1_000, tt_speed=20.0, xout=(-275.0, 30.0), x_tol=1e-3, verbose=True):
+    """
+    Reorder the lines of one or more cam directories into one run.
+
+    Parameters
+    ----------
+    groups : list[CutGroup] or list[tuple]
+        (cam_dir, rot[, cuttype, keep_order]) per directory, e.g. from rotation_groups.
+    lines_per_test : int, optional
+        Test-touch cadence of each directory, see the module docstring (none if None).
+    testtouchpath : str or Path, optional
+        Test-touch table, for the touch positions; touch k of the run uses slot k.
+        ValueError if the run needs a slot the table does not have.
+    ttrot : float, optional
+        U rotation of the test touches, as cutlens_segments' ttrot.
+    bidirectional : bool
+        Lines may be cut from either end, whichever is closer.
+    start_xy, start_rot : optional
+        Head (X, Y) and U before the run.
+    xy_speeds, accel, u_speed, u_dwell_ms, tt_speed, xout :
+        Travel model: line-to-line XY speeds (cutlens_segments' 30 mm/s), U speed and
+        dwell, test-touch XY speed and the X out park (X, speed) after each touch.
+    x_tol : float
+        Lines of one directory whose X agree to x_tol mm are passes of one groove and keep
+        their Master.txt order.
+
+    Returns
+    -------
+    CutPlan
+    """
+    groups = [g if isinstance(g, CutGroup) else CutGroup(*g) for g in groups]
+    lines = _load_lines(groups)
+    tt_table = core_utils.load_test_touch_table(testtouchpath) if testtouchpath is not None else None
+    travel = _Travel(xy_speeds, accel, u_speed, u_dwell_ms, tt_table, tt_speed, xout)
+
+    before = _predecessors(lines, groups, x_tol)
+    done = np.zeros(len(lines), dtype=bool)
+    rots = np.array([np.nan if line.rot is None else line.rot for line in lines])
+
+    # touch after the n-th line cut of a directory for the same n as in Master.txt order
+    touch_after = [set() for _ in groups]
+    cut_in_group = [0] * len(groups)
+    if lines_per_test:
+        for line in lines:
+            cut_in_group[line.group] += 1
+            if (line.camnum + 1) % lines_per_test == 0:
+                touch_after[line.group].add(cut_in_group[line.group])
+        cut_in_group = [0] * len(groups)
+
+    planned = []
+    p, u = start_xy, start_rot
+    touches = 0
+    for rot in _rotation_order([line.rot for line in lines], start_rot):
+        in_rot = np.isnan(rots) if rot is None else rots == rot
+        for _ in range(int(in_rot.sum())):
+            best, best_t = None, (math.inf, math.inf)
+            for k in np.flatnonzero(in_rot & ~done):
+                if before[k] >= 0 and not done[before[k]]:
+                    continue
+                for reverse in ((False, True) if bidirectional else (False,)):
+                    entry = _ends(lines[k], reverse)[0]
+                    # the slower axis sets the time; among equal times take the shortest move
+                    t = (travel.xy(p, entry), 0.0 if p is None else math.hypot(entry[0] - p[0], entry[1] - p[1]))
+                    if t < best_t:
+                        best, best_t = (k, reverse), t
+            k, reverse = best
+            done[k] = True
+            line = lines[k]._replace(reverse=reverse)
+            u = rot if rot is not None else u
+            p = _ends(line, reverse)[1]
+
+            cut_in_group[line.group] += 1
+            if cut_in_group[line.group] in touch_after[line.group]:
+                line = line._replace(tt_index=touches)
+                _, p = travel.touch(p, touches)
+                touches += 1
+            planned.append(line)
+
+    missing = [k for k in range(touches) if tt_table is not None and k not in tt_table]
+    if missing:
+        raise ValueError(f"plan needs {touches} test touches (slots 0..{touches - 1}), "
+                         f"{testtouchpath} has no slot {', '.join(map(str, missing))}")
+
+    original = _original_order(lines, lines_per_test)
+    plan = CutPlan(planned, groups,
+                   original_s=_simulate(original, travel, start_xy, start_rot, ttrot),
+                   planned_s=_simulate(planned, travel, start_xy, start_rot, ttrot))
+
+    if verbose:
+        n_rot = len(set(line.rot for line in lines))
+        print(f"{len(planned)} lines, {len(groups)} director{'y' if len(groups) == 1 else 'ies'}, "
+              f"{n_rot} rotation(s), {touches} test touches")
+        print(f"travel: Master.txt order {plan.original_s:.1f} s | planned {plan.planned_s:.1f} s | "
+              f"saved {plan.saved_s:.1f} s")
+    return plan
+
+
+def write_cut_plan(path, plan):
+    """
+    Write a plan as text, one line per cut line in cut order.
+    """
+    path = Path(path)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"# {len(plan)} lines | travel original {plan.original_s} s | planned {plan.planned_s} s\n")
+        for g, group in enumerate(plan.groups):
+            f.write(f"# group {g} {group.cam_dir} rot={group.rot} cuttype={group.cuttype!r} "
+                    f"keep_order={group.keep_order}\n")
+        f.write("# group camnum x ystart zstart yend rot reverse tt_index\n")
+        for line in plan:
+            rot = "None" if line.rot is None else f"{line.rot:.6f}"
+            tt = "None" if line.tt_index is None else str(line.tt_index)
+            f.write(f"{line.group} {line.camnum:04d} {line.x:.6f} {line.ystart:.6f} {line.zstart:.6f} "
+                    f"{line.yend:.6f} {rot} {int(line.reverse)} {tt}\n")
+    return path
+
+
+_GROUP_LINE = re.compile(r"^# group (\d+) (.*) rot=(\S+) cuttype=(.*) keep_order=(True|False)$")
+_TRAVEL_LINE = re.compile(r"travel original (\S+) s \| planned (\S+) s")
+
+
+def load_cut_plan(path):
+    """
+    Read a plan written by write_cut_plan.
+    """
+    groups, rows = {}, []
+    original_s = planned_s = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            s = line.strip()
+            if not s:
+                continue
+            if s.startswith("#"):
+                m = _GROUP_LINE.match(s)
+                if m:
+                    rot = None if m.group(3) == "None" else float(m.group(3))
+                    groups[int(m.group(1))] = CutGroup(Path(m.group(2)), rot, m.group(4).strip("'\""),
+                                                       m.group(5) == "True")
+                m = _TRAVEL_LINE.search(s)
+                if m:
+                    original_s, planned_s = (None if v == "None" else float(v) for v in m.groups())
+                continue
+            rows.append(s.split())
+
+    groups = [groups[g] for g in sorted(groups)]
+    lines = []
+    for g, camnum, x, ystart, zstart, yend, rot, reverse, tt in rows:
+        group = groups[int(g)]
+        camnum = int(camnum)
+        lines.append(PlanLine(int(g), camnum, float(x), float(ystart), float(zstart), float(yend),
+                              None if rot == "None" else float(rot),
+                              Path(group.cam_dir) / f"CutCam{group.cuttype}{camnum:04d}.Cam",
+                              reverse == "1", None if tt == "None" else int(tt)))
+    return CutPlan(lines, groups, original_s=original_s, planned_s=planned_s)
@@ -0,0 +1,317 @@
+import math
+from collections import namedtuple, OrderedDict
+from pathlib import Path
+
+import core_utils
+
+
+CutProfile = namedtuple("CutProfile", [
+    "name",
+    "xy_speeds",          # (X, Y) traverse speeds to the line start, mm/s
+    "xy_dwell_ms",        # movedelay after the XY traverse
+    "z_stages",           # [(height above zstart, speed)], last stage ends at zstart
+    "z_dwell_ms",         # movedelay at zstart before camming on
+    "leadin_length",      # mm of the feed run at leadin_speed
+    "leadin_speed",
+    "feed_dwell_ms",      # movedelay after the feed
+    "retract_speed",      # Z speed up to zstart + safelift
+    "retract_dwell_ms",
+    "tt_z_to_zero_speed",  # Z to 0 before a test touch (None: not done)
+    "tt_xy_speed",
+    "tt_xy_dwell_ms",
+    "tt_z_stages",        # [(height above z_touch, speed)] from Z = 0
+    "tt_dwell_ms",
+    "tt_retract_speed",   # back to Z = 0
+    "tt_retract_dwell_ms",
+    "tt_xout",            # (X, speed) park after the touch, or None
+    "max_lines",          # only the first max_lines lines are cut (None: all)
+])
+CutProfile.__doc__ = """
+Speeds (mm/s) and dwells (ms) of one cutting routine, phase by phase.
+"""
+
+LENS_PROFILE = CutProfile(
+    name="cutlens_segments",
+    xy_speeds=(30.0, 30.0), xy_dwell_ms=400,
+    z_stages=[(2.0, 12.0), (1.0, 0.5), (0.0, 0.1)], z_dwell_ms=500,
+    leadin_length=20.0, leadin_speed=5.0, feed_dwell_ms=500,
+    retract_speed=12.0, retract_dwell_ms=500,
+    tt_z_to_zero_speed=12.0, tt_xy_speed=20.0, tt_xy_dwell_ms=500,
+    tt_z_stages=[(2.0, 10.0), (1.0, 0.5), (0.0, 0.1)], tt_dwell_ms=500,
+    tt_retract_speed=20.0, tt_retract_dwell_ms=1_000, tt_xout=(-275.0, 30.0),
+    max_lines=None,
+)
+
+ALUMINA_PROFILE = CutProfile(
+    name="cutalumina",
+    xy_speeds=(20.0, 20.0), xy_dwell_ms=1_500,
+    z_stages=[(2.0, 12.0), (1.0, 0.5), (0.5, 0.1), (0.0, 0.01)], z_dwell_ms=1_000,
+    leadin_length=10.0, leadin_speed=5.0, feed_dwell_ms=2_000,
+    retract_speed=12.0, retract_dwell_ms=2_000,
+    tt_z_to_zero_speed=None, tt_xy_speed=20.0, tt_xy_dwell_ms=1_000,
+    tt_z_stages=[(2.0, 10.0), (1.0, 0.5), (0.5, 0.05), (0.0, 0.01)], tt_dwell_ms=500,
+    tt_retract_speed=20.0, tt_retract_dwell_ms=2_000, tt_xout=None,
+    max_lines=None,
+)
+
+PHASES = (
+    "xy_traverse", "xy_dwell", "z_approach", "z_touch", "z_dwell", "table_upload",
+    "lead_in", "feed", "feed_dwell", "retract", "retract_dwell", "test_touch",
+)
+
+CycleEstimate = namedtuple("CycleEstimate", ["profile", "lines", "test_touches", "phases", "total_s"])
+
+
+def move_time(distance, speed, accel=500.0):
+    """
+    Duration (s) of a rest-to-rest move with a trapezoidal velocity profile.
+    """
+    d = abs(distance)
+    if d == 0.0:
+        return 0.0
+    if accel is None or accel <= 0:
+        return d / speed
+    if d >= speed * speed / accel:
+        return d / speed + speed / accel
+    return 2.0 * math.sqrt(d / accel)
+
+
+def estimate_cut_job(path, profile=LENS_PROFILE, feedspeed=10.0, safelift=5.0, lines_per_test=None,
+                     cuttype="", testtouchpath=None, vision_s=0.0, accel=500.0, inpos_time=0.02,
+                     table_load_rate=200_000.0, start_xy=None, shift_hours=None, bidirectional=False, verbose=True):
+    """
+    Estimate how long a cut job takes, phase by phase, without touching the machine.
+
+    Parameters
+    ----------
+    path : str or Path
+        Folder holding Master.txt and the CutCam{cuttype}####.Cam files (the same folder
+        cutalumina takes, or path/spindle/CutCamming{cuttype} for cutlens_segments).
+    profile : CutProfile
+        LENS_PROFILE or ALUMINA_PROFILE, or a modified copy (profile._replace(...)) to try
+        other speeds and dwells. Both estimate every line of the job; use
+        ALUMINA_PROFILE._replace(max_lines=4) for cutalumina with its default max_lines=4,
+        which stops after the first 4 lines.
+    feedspeed : float
+        Y feed speed during the cut, mm/s.
+    safelift : float
+        Retract height above zstart, mm.
+    lines_per_test : int, optional
+        Test touch after every line with (camnum + 1) % lines_per_test == 0. None: no touches.
+    testtouchpath : str or Path, optional
+        Test touch table; gives the real touch positions. Without it the touch is assumed
+        at the line's start XY and zstart.
+    vision_s : float
+        Extra time per test touch for the vision cycle.
+    accel : float
+        Axis acceleration, mm/s^2.
+    inpos_time : float
+        Settling time added by each waitforinposition, s.
+    table_load_rate : float
+        Camming table values uploaded per second.
+    start_xy : tuple, optional
+        (X, Y) before the job; if given the traverse to the first line is included.
+    shift_hours : float, optional
+        Warn if the total exceeds this.
+    bidirectional : bool
+        Every other line cut from yend back to ystart, as the routines' bidirectional mode.
+
+    Returns
+    -------
+    CycleEstimate(profile, lines, test_touches, phases, total_s)
+        phases is an OrderedDict of seconds per phase (see PHASES).
+    """
+    path = Path(path)
+    master_path = path / "Master.txt"
+    index = core_utils.MasterIndex(master_path, base_path=path, cuttype=cuttype)
+    campaths = core_utils.iter_cam_paths_from_master(master_path, path, cuttype, index=index)
+    if profile.max_lines is not None:
+        campaths = campaths[:profile.max_lines]
+
+    tt_table = core_utils.load_test_touch_table(testtouchpath) if testtouchpath is not None else None
+
+    phases = OrderedDict((p, 0.0) for p in PHASES)
+    xspeed, yspeed = profile.xy_speeds
+
+    def zmove(dz, speed):
+        return move_time(dz, speed, accel) + inpos_time
+
+    def stages(z_from, z_target, stage_list):
+        """
+        Time of the staged approach from z_from down to z_target: (first stage, slow stages).
+        """
+        first, slow = 0.0, 0.0
+        z = z_from
+        for k, (height, speed) in enumerate(stage_list):
+            t = zmove(z_target + height - z, speed)
+            if k == 0:
+                first += t
+            else:
+                slow += t
+            z = z_target + height
+        return first, slow
+
+    x_prev, y_prev = start_xy if start_xy is not None else (None, None)
+    z_prev = 0.0
+    touches = 0
+
+    for i, campath in enumerate(campaths):
+        camnum = Path(campath).stem[-4:]
+        xstart, ystart, zstart, yend = index.coords(camnum)
+        if bidirectional and i % 2 == 1:
+            ystart, yend = yend, ystart
+
+        yvals, _ = core_utils.load_cutcam_arrays(campath)
+        phases["table_upload"] += yvals.size / table_load_rate
+        if yvals.size and (yvals[0] > min(ystart, yend) or yvals[-1] < max(ystart, yend)):
+            print(f"[warn] {Path(campath).name}: cam covers Y {yvals[0]:.3f}..{yvals[-1]:.3f}, "
+                  f"line runs {ystart:.3f}..{yend:.3f}")
+
+        # XY traverse to the line start (X and Y move independently)
+        if x_prev is not None:
+            phases["xy_traverse"] += max(move_time(xstart - x_prev, xspeed, accel),
+                                         move_time(ystart - y_prev, yspeed, accel)) + inpos_time
+        phases["xy_dwell"] += profile.xy_dwell_ms / 1000.0
+
+        # staged Z approach
+        first, slow = stages(z_prev, zstart, profile.z_stages)
+        phases["z_approach"] += first
+        phases["z_touch"] += slow
+        phases["z_dwell"] += profile.z_dwell_ms / 1000.0
+
+        # lead-in and feed
+        length = abs(yend - ystart)
+        leadin = min(profile.leadin_length, length)
+        phases["lead_in"] += move_time(leadin, profile.leadin_speed, accel) + inpos_time
+        phases["feed"] += move_time(length - leadin, feedspeed, accel) + inpos_time
+        phases["feed_dwell"] += profile.feed_dwell_ms / 1000.0
+
+        # retract
+        phases["retract"] += zmove(safelift, profile.retract_speed)
+        phases["retract_dwell"] += profile.retract_dwell_ms / 1000.0
+
+        x_prev, y_prev, z_prev = xstart, yend, zstart + safelift
+
+        if lines_per_test and (int(camnum) + 1) % lines_per_test == 0:
+            tt_index = int(camnum) // lines_per_test
+            if tt_table is not None and tt_index in tt_table:
+                ttx, tty, ttz = tt_table[tt_index]
+            else:
+                ttx, tty, ttz = xstart, min(ystart, yend), zstart
+
+            t = 0.0
+            z = z_prev
+            if profile.tt_z_to_zero_speed is not None:
+                t += zmove(z, profile.tt_z_to_zero_speed)
+                z = 0.0
+            t += max(move_time(ttx - x_prev, profile.tt_xy_speed, accel),
+                     move_time(tty - y_prev, profile.tt_xy_speed, accel)) + inpos_time
+            t += profile.tt_xy_dwell_ms / 1000.0
+            t += sum(stages(z, ttz, profile.tt_z_stages))
+            t += profile.tt_dwell_ms / 1000.0
+            t += zmove(ttz, profile.tt_retract_speed) + profile.tt_retract_dwell_ms / 1000.0
+            x_prev, y_prev, z_prev = ttx, tty, 0.0
+            if profile.tt_xout is not None:
+                t += move_time(profile.tt_xout[0] - ttx, profile.tt_xout[1], accel) + inpos_time
+                x_prev = profile.tt_xout[0]
+            phases["test_touch"] += t + vision_s
+            touches += 1
+
+    total = sum(phases.values())
+    estimate = CycleEstimate(profile.name, len(campaths), touches, phases, total)
+
+    if verbose:
+        print_breakdown(estimate)
+    if shift_hours is not None and total > shift_hours * 3600.0:
+        print(f"[warn] {profile.name} estimate {total / 3600.0:.2f} h exceeds a {shift_hours} h shift")
+
+    return estimate
+
+
+def _hms(seconds):
+    h, rem = divmod(int(round(seconds)), 3600)
+    m, s = divmod(rem, 60)
+    return f"{h:d}:{m:02d}:{s:02d}"
+
+
+def print_breakdown(estimate):
+    """
+    Print a per-phase table of a CycleEstimate.
+    """
+    total = estimate.total_s or 1.0
+    print(f"{estimate.profile}: {estimate.lines} lines, {estimate.test_touches} test touches, "
+          f"total {_hms(estimate.total_s)}")
+    for phase, seconds in estimate.phases.items():
+        if seconds:
+            print(f"  {phase:<14} {_hms(seconds):>10}  {100.0 * seconds / total:5.1f} %")
+
+
+def sweep_cut_job(path, profile=LENS_PROFILE, feedspeeds=(5.0, 10.0, 15.0), lines_per_test_values=(None,),
+                  **kwargs):
+    """
+    Estimate the same job for each feedspeed x lines_per_test combination and print the totals.
+
+    Returns
+    -------
+    list[dict]
+        feedspeed, lines_per_test, total_s and the CycleEstimate, in sweep order.
+    """
+    results = []
+    for feedspeed in feedspeeds:
+        for lines_per_test in lines_per_test_values:
+            est = estimate_cut_job(path, profile=profile, feedspeed=feedspeed,
+                                   lines_per_test=lines_per_test, verbose=False, **kwargs)
+            results.append({"feedspeed": feedspeed, "lines_per_test": lines_per_test,
+                            "total_s": est.total_s, "estimate": est})
+            print(f"feed {feedspeed:6.2f} mm/s | lines_per_test {str(lines_per_test):>5} | "
+                  f"{_hms(est.total_s)} ({est.test_touches} touches)")
+    return results
+
+
+def _mean_line_period(log_path):
+    from wear_model import parse_cutting_log
+
+    times = [t for t, _, _ in parse_cutting_log(log_path)]
+    if len(times) < 2:
+        return None
+    return (times[-1] - times[0]).total_seconds() / (len(times) - 1)
+
+
+def report_bidirectional_savings(path, profile=LENS_PROFILE, forward_log=None, bidirectional_log=None, **kwargs):
+    """
+    Estimated time saved by bidirectional cutting, and the measured saving if the
+    cutting.log of a forward and a bidirectional run are given.
+
+    The measured line period is the mean time between "Finished cutting line" entries, so
+    it includes test touches as they happened in each run.
+
+    Returns
+    -------
+    dict
+        forward_s, bidirectional_s and saved_s estimates for the job, and per-line
+        estimated and (if logs are given) measured periods.
+    """
+    fwd = estimate_cut_job(path, profile=profile, bidirectional=False, verbose=False, **kwargs)
+    bid = estimate_cut_job(path, profile=profile, bidirectional=True, verbose=False, **kwargs)
+    lines = max(1, fwd.lines)
+    report = {
+        "forward_s": fwd.total_s,
+        "bidirectional_s": bid.total_s,
+        "saved_s": fwd.total_s - bid.total_s,
+        "estimated_line_s": (fwd.total_s / lines, bid.total_s / lines),
+        "measured_line_s": None,
+    }
+    print(f"{profile.name}: estimate forward {_hms(fwd.total_s)} | bidirectional {_hms(bid.total_s)} | "
+          f"saved {_hms(report['saved_s'])} ({100.0 * report['saved_s'] / (fwd.total_s or 1.0):.1f} %)")
+
+    if forward_log is not None and bidirectional_log is not None:
+        measured = (_mean_line_period(forward_log), _mean_line_period(bidirectional_log))
+        report["measured_line_s"] = measured
+        if None in measured:
+            print("[warn] a cutting.log has fewer than two finished lines, no measured saving")
+        else:
+            est_saved = report["estimated_line_s"][0] - report["estimated_line_s"][1]
+            print(f"per line: estimated saving {est_saved:.1f} s | measured {measured[0] - measured[1]:.1f} s "
+                  f"(forward {measured[0]:.1f} s, bidirectional {measured[1]:.1f} s)")
+
+    return report
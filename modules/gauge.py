@@ -0,0 +1,233 @@
+import os
+import re
+import time
+import threading
+from collections import deque, namedtuple
+
+import serial
+
+
+GaugeReading = namedtuple("GaugeReading", ["value", "raw", "elapsed"])
+SettledReading = namedtuple("SettledReading", ["value", "raw", "elapsed", "samples", "settled"])
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+
+class GaugeError(RuntimeError):
+    """Gauge replied with an error, or with something that is not a reading."""
+
+
+class GaugeTimeout(GaugeError):
+    """No complete reply arrived before the read timeout."""
+
+
+def parse_gauge_reply(raw):
+    """
+    Parse a gauge reply like "+01.23456" or "MD0,+01.23456" into a float.
+
+    The last number in the reply is the reading (the first can be a channel number).
+    Raises GaugeError for error replies ("ER...") or replies without a number.
+    """
+    text = raw.strip()
+    if not text or text.upper().startswith("ER"):
+        raise GaugeError(f"gauge error reply: {text!r}")
+
+    numbers = _NUMBER.findall(text)
+    if not numbers:
+        raise GaugeError(f"could not parse a reading from gauge reply: {text!r}")
+
+    return float(numbers[-1])
+
+
+class Gauge:
+    """
+    Metrology gauge speaking the RMD0 request/reply protocol over serial.
+
+    The scans used to call ser.read(2048) with a 3 s timeout, which blocks until
+    2048 bytes arrive or the timeout expires, so every point paid close to the full
+    timeout. read() stops at the reply terminator instead.
+
+    Parameters
+    ----------
+    comport : str
+        Serial port (e.g. "COM4", or a pty path for a FakeGauge).
+    baudrate : int
+        Default 9600.
+    timeout : float
+        Seconds to wait for a complete reply before raising GaugeTimeout. Default 1.0.
+    command : bytes
+        Request sent for each reading. Default b"RMD0\\r\\n".
+    terminator : bytes
+        Last byte(s) of a reply. Default b"\\r".
+
+    Example
+    -------
+    with Gauge("COM4") as gauge:
+        reading = gauge.read()
+        print(reading.value, reading.raw)
+    """
+
+    def __init__(self, comport, baudrate=9600, timeout=1.0, command=b"RMD0\r\n", terminator=b"\r"):
+        self.comport = comport
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.command = command
+        self.terminator = terminator
+        self.ser = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def open(self):
+        if self.ser is None:
+            self.ser = serial.Serial(self.comport, self.baudrate, timeout=self.timeout)
+            time.sleep(0.02)
+        return self
+
+    def close(self):
+        if self.ser is not None:
+            self.ser.close()
+            self.ser = None
+
+    def read(self):
+        """
+        Request one reading and return a GaugeReading(value, raw, elapsed).
+
+        raw is the decoded, stripped reply (what the scans write to file),
+        elapsed is the request-to-reply time in seconds.
+        """
+        if self.ser is None:
+            self.open()
+
+        t0 = time.perf_counter()
+        # drop anything left over (e.g. the \n after a previous \r terminator)
+        self.ser.reset_input_buffer()
+        self.ser.write(self.command)
+        reply = self.ser.read_until(self.terminator)
+        elapsed = time.perf_counter() - t0
+
+        if not reply.endswith(self.terminator):
+            raise GaugeTimeout(
+                f"no reply terminator from gauge on {self.comport} after {self.timeout} s (got {reply!r})"
+            )
+
+        raw = reply.decode("utf-8", errors="ignore").strip()
+        return GaugeReading(parse_gauge_reply(raw), raw, elapsed)
+
+    def read_settled(self, n_agree=3, tol=5e-4, max_dwell=None, interval=0.05):
+        """
+        Sample the gauge until n_agree consecutive readings agree within tol.
+
+        Replaces a fixed dwell before a single read: most points settle well before
+        the worst-case dwell, and the cap keeps the old behaviour as the upper bound.
+
+        Parameters
+        ----------
+        n_agree : int
+            Number of consecutive readings whose spread (max - min) must be <= tol.
+        tol : float
+            Allowed spread, in gauge units (mm). Default 0.5 um.
+        max_dwell : float, optional
+            Seconds after which the last reading is returned unsettled. None waits forever.
+        interval : float
+            Seconds between samples. Default 0.05.
+
+        Returns
+        -------
+        SettledReading(value, raw, elapsed, samples, settled)
+            The last reading, the total settle time (s), the number of samples taken
+            and whether the agreement criterion was met.
+        """
+        t0 = time.perf_counter()
+        window = deque(maxlen=max(1, int(n_agree)))
+        samples = 0
+
+        while True:
+            reading = self.read()
+            samples += 1
+            window.append(reading.value)
+            elapsed = time.perf_counter() - t0
+
+            if len(window) == window.maxlen and max(window) - min(window) <= tol:
+                return SettledReading(reading.value, reading.raw, elapsed, samples, True)
+            if max_dwell is not None and elapsed + interval >= max_dwell:
+                return SettledReading(reading.value, reading.raw, elapsed, samples, False)
+            if interval:
+                time.sleep(interval)
+
+
+class FakeGauge:
+    """
+    RMD0 responder on a pseudo-terminal, so the scans can run without hardware.
+
+    Pass fake.port as comport. Replies are "+dd.ddddd\\r\\n" built from values (a
+    callable returning a float, or an iterable of floats), after reply_delay seconds.
+    Linux/macOS only (uses pty).
+
+    Example
+    -------
+    with FakeGauge(values=lambda: 1.25) as fake, Gauge(fake.port) as gauge:
+        assert gauge.read().value == 1.25
+    """
+
+    def __init__(self, values=None, reply_delay=0.0, reply_format="{:+09.5f}"):
+        import pty
+
+        self._master, self._slave = pty.openpty()
+        self.port = os.ttyname(self._slave)
+        self.reply_delay = reply_delay
+        self.reply_format = reply_format
+        self.requests = 0
+
+        if values is None:
+            self._next = lambda: 0.0
+        elif callable(values):
+            self._next = values
+        else:
+            it = iter(values)
+            self._next = lambda: next(it)
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, name="FakeGauge", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _serve(self):
+        buf = b""
+        while not self._stop.is_set():
+            try:
+                chunk = os.read(self._master, 64)
+            except OSError:
+                return
+            buf += chunk
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                if line.strip() == b"RMD0":
+                    self.requests += 1
+                    if self.reply_delay:
+                        time.sleep(self.reply_delay)
+                    try:
+                        reply = self.reply_format.format(self._next())
+                    except StopIteration:
+                        reply = "ER,01"
+                    os.write(self._master, reply.encode() + b"\r\n")
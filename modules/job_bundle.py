@@ -0,0 +1,298 @@
+"""
+Compile a cut job (Master.txt, every .Cam, the test-touch and wear-shift tables) into one
+compressed .npz bundle, validated up front and identified by a content hash.
+
+compile_job reads and checks everything before any motion: a missing cam, a non-increasing
+leader or a Z outside the travel limits fails here with the full list of problems instead of
+at an assert halfway through the job. load_job reads the bundle back (arrays only, no text
+parsing); the JobBundle it returns works like a MasterIndex and can be passed to cutcamming,
+cutalumina and cutlens_segments with bundle=.
+"""
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+import core_utils
+
+
+BUNDLE_VERSION = 1
+
+# soft Z travel limits (mm) the follower values and line starts are checked against;
+# override per machine with compile_job(z_limits=...)
+Z_LIMITS = (-150.0, 0.0)
+
+_ARRAY_KEYS = ("camnums", "master", "offsets", "leader", "follower", "tt_index", "tt_xyz",
+               "ws_camnum", "ws_shift")
+
+
+class JobValidationError(ValueError):
+    """
+    Raised by compile_job when the job files fail validation. problems holds every
+    failure found, one string each.
+    """
+
+    def __init__(self, problems):
+        self.problems = list(problems)
+        super().__init__(f"{len(self.problems)} problem(s) in cut job:\n  " + "\n  ".join(self.problems))
+
+
+def _digest(arrays, meta):
+    h = hashlib.sha256()
+    h.update(json.dumps({k: meta[k] for k in ("version", "cuttype")}, sort_keys=True).encode())
+    for key in _ARRAY_KEYS:
+        a = np.ascontiguousarray(arrays[key])
+        h.update(key.encode())
+        h.update(str(a.dtype).encode())
+        h.update(str(a.shape).encode())
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+
+def check_cam(camnum, leader, follower, zstart=None, z_limits=Z_LIMITS, safelift=None):
+    """
+    Problems with one cam table, as a list of strings (empty if it is fine).
+
+    Checks: at least two points, leader strictly increasing, zstart (and zstart + safelift)
+    and the cut Z inside z_limits. The cut loops cam with RelativePosition, so the cut Z is
+    zstart + follower; without zstart the follower is not checked against z_limits.
+    """
+    name = f"cam {int(camnum):04d}"
+    problems = []
+    if leader.size < 2:
+        return [f"{name}: {leader.size} points"]
+    if leader.size != follower.size:
+        problems.append(f"{name}: {leader.size} leader values, {follower.size} follower values")
+        return problems
+
+    steps = np.diff(leader)
+    bad = np.flatnonzero(steps <= 0)
+    if bad.size:
+        k = int(bad[0])
+        problems.append(f"{name}: leader not increasing at point {k + 1} "
+                        f"({leader[k]:.4f} -> {leader[k + 1]:.4f}, {bad.size} such steps)")
+
+    zlo, zhi = z_limits
+    if zstart is not None:
+        zmin, zmax = zstart + float(follower.min()), zstart + float(follower.max())
+        if zmin < zlo or zmax > zhi:
+            problems.append(f"{name}: cut Z (zstart + follower) {zmin:.4f}..{zmax:.4f} outside {zlo}..{zhi}")
+        if not zlo <= zstart <= zhi:
+            problems.append(f"{name}: zstart {zstart:.4f} outside {zlo}..{zhi}")
+        if safelift is not None and zstart + safelift > zhi:
+            problems.append(f"{name}: retract to zstart + safelift = {zstart + safelift:.4f} above {zhi}")
+    return problems
+
+
+def compile_job(path, out_path=None, cuttype="", testtouchpath=None, wearshiftpath=None,
+                lines_per_test=None, z_limits=Z_LIMITS, safelift=None):
+    """
+    Validate a cut job and write it as a compressed bundle.
+
+    Parameters
+    ----------
+    path : str or Path
+        Folder holding Master.txt and the CutCam{cuttype}####.Cam files (for
+        cutlens_segments that is path/spindle/CutCamming{cuttype}).
+    out_path : str or Path, optional
+        Bundle file. Defaults to path/CutJob{cuttype}.npz.
+    testtouchpath, wearshiftpath : str or Path, optional
+        Test touch and wear shift tables to include.
+    lines_per_test : int, optional
+        If given with testtouchpath, every test touch the job will need must be in the table.
+    z_limits : tuple
+        (min, max) Z the cams and line starts must stay inside.
+    safelift : float, optional
+        Retract height; zstart + safelift must also be inside z_limits.
+
+    Returns
+    -------
+    JobBundle
+        The bundle as load_job would return it.
+
+    Raises
+    ------
+    JobValidationError
+        Listing every problem found; nothing is written.
+    """
+    t0 = time.perf_counter()
+    path = Path(path)
+    master_path = path / "Master.txt"
+    if not master_path.is_file():
+        raise JobValidationError([f"Master file not found: {master_path}"])
+
+    index = core_utils.MasterIndex(master_path, base_path=path, cuttype=cuttype)
+    problems = []
+    if len(index) == 0:
+        problems.append(f"{master_path}: no cut lines")
+
+    camnums, master, leaders, followers = [], [], [], []
+    seen = set()
+    for row in index:
+        if row.camnum in seen:
+            problems.append(f"cam {row.camnum:04d}: listed twice in Master.txt (row {row.row_idx})")
+            continue
+        seen.add(row.camnum)
+        if not row.cam_path.is_file():
+            problems.append(f"cam {row.camnum:04d}: missing {row.cam_path}")
+            continue
+        leader, follower = core_utils.load_cutcam_arrays(row.cam_path)
+        leader = np.asarray(leader, dtype=np.float64)
+        follower = np.asarray(follower, dtype=np.float64)
+        problems += check_cam(row.camnum, leader, follower, row.zstart, z_limits=z_limits, safelift=safelift)
+        if leader.size and (leader[0] > min(row.ystart, row.yend) or leader[-1] < max(row.ystart, row.yend)):
+            print(f"[warn] cam {row.camnum:04d}: cam covers Y {leader[0]:.3f}..{leader[-1]:.3f}, "
+                  f"line runs {row.ystart:.3f}..{row.yend:.3f}")
+        camnums.append(row.camnum)
+        master.append((row.x, row.ystart, row.zstart, row.yend))
+        leaders.append(leader)
+        followers.append(follower)
+
+    tt_table, ws_table = {}, {}
+    if testtouchpath is not None:
+        if not Path(testtouchpath).is_file():
+            problems.append(f"test touch table not found: {testtouchpath}")
+        else:
+            tt_table = core_utils.load_test_touch_table(testtouchpath)
+            for k, (_, _, z) in tt_table.items():
+                if not z_limits[0] <= z <= z_limits[1]:
+                    problems.append(f"test touch {k}: Z {z:.4f} outside {z_limits[0]}..{z_limits[1]}")
+            if lines_per_test:
+                for camnum in camnums:
+                    if (camnum + 1) % lines_per_test == 0 and camnum // lines_per_test not in tt_table:
+                        problems.append(f"cam {camnum:04d}: test touch {camnum // lines_per_test} "
+                                        f"not in {testtouchpath}")
+    if wearshiftpath is not None:
+        if not Path(wearshiftpath).is_file():
+            problems.append(f"wear shift table not found: {wearshiftpath}")
+        else:
+            ws_table = core_utils.load_wear_shift_table(wearshiftpath)
+
+    if problems:
+        raise JobValidationError(problems)
+
+    sizes = np.array([a.size for a in leaders], dtype=np.int64)
+    arrays = {
+        "camnums": np.array(camnums, dtype=np.int64),
+        "master": np.array(master, dtype=np.float64).reshape(-1, 4),
+        "offsets": np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+        "leader": np.concatenate(leaders) if leaders else np.empty(0),
+        "follower": np.concatenate(followers) if followers else np.empty(0),
+        "tt_index": np.array(sorted(tt_table), dtype=np.int64),
+        "tt_xyz": np.array([tt_table[k] for k in sorted(tt_table)], dtype=np.float64).reshape(-1, 3),
+        "ws_camnum": np.array(sorted(ws_table), dtype=np.int64),
+        "ws_shift": np.array([ws_table[k] for k in sorted(ws_table)], dtype=np.float64),
+    }
+    meta = {
+        "version": BUNDLE_VERSION,
+        "cuttype": cuttype,
+        "source": str(path),
+        "testtouchpath": str(testtouchpath) if testtouchpath is not None else None,
+        "wearshiftpath": str(wearshiftpath) if wearshiftpath is not None else None,
+        "z_limits": list(z_limits),
+        "compiled": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    meta["digest"] = _digest(arrays, meta)
+
+    out_path = Path(out_path) if out_path is not None else path / f"CutJob{cuttype}.npz"
+    # np.savez appends .npz to names without it; write a temp file and rename into place
+    tmp_path = out_path.with_name(out_path.stem + ".tmp.npz")
+    np.savez_compressed(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+    tmp_path.replace(out_path)
+
+    print(f"compiled {len(camnums)} lines, {arrays['leader'].size} cam points -> {out_path} "
+          f"({out_path.stat().st_size / 1e6:.1f} MB, sha256 {meta['digest'][:12]}) "
+          f"in {time.perf_counter() - t0:.2f} s")
+    return JobBundle(out_path, arrays, meta)
+
+
+def load_job(bundle_path, verify=True, base_path=None):
+    """
+    Load a bundle written by compile_job.
+
+    Parameters
+    ----------
+    verify : bool
+        Recompute the content hash and raise ValueError if it does not match.
+    base_path : str or Path, optional
+        Where the cam files live for the paths the bundle reports (JobBundle.campaths).
+        Defaults to the folder the job was compiled from.
+    """
+    bundle_path = Path(bundle_path)
+    with np.load(bundle_path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"{bundle_path}: bundle version {meta.get('version')}, expected {BUNDLE_VERSION}")
+        arrays = {key: data[key] for key in _ARRAY_KEYS}
+
+    if verify:
+        digest = _digest(arrays, meta)
+        if digest != meta["digest"]:
+            raise ValueError(f"{bundle_path}: content hash mismatch ({digest[:12]} != {meta['digest'][:12]})")
+    return JobBundle(bundle_path, arrays, meta, base_path=base_path)
+
+
+class JobBundle(core_utils.MasterIndex):
+    """
+    A loaded job bundle. Indexes lines like MasterIndex (row, coords, cam_path, iteration in
+    Master.txt order) and serves the cam tables from memory.
+
+    Attributes
+    ----------
+    digest : str
+        sha256 of the bundle contents; the same job files always give the same digest.
+    campaths : list[Path]
+        Cam paths in cut order, as iter_cam_paths_from_master returns them.
+    test_touch_table, wear_shift_table : dict
+        As load_test_touch_table and load_wear_shift_table return them (empty if not bundled).
+    """
+
+    def __init__(self, bundle_path, arrays, meta, base_path=None):
+        self.bundle_path = Path(bundle_path)
+        self.meta = meta
+        self.digest = meta["digest"]
+        self.cuttype = meta["cuttype"]
+        self.base_path = Path(base_path) if base_path is not None else Path(meta["source"])
+        self.master_path = self.base_path / "Master.txt"
+
+        self._offsets = arrays["offsets"]
+        self._leader = arrays["leader"]
+        self._follower = arrays["follower"]
+
+        self._rows = []
+        self._by_camnum = {}
+        self._slot = {}
+        for k, (camnum, (x, ystart, zstart, yend)) in enumerate(zip(arrays["camnums"].tolist(),
+                                                                    arrays["master"].tolist())):
+            cam_path = self.base_path / f"CutCam{self.cuttype}{camnum:04d}.Cam"
+            row = core_utils.MasterRow(k, camnum, x, ystart, zstart, yend, cam_path)
+            self._rows.append(row)
+            self._by_camnum[camnum] = row
+            self._slot[camnum] = k
+
+        self.campaths = [row.cam_path for row in self._rows]
+        self.test_touch_table = {int(k): tuple(v) for k, v in zip(arrays["tt_index"].tolist(),
+                                                                   arrays["tt_xyz"].tolist())}
+        self.wear_shift_table = dict(zip(arrays["ws_camnum"].tolist(), arrays["ws_shift"].tolist()))
+
+    def cam_arrays(self, camnum_or_path):
+        """
+        (leader, follower) arrays of one line, by cam number or cam path; drop-in for
+        core_utils.load_cutcam_arrays.
+        """
+        if isinstance(camnum_or_path, (str, Path)) and not str(camnum_or_path).isdigit():
+            camnum = int(Path(camnum_or_path).stem[-4:])
+        else:
+            camnum = int(camnum_or_path)
+        try:
+            k = self._slot[camnum]
+        except KeyError:
+            raise ValueError(f"camnum {camnum:04d} not in bundle {self.bundle_path}") from None
+        a, b = self._offsets[k], self._offsets[k + 1]
+        return self._leader[a:b], self._follower[a:b]
+
+    def __repr__(self):
+        return (f"JobBundle({self.bundle_path.name}: {len(self)} lines, "
+                f"{self._leader.size} cam points, sha256 {self.digest[:12]})")
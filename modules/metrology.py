@@ -3,37 +3,231 @@ import time
 import numpy as np
 import matplotlib.pyplot as plt
 import math
+import logging
 
 import os
-import serial
 from pathlib import Path
 from pprint import pprint
+from collections import namedtuple
 
-def _get_program_pos(controller, axes=("X","Y","ZA")):
+from gauge import Gauge
+import scan_planner
+
+def _get_program_pos(controller, axes=("X","Y","ZA"), poller=None):
+    sample = poller.latest() if poller is not None else None
+    if sample is not None and all(ax in sample.program_position for ax in axes):
+        return {ax: sample.program_position[ax] for ax in axes}
     cfg = a1.StatusItemConfiguration()
     for ax in axes:
         cfg.axis.add(a1.AxisStatusItem.ProgramPosition, ax)
     res = controller.runtime.status.get_status_items(cfg)
     return {ax: res.axis.get(a1.AxisStatusItem.ProgramPosition, ax).value for ax in axes}
 
+Move = namedtuple("Move", ["axes", "positions", "speeds", "delay_ms"], defaults=[0])
+Move.__doc__ = """Absolute move queued as moveabsolute + waitforinposition + waitformotiondone (+ movedelay)."""
+
+ScanPoint = namedtuple(
+    "ScanPoint",
+    ["x", "y", "depth", "approach", "drop_speed", "depth_delay_ms", "settle_ms", "retract"],
+    defaults=[3.0, 0, 0, None],
+)
+ScanPoint.__doc__ = """
+One metrology point for run_point_scan.
+
+x, y, depth : pose the probe must be at when the gauge is sampled
+approach : list[Move] queued before the drop (XY traverse, safe Z, ...)
+drop_speed : probe axis speed down to depth
+depth_delay_ms : movedelay queued at depth, holds the queue after the drop
+settle_ms : time at depth before sampling the gauge, counted from arrival (the cap in
+    settle mode). depth_delay_ms runs in the same window and is not added on top.
+retract : Move queued once the gauge has been read
+"""
+
+SettleConfig = namedtuple("SettleConfig", ["n_agree", "tol", "max_dwell_ms", "interval_ms"],
+                          defaults=[3, 5e-4, None, 50])
+SettleConfig.__doc__ = """
+Settle detection for run_point_scan: instead of sleeping settle_ms, sample the gauge
+until n_agree consecutive readings agree within tol (mm). max_dwell_ms caps the wait
+(None uses each point's settle_ms, so a point never waits longer than the fixed dwell).
+"""
+
+
+def _queue_move(command_queue, move):
+    motion = command_queue.commands.motion
+    motion.moveabsolute(axes=list(move.axes), positions=list(move.positions), speeds=list(move.speeds))
+    motion.waitforinposition(list(move.axes))
+    motion.waitformotiondone(list(move.axes))
+    if move.delay_ms:
+        motion.movedelay(list(move.axes), move.delay_ms)
+
+
+def _queue_point(command_queue, point, probe_axis):
+    for move in point.approach:
+        _queue_move(command_queue, move)
+    _queue_move(command_queue, Move([probe_axis], [point.depth], [point.drop_speed], point.depth_delay_ms))
+
+
+def _settle_logger(outname):
+    log_path = Path(outname).with_name(Path(outname).stem + "_settle.log")
+    logger = logging.getLogger("settle_logger")
+    logger.setLevel(logging.INFO)
+
+    # clear old handlers so you don't get duplicates
+    if logger.hasHandlers():
+        logger.handlers.clear()
+
+    fh = logging.FileHandler(log_path)
+    fh.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
+    logger.addHandler(fh)
+    return logger
+
+
+def run_point_scan(command_queue, controller, points, outname, comport="COM4",
+                   poller=None, probe_axis="ZA", park=(), settle=None):
+    """
+    Generic pipelined metrology scan.
+
+    For each point the approach and drop are queued, Python waits until the pose is
+    at (x, y, depth), waits settle_ms (or until the gauge settles, see settle) and
+    samples the gauge. Only then are the
+    retract and the next point's approach and drop queued, so the probe is always
+    at depth when it is sampled. Before the next pose check Python waits for the
+    retract pose, so two identical consecutive points cannot be sampled while the
+    probe is still on its way up. Writing and printing the point overlaps with that
+    motion, and there is no wait_for_empty barrier between points.
+
+    If sampling fails (GaugeError, GaugeTimeout, ...) the current point's retract is
+    queued (ZA to 0 if it has none) and the queue is ended before the error propagates.
+
+    Parameters
+    ----------
+    command_queue : object
+        Active command queue. It is ended when the scan finishes.
+    controller : object
+        Automation1 controller instance.
+    points : iterable[ScanPoint]
+        Point generator; consumed lazily, one point ahead.
+    outname : str
+        Output file, one "X, Y, Z, sensor" line per point.
+    comport : str
+        Gauge serial port.
+    poller : StatusPoller, optional
+        Shared status stream for the pose checks.
+    probe_axis : str
+        Gauge axis. Default "ZA".
+    park : list[Move]
+        Moves queued after the last point.
+    settle : SettleConfig, optional
+        Enable settle detection. Per-point settle times are logged to
+        <outname stem>_settle.log next to the output file.
+    """
+    logger = _settle_logger(outname) if settle is not None else None
+    settle_times = []
+    unsettled = 0
+
+    gauge = Gauge(comport).open()
+    f = open(outname, "w")
+    point = None
+    ended = False
+    try:
+        points = iter(points)
+        point = next(points, None)
+        if point is not None:
+            _queue_point(command_queue, point, probe_axis)
+
+        retract = None
+        while point is not None:
+            if retract is not None:
+                # the previous retract must be done before the pose check, otherwise an
+                # identical next point passes at once and is sampled during the retract
+                _wait_for_pose(controller, dict(zip(retract.axes, retract.positions)),
+                               poller=poller, axes=tuple(retract.axes))
+            pos = _wait_for_pose(
+                controller, {"X": point.x, "Y": point.y, probe_axis: point.depth},
+                poller=poller, axes=("X", "Y", probe_axis),
+            )
+            if settle is None:
+                # the queued depth_delay_ms also runs from arrival: it overlaps the dwell, not adds to it
+                dwell_ms = max(point.settle_ms, point.depth_delay_ms)
+                if dwell_ms:
+                    time.sleep(dwell_ms / 1000.0)
+                sensor = gauge.read().raw
+            else:
+                max_dwell_ms = point.settle_ms if settle.max_dwell_ms is None else settle.max_dwell_ms
+                reading = gauge.read_settled(
+                    n_agree=settle.n_agree, tol=settle.tol,
+                    max_dwell=max_dwell_ms / 1000.0, interval=settle.interval_ms / 1000.0,
+                )
+                sensor = reading.raw
+                settle_times.append(reading.elapsed)
+                unsettled += not reading.settled
+                logger.info(
+                    f"{pos['X']}, {pos['Y']}, {pos[probe_axis]}: settle {reading.elapsed * 1000:.0f} ms, "
+                    f"{reading.samples} samples"
+                    + ("" if reading.settled else f", not settled within {max_dwell_ms} ms")
+                )
+
+            # probe has been sampled: let the controller retract and travel to the next point
+            retract = point.retract
+            if retract is not None:
+                _queue_move(command_queue, retract)
+            next_point = next(points, None)
+            if next_point is not None:
+                _queue_point(command_queue, next_point, probe_axis)
+
+            line = f"{pos['X']}, {pos['Y']}, {pos[probe_axis]}, {sensor}\n"
+            f.write(line)
+            f.flush()
+            print(line.strip())
+
+            point = next_point
+
+        for move in park:
+            _queue_move(command_queue, move)
+        command_queue.wait_for_empty()
+        controller.runtime.commands.end_command_queue(command_queue)
+        ended = True
+
+        if settle_times:
+            summary = (f"settle: {len(settle_times)} points, mean {1000 * sum(settle_times) / len(settle_times):.0f} ms, "
+                       f"max {1000 * max(settle_times):.0f} ms, {unsettled} hit the cap")
+            logger.info(summary)
+            print(summary)
+    finally:
+        if not ended:
+            # do not leave the probe at depth with the queue open
+            try:
+                if point is not None:
+                    _queue_move(command_queue, point.retract or Move([probe_axis], [0.0], [7.0]))
+                command_queue.wait_for_empty()
+                controller.runtime.commands.end_command_queue(command_queue)
+            except Exception as e:
+                print(f"[warn] could not retract and end the queue: {e}")
+        f.close()
+        gauge.close()
+        # close logging file because windows computer:
+        if logger is not None:
+            for handler in logger.handlers[:]:
+                handler.close()
+                logger.removeHandler(handler)
+
+
 def testtouch_metrology(
     command_queue, controller,
     numX, lengthX,
     Xstart, Ystart, Zstart, Zdrop,
-    outname, comport="COM4"):
+    outname, comport="COM4", poller=None, settle=None):
     """
     Y is fixed. For each X:
-      - Move to (X, Ystart, Zstart), wait
-      - Move ZA to depth, wait
-      - wait_for_empty()  <-- ensure we're *actually* at depth
-      - pause()           <-- freeze queue; nothing else will move
-      - read sensor + positions; print
-      - resume(); retract to Zstart; wait; wait_for_empty()
+      - Move to (X, Ystart, Zstart), dwell
+      - Move ZA to depth
+      - wait until the pose is at depth, dwell, read sensor + positions
+      - retract to Zstart while the point is written (run_point_scan)
     """
     if os.path.exists(outname):
         print("Metrology File Present, Stopping Motion")
         return
-        
+
     # Step size along X
     incX = 0.0 if numX <= 1 else (lengthX / (numX - 1))
     depth = Zstart - Zdrop
@@ -43,94 +237,43 @@ def testtouch_metrology(
         command_queue.commands.motion.enable(ax)
 
     # Move to start (Y fixed)
-    command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[0.0], speeds=[11.0])
-    command_queue.commands.motion.waitformotiondone(["ZA"])
-    command_queue.commands.motion.waitforinposition(["ZA"])
-    command_queue.commands.motion.moveabsolute(axes=["X"], positions=[Xstart], speeds=[15.0])
-    command_queue.commands.motion.waitformotiondone(["X"])
-    command_queue.commands.motion.waitforinposition(["X"])
-    command_queue.commands.motion.moveabsolute(axes=["Y"], positions=[Ystart], speeds=[15.0])
-    command_queue.commands.motion.waitformotiondone(["Y"])
-    command_queue.commands.motion.waitforinposition(["Y"])
-
+    _queue_move(command_queue, Move(["ZA"], [0.0], [11.0]))
+    _queue_move(command_queue, Move(["X"], [Xstart], [15.0]))
+    _queue_move(command_queue, Move(["Y"], [Ystart], [15.0]))
     command_queue.wait_for_empty()  # arrive at start pose
 
-    # Open gauge once
-    ser = serial.Serial(comport, 9600, timeout=3)
-    time.sleep(0.02)
-    f = open(outname, "w")
-    for ix in range(numX):
-        x = Xstart + incX * ix
+    def points():
+        for ix in range(numX):
+            x = Xstart + incX * ix
+            yield ScanPoint(
+                x, Ystart, depth,
+                approach=[Move(["X", "Y", "ZA"], [x, Ystart, Zstart], [10.0, 10.0, 8.0], 1_000)],
+                settle_ms=1_000,
+                retract=Move(["ZA"], [Zstart], [8.0], 1_000),
+            )
 
-        # 1) Row point: (x, Ystart, Zstart) and wait
-        command_queue.commands.motion.moveabsolute(
-            axes=["X", "Y", "ZA"], positions=[x, Ystart, Zstart], speeds=[10.0, 10.0, 8.0]
-        )
-        command_queue.commands.motion.waitformotiondone(["X", "Y", "ZA"])
-        command_queue.commands.motion.waitforinposition(["X", "Y", "ZA"])
-        command_queue.commands.motion.movedelay("ZA", 1_000)
-        
-
-        # 2) Drop to depth and dwell so we can pause and query data points
-        
-        command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[depth], speeds=[3.0])
-        command_queue.commands.motion.waitforinposition(["ZA"])
-        command_queue.commands.motion.waitformotiondone(["ZA"])
-       
-        while True:
-            pos = _get_program_pos(controller, axes=("X","Y","ZA"))
-            if _within(pos['X'], x, 1e-3) and _within(pos['ZA'], depth, 1e-3):
-                 # dwell in position
-                 command_queue.commands.motion.movedelay(["X", "Y", "ZA"], 1_000)
-                 
-                 ser.write(b"RMD0\r\n") 
-                 sensor = ser.read(2048).decode("utf-8", errors="ignore").strip()
-                 line = f"{pos['X']}, {pos['Y']}, {pos['ZA']}, {sensor}\n"
-                 f.write(line)
-                 f.flush()
-                 print(f"{pos['X']}, {pos['Y']}, {pos['ZA']}, {sensor}")
-                 break   
-            else:
-                time.sleep(0.1)  
-                
-        command_queue.commands.motion.movedelay("ZA", 500)
-        command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[Zstart], speeds=[8.0])
-        command_queue.commands.motion.waitformotiondone(["ZA"])
-        command_queue.commands.motion.waitforinposition(["ZA"])
-        command_queue.commands.motion.movedelay("X", 1_000)
-        command_queue.wait_for_empty()  # ensure retract finished before next X
-        
-    # Park and end
-    command_queue.commands.motion.movedelay("ZA", 500)
-    command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[0.0], speeds=[8.0])
-    command_queue.commands.motion.waitformotiondone(["ZA"])
-    command_queue.commands.motion.waitforinposition(["ZA"])
+    run_point_scan(command_queue, controller, points(), outname, comport=comport, poller=poller, settle=settle,
+                   park=[Move(["ZA"], [0.0], [8.0])])
 
-    command_queue.wait_for_empty()
-    controller.runtime.commands.end_command_queue(command_queue)
-    f.close()
-    ser.close()
- 
 
 def dressing_metrology(
     command_queue, controller,
     numX, lengthX, numY, lengthY,
     Xstart, Ystart, Zstart, Zdrop,
-    outname, comport="COM4"  # set >0 if you want a hardware dwell at depth
+    outname, comport="COM4",
+    poller=None, settle=None
 ):
     """
     For each X and Y:
-      - Move to (X, Y, Zstart), wait
-      - Move ZA to depth, wait
-      - wait_for_empty()  <-- ensure we're *actually* at depth
-      - movedelay()           <-- freeze; nothing else will move
-      - read sensor + positions; write to file
-      - resume(); retract to Zstart; wait; wait_for_empty()
+      - Move to (X, Zstart) at the start of each row, then Y, dwell
+      - Move ZA to depth
+      - wait until the pose is at depth, dwell, read sensor + positions; write to file
+      - retract to Zstart while the point is written (run_point_scan)
     """
     if os.path.exists(outname):
         print("Metrology File Present, Stopping Motion")
         return
-    
+
     # Step size along X
     incX = 0.0 if numX <= 1 else (lengthX / (numX - 1))
     incY = 0.0 if numY <= 1 else (lengthY / (numY - 1))
@@ -140,79 +283,32 @@ def dressing_metrology(
     for ax in ["X", "Y", "ZA"]:
         command_queue.commands.motion.enable(ax)
 
-    # Move to start (Y fixed)
-    command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[0.0], speeds=[8.0])
-    command_queue.commands.motion.waitformotiondone(["ZA"])
-    command_queue.commands.motion.waitforinposition(["ZA"])
-    command_queue.commands.motion.moveabsolute(axes=["X"], positions=[Xstart], speeds=[15.0])
-    command_queue.commands.motion.waitformotiondone(["X"])
-    command_queue.commands.motion.waitforinposition(["X"])
-    command_queue.commands.motion.moveabsolute(axes=["Y"], positions=[Ystart], speeds=[15.0])
-    command_queue.commands.motion.waitformotiondone(["Y"])
-    command_queue.commands.motion.waitforinposition(["Y"])
-
+    # Move to start
+    _queue_move(command_queue, Move(["ZA"], [0.0], [8.0]))
+    _queue_move(command_queue, Move(["X"], [Xstart], [15.0]))
+    _queue_move(command_queue, Move(["Y"], [Ystart], [15.0]))
     command_queue.wait_for_empty()  # arrive at start pose
 
-    # Open gauge once
-    ser = serial.Serial(comport, 9600, timeout=3)
-    time.sleep(0.02)
-    f = open(outname, "w")
-    for ix in range(numX):
-        x = Xstart + incX * ix
+    def points():
+        for ix in range(numX):
+            x = Xstart + incX * ix
+            row_start = Move(["X", "ZA"], [x, Zstart], [10.0, 6.0], 500)
 
-        command_queue.commands.motion.moveabsolute(
-            axes=["X", "ZA"], positions=[x, Zstart], speeds=[10.0, 6.0]
-        )
-        command_queue.commands.motion.waitformotiondone(["X", "ZA"])
-        command_queue.commands.motion.waitforinposition(["X", "ZA"])
-        command_queue.commands.motion.movedelay("ZA", 500)
-        
-        for iy in range(numY):
-            y = Ystart + incY * iy
-            
-            # 2) Drop to depth and dwell so we can pause and query data points
-            command_queue.commands.motion.moveabsolute(axes=["Y"], positions=[y], speeds=[10.0])
-            command_queue.commands.motion.waitforinposition(["Y"])
-            command_queue.commands.motion.waitformotiondone(["Y"])
-            command_queue.commands.motion.movedelay("Y", 250) # can change to 1s
-
-            
-            command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[depth], speeds=[3.0])
-            command_queue.commands.motion.waitforinposition(["ZA"])
-            command_queue.commands.motion.waitformotiondone(["ZA"])
-
-            
-            while True:
-                pos = _get_program_pos(controller, axes=("X","Y","ZA"))
-                if _within(pos['X'], x, 1e-3) and _within(pos['Y'], y, 1e-3) and _within(pos['ZA'], depth, 1e-3): 
-                    command_queue.commands.motion.movedelay(["X", "Y", "ZA"], 500)
-                    ser.write(b"RMD0\r\n")  # replace with your gauge's measurement command if needed
-                    sensor = ser.read(2048).decode("utf-8").strip()
-                    line = f"{pos['X']}, {pos['Y']}, {pos['ZA']}, {sensor}\n"
-                    f.write(line)
-                    f.flush()
-                    print(f"{pos['ZA']}, {sensor}")
-                    #time.sleep(2)
-                    break   # exit while, go to next X
-                else:
-                    time.sleep(0.1)  # tiny delay before re-check
-                    
-            command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[Zstart], speeds=[7.0])
-            command_queue.commands.motion.waitformotiondone(["ZA"])
-            command_queue.commands.motion.waitforinposition(["ZA"])
-            command_queue.commands.motion.movedelay(["X", "Y"], 500)
-            command_queue.wait_for_empty()  # ensure retract finished before next X
-        
-    # Park and end
-    command_queue.commands.motion.movedelay("ZA", 500)
-    command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[0.0], speeds=[8.0])
-    command_queue.commands.motion.waitformotiondone(["ZA"])
-    command_queue.commands.motion.waitforinposition(["ZA"])
+            for iy in range(numY):
+                y = Ystart + incY * iy
+                approach = [Move(["Y"], [y], [10.0], 250)]  # can change to 1s
+                if iy == 0:
+                    approach.insert(0, row_start)
 
-    command_queue.wait_for_empty()
-    controller.runtime.commands.end_command_queue(command_queue)
-    f.close()
-    ser.close()
+                yield ScanPoint(
+                    x, y, depth,
+                    approach=approach,
+                    settle_ms=500,
+                    retract=Move(["ZA"], [Zstart], [7.0], 500),
+                )
+
+    run_point_scan(command_queue, controller, points(), outname, comport=comport, poller=poller, settle=settle,
+                   park=[Move(["ZA"], [0.0], [8.0])])
 
 
 def lens_metrology(
@@ -220,11 +316,18 @@ def lens_metrology(
     circlediam, xstep, ystep,
     Xcenter, Ycenter,
     Zstart,outname, comport="COM4",
-    dwell_ms_at_depth=500  # ms, mirrors Aerobasic lifterSettleTime
+    dwell_ms_at_depth=500,  # ms, mirrors Aerobasic lifterSettleTime
+    poller=None,
+    order="raster",
+    settle=None
 ):
     """
     Lens metrology: raster scan across a circular aperture.
-    Mirrors Aerobasic structure but uses dressing_metrology-style sequencing.
+    Mirrors Aerobasic structure; points are run through run_point_scan.
+
+    order is "raster" (Aerobasic order), "serpentine" or "nearest", see scan_planner.
+    settle=SettleConfig() samples the gauge until it settles instead of the fixed
+    1.5 s dwell (same for the other scans).
 
     Output: X, Y, ZA, sensor
     """
@@ -233,120 +336,63 @@ def lens_metrology(
         print("Metrology File Present, stopping to avoid overwrite")
         return
 
-    R = circlediam / 2.0
-
     # Enable axes
     for ax in ["X", "Y", "ZA"]:
         command_queue.commands.motion.enable(ax)
 
     # Safe starting pose
-    command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[0], speeds=[10.0])
-    command_queue.commands.motion.waitforinposition(["ZA"])
-    command_queue.commands.motion.moveabsolute(axes=["X","Y"], positions=[Xcenter, Ycenter], speeds=[15.0,15.0])
-    command_queue.commands.motion.waitforinposition(["X","Y"])
+    _queue_move(command_queue, Move(["ZA"], [0], [10.0]))
+    _queue_move(command_queue, Move(["X", "Y"], [Xcenter, Ycenter], [15.0, 15.0]))
     command_queue.wait_for_empty()
 
-    # Open gauge + file
-    ser = serial.Serial(comport, 9600, timeout=3)
-    time.sleep(0.02)
-    f = open(outname, "w")
-
-    # --- X raster loop ---
-    xstart = Xcenter - R
-    xstop  = Xcenter + R
-    xval   = xstart
-
-    while xval < xstop:  # "<" to mirror Aerobasic undershoot
-        arg = R**2 - (xval - Xcenter)**2
-        if arg < 0:
-            xval += xstep
-            continue
-
-        yspan  = math.sqrt(arg)
-        ystart = Ycenter - yspan
-        ystop  = Ycenter + yspan
-        yval   = ystart
+    # Circular grid with Aerobasic "<" undershoot, in the requested order
+    xs, ys = scan_planner.plan_circular_scan(
+        circlediam, xstep, ystep, Xcenter, Ycenter,
+        order=order, start=(Xcenter, Ycenter), speeds=(25.0, 25.0),
+    )
+    est = scan_planner.estimate_travel(
+        xs, ys, start=(Xcenter, Ycenter), speeds=(25.0, 25.0),
+        per_point_s=(200 + dwell_ms_at_depth + 1_500 + 500) / 1000.0,
+    )
+    print(f"Lens scan ({order}): {est['points']} points, {est['distance_mm']:.1f} mm XY travel, "
+          f"~{est['total_s'] / 60:.1f} min excluding Z moves")
 
-        # --- Y loop ---
-        while yval < ystop:  # "<" like Aerobasic
+    def points():
+        for xval, yval in zip(xs.tolist(), ys.tolist()):
             # Conditional zdrop
             # TODO: the 29 and the 260 can be parameters that change. the 18 can be constant
-            # TODO: right now, hardcoded in 
+            # TODO: right now, hardcoded in
             r_eff = 2 * math.sqrt((xval - Xcenter)**2 + (yval - Ycenter)**2)
             zdrop = 18.0 if r_eff < 260.0 else 30.0
             depth = Zstart - zdrop
 
-            #print(f"({xval:.3f}, {yval:.3f}) zdrop={zdrop}")
-
-            # Move XY
-            command_queue.commands.motion.moveabsolute(
-                axes=["X","Y"], positions=[xval, yval], speeds=[25.0,25.0]
+            yield ScanPoint(
+                xval, yval, depth,
+                approach=[
+                    Move(["X", "Y"], [xval, yval], [25.0, 25.0], 200),  # move XY
+                    Move(["ZA"], [Zstart], [7.0]),                        # Zstart safe position
+                ],
+                depth_delay_ms=dwell_ms_at_depth,
+                settle_ms=1_500,
+                retract=Move(["ZA"], [Zstart], [7.0], 500),
             )
-            command_queue.commands.motion.waitforinposition(["X","Y"])
-            command_queue.commands.motion.movedelay(["X","Y"], 200)
-
-            # Drop to Zstart safe position
-            command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[Zstart], speeds=[7.0])
-            command_queue.commands.motion.waitforinposition(["ZA"])
-            command_queue.commands.motion.waitformotiondone(["ZA"])
-
-            # Drop to depth
-            command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[depth], speeds=[3.0])
-            command_queue.commands.motion.waitforinposition(["ZA"])
-            command_queue.commands.motion.waitformotiondone(["ZA"])
-
-            # dwell at depth
-            command_queue.commands.motion.movedelay(["X","Y","ZA"], dwell_ms_at_depth)
-
-            # Read gauge
-            ser.write(b"RMD0\r\n")
-            sensor = ser.read(2048).decode("utf-8", errors="ignore").strip()
-
-            # while True pose check (like dressing/plane)
-            while True:
-                pos = _get_program_pos(controller, axes=("X","Y","ZA"))
-                if (_within(pos['X'], xval, 1e-3) and
-                    _within(pos['Y'], yval, 1e-3) and
-                    _within(pos['ZA'], depth, 1e-3)):
-                    command_queue.commands.motion.movedelay(["X", "Y", "ZA"], 1500)
-                    ser.write(b"RMD0\r\n")
-                    sensor = ser.read(2048).decode("utf-8", errors="ignore").strip()
-                    line = f"{pos['X']}, {pos['Y']}, {pos['ZA']}, {sensor}\n"
-                    f.write(line)
-                    f.flush()
-                    print(f"{pos['ZA']}, {sensor}")
-                    break
-                else:
-                    time.sleep(0.1)
-
-            # Retract
-            command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[Zstart], speeds=[7.0])
-            command_queue.commands.motion.waitforinposition(["ZA"])
-            command_queue.commands.motion.movedelay(["X","Y"], 500)
-            command_queue.wait_for_empty()
-
-            yval += ystep
-
-        xval += xstep
-
-    # Park and end
-    command_queue.commands.motion.movedelay("ZA", 1000)
-    command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[Zstart], speeds=[8.0])
-    command_queue.commands.motion.waitforinposition(["ZA"])
-    command_queue.wait_for_empty()
-    controller.runtime.commands.end_command_queue(command_queue)
-    f.close()
-    ser.close()
+
+    run_point_scan(command_queue, controller, points(), outname, comport=comport, poller=poller, settle=settle,
+                   park=[Move(["ZA"], [Zstart], [8.0])])
 
 
 def flange_metrology(
     command_queue, controller,
     numpoints, circlediam, Xcenter, Ycenter,
     Zstart, Zdrop,
-    outname, comport="COM4"):
+    outname, comport="COM4", poller=None, start_pose=None, settle=None):
     """
     Flange metrology: evenly spaced points around a circle.
-    Mirrors Aerobasic structure, but uses dressing_metrology-style sequencing.
+    Mirrors Aerobasic structure; points are run through run_point_scan.
+
+    start_pose=None starts at theta=0 after moving to the center (Aerobasic order).
+    start_pose=(x, y), or "current" for the present X/Y program position, starts at
+    the nearest flange point instead and skips the move to the center.
 
     Output: X, Y, ZA, sensor
     """
@@ -354,84 +400,37 @@ def flange_metrology(
         print("Metrology File Present, stopping to avoid overwrite")
         return
 
-    R = circlediam / 2.0
     depth = Zstart - Zdrop
 
+    if isinstance(start_pose, str) and start_pose == "current":
+        pos = _get_program_pos(controller, axes=("X", "Y"), poller=poller)
+        start_pose = (pos["X"], pos["Y"])
+
     # Safe starting pose
-    command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[0], speeds=[8.0])
-    command_queue.commands.motion.waitforinposition(["ZA"])
-    command_queue.commands.motion.moveabsolute(axes=["X","Y"], positions=[Xcenter, Ycenter], speeds=[25.0, 25.0])
-    command_queue.commands.motion.waitforinposition(["X","Y"])
+    _queue_move(command_queue, Move(["ZA"], [0], [8.0]))
+    if start_pose is None:
+        _queue_move(command_queue, Move(["X", "Y"], [Xcenter, Ycenter], [25.0, 25.0]))
     command_queue.wait_for_empty()
 
-    # Open gauge + file
-    ser = serial.Serial(comport, 9600, timeout=3)
-    time.sleep(0.02)
-    f = open(outname, "w")
-
-    # Loop over flange points
-    dt = 2.0 * math.pi / numpoints
-    for pointnum in range(numpoints):
-        theta = pointnum * dt
-        xval = Xcenter + R * math.cos(theta)
-        yval = Ycenter + R * math.sin(theta)
-
-        print(f"Point {pointnum}: {xval:.3f}, {yval:.3f}")
-
-        # Move XY 
-        command_queue.commands.motion.moveabsolute(axes=["X","Y"], positions=[xval, yval], speeds=[25.0, 25.0])
-        command_queue.commands.motion.waitforinposition(["X","Y"])
-        command_queue.commands.motion.movedelay(["X","Y"], 200)
-
-        # Drop to Zstart
-        command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[Zstart], speeds=[8.0])
-        command_queue.commands.motion.waitforinposition(["ZA"])
-        command_queue.commands.motion.waitformotiondone(["ZA"])
-
-        # Drop to depth
-        command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[depth], speeds=[3.0])
-        command_queue.commands.motion.waitforinposition(["ZA"])
-        command_queue.commands.motion.waitformotiondone(["ZA"])
-
-        
-        
-        # while True check (like dressing_metrology)
-        while True:
-            pos = _get_program_pos(controller, axes=("X","Y","ZA"))
-            if (_within(pos['X'], xval, 1e-3) and
-                _within(pos['Y'], yval, 1e-3) and
-                _within(pos['ZA'], depth, 1e-3)):
-
-                # dwell at depth
-                command_queue.commands.motion.movedelay(["X","Y","ZA"], 1000)
-
-                # read probe 
-                ser.write(b"RMD0\r\n")
-                sensor = ser.read(2048).decode("utf-8", errors="ignore").strip()
-                line = f"{pos['X']}, {pos['Y']}, {pos['ZA']}, {sensor}\n"
-
-                # write to file
-                f.write(line)
-                f.flush()
-                print(f"{pos['ZA']}, {sensor}")
-                break
-            else:
-                time.sleep(0.1)
-
-        # Retract
-        command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[Zstart], speeds=[7.0])
-        command_queue.commands.motion.waitforinposition(["ZA"])
-        command_queue.commands.motion.movedelay(["X","Y"], 300)
-        command_queue.wait_for_empty()
+    xs, ys = scan_planner.flange_points(numpoints, circlediam, Xcenter, Ycenter, start=start_pose)
+
+    def points():
+        # Loop over flange points
+        for pointnum, (xval, yval) in enumerate(zip(xs.tolist(), ys.tolist())):
+            print(f"Point {pointnum}: {xval:.3f}, {yval:.3f}")
+
+            yield ScanPoint(
+                xval, yval, depth,
+                approach=[
+                    Move(["X", "Y"], [xval, yval], [25.0, 25.0], 200),
+                    Move(["ZA"], [Zstart], [8.0]),
+                ],
+                settle_ms=1_000,
+                retract=Move(["ZA"], [Zstart], [7.0], 300),
+            )
 
-    # Park and end
-    command_queue.commands.motion.movedelay("ZA", 1000)
-    command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[0], speeds=[8.0])
-    command_queue.commands.motion.waitforinposition(["ZA"])
-    command_queue.wait_for_empty()
-    controller.runtime.commands.end_command_queue(command_queue)
-    f.close()
-    ser.close()
+    run_point_scan(command_queue, controller, points(), outname, comport=comport, poller=poller, settle=settle,
+                   park=[Move(["ZA"], [0], [8.0])])
 
 
 def plane_metrology(
@@ -439,123 +438,88 @@ def plane_metrology(
     xstep, ystep, circlediam, Xcenter, Ycenter,
     Zstart, moveheight, Zdrop,
     outname, comport="COM4",
-    dwell_ms_at_depth=4000  # ms dwell at depth
+    dwell_ms_at_depth=4000,  # ms dwell at depth
+    poller=None,
+    order="raster",
+    settle=None,
+    xy_dwell_ms=2000,
 ):
     """
     Plane metrology ported from Aerobasic structure.
     Outer loop: X values from xstart to xstop in steps of xstep
     For each X, compute Ystart/Ystop from circle equation
     Inner loop: Y values from ystart to ystop in steps of ystep
-    At each (x,y), perform dressing_metrology-style move/dwell/read/retract.
+    Each (x,y) is a move/dwell/read/retract point run through run_point_scan.
+    order="serpentine" or "nearest" reorders the same points, see scan_planner.
+    With settle set, settle detection replaces the 500 ms dwell at depth only. The
+    xy_dwell_ms dwell after the XY move (default 2000 ms) stays: the gauge is not in
+    contact yet, so it cannot see the gantry ringing, and dropping onto a ringing
+    gantry side-loads the probe. Reduce xy_dwell_ms explicitly if the stage allows it.
 
     Output file format: X, Y, ZA, sensor
     """
-    import os, time, math, serial
-
     if os.path.exists(outname):
         print("Metrology File Present, Stopping Motion")
         return
 
-    R = circlediam / 2.0
     depth = moveheight - Zdrop
 
     # Safe starting pose
-    command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[Zstart], speeds=[8.0])
-    command_queue.commands.motion.waitforinposition(["ZA"])
-    command_queue.commands.motion.moveabsolute(axes=["X"], positions=[Xcenter], speeds=[15.0])
-    command_queue.commands.motion.waitforinposition(["X"])
-    command_queue.commands.motion.moveabsolute(axes=["Y"], positions=[Ycenter], speeds=[15.0])
-    command_queue.commands.motion.waitforinposition(["Y"])
+    _queue_move(command_queue, Move(["ZA"], [Zstart], [8.0]))
+    _queue_move(command_queue, Move(["X"], [Xcenter], [15.0]))
+    _queue_move(command_queue, Move(["Y"], [Ycenter], [15.0]))
     command_queue.wait_for_empty()
 
-    # Open gauge + file
-    ser = serial.Serial(comport, 9600, timeout=3)
-    time.sleep(0.02)
-    f = open(outname, "w")
-
-    # --- X raster loop ---
-    xstart = Xcenter - R
-    xstop  = Xcenter + R
-    xval   = xstart
-
-    while xval < xstop:  # "<" to mimic Aerobasic undershoot
-        # Compute Y span for this X
-        arg = R**2 - (xval - Xcenter)**2
-        if arg < 0:
-            # Outside circle, skip this column
-            xval += xstep
-            continue
-
-        yspan  = math.sqrt(arg)
-        ystart = Ycenter - yspan
-        ystop  = Ycenter + yspan
-        yval   = ystart
-
-        # --- Y loop ---
-        while yval < ystop:  # "<" to mimic Aerobasic undershoot
-            print(xval, yval)
-
-            # Move XY at safe height
-            command_queue.commands.motion.moveabsolute(
-                axes=["X","Y"], positions=[xval, yval], speeds=[10.0, 12.0]
+    # Circular grid with Aerobasic "<" undershoot, in the requested order
+    xs, ys = scan_planner.plan_circular_scan(
+        circlediam, xstep, ystep, Xcenter, Ycenter,
+        order=order, start=(Xcenter, Ycenter), speeds=(10.0, 12.0),
+    )
+    est = scan_planner.estimate_travel(
+        xs, ys, start=(Xcenter, Ycenter), speeds=(10.0, 12.0),
+        per_point_s=(xy_dwell_ms + 500 + 1000) / 1000.0,
+    )
+    print(f"Plane scan ({order}): {est['points']} points, {est['distance_mm']:.1f} mm XY travel, "
+          f"~{est['total_s'] / 60:.1f} min excluding Z moves")
+
+    def points():
+        for xval, yval in zip(xs.tolist(), ys.tolist()):
+            yield ScanPoint(
+                xval, yval, depth,
+                approach=[Move(["X", "Y"], [xval, yval], [10.0, 12.0], xy_dwell_ms)],  # XY at safe height
+                settle_ms=500,
+                retract=Move(["ZA"], [moveheight], [7.0], 1000),
             )
-            command_queue.commands.motion.waitforinposition(["X","Y"])
-            command_queue.commands.motion.movedelay(["X","Y"], 2000)
-
-            # Drop to depth
-            command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[depth], speeds=[3.0])
-            command_queue.commands.motion.waitforinposition(["ZA"])
-
-            
-            while True:
-                pos = _get_program_pos(controller, axes=("X","Y","ZA"))
-                if (_within(pos['X'], xval, 1e-3) and
-                    _within(pos['Y'], yval, 1e-3) and
-                    _within(pos['ZA'], depth, 1e-3)):
-
-                    # dwell at depth
-                    command_queue.commands.motion.movedelay(["X","Y","ZA"], 500)
-
-                    # read probe 
-                    ser.write(b"RMD0\r\n")
-                    sensor = ser.read(2048).decode("utf-8", errors="ignore").strip()
-                    line = f"{pos['X']}, {pos['Y']}, {pos['ZA']}, {sensor}\n"
-
-                    # write to file
-                    f.write(line)
-                    f.flush()
-                    print(f"{pos['ZA']}, {sensor}")
-                    break
-                else:
-                    time.sleep(0.1)
-
-
-            # Retract
-            command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[moveheight], speeds=[7.0])
-            command_queue.commands.motion.waitforinposition(["ZA"])
-            command_queue.commands.motion.movedelay(["X","Y"], 1000)
-            command_queue.wait_for_empty()
-
-            yval += ystep
-        # end while yval
-
-        xval += xstep
-    # end while xval
-
-    # Park and end
-    command_queue.commands.motion.movedelay("ZA", 1000)
-    command_queue.commands.motion.moveabsolute(axes=["ZA"], positions=[Zstart], speeds=[8.0])
-    command_queue.commands.motion.waitforinposition(["ZA"])
-    command_queue.wait_for_empty()
-    controller.runtime.commands.end_command_queue(command_queue)
-    f.close()
-    ser.close()
+
+    run_point_scan(command_queue, controller, points(), outname, comport=comport, poller=poller, settle=settle,
+                   park=[Move(["ZA"], [Zstart], [8.0])])
 
 
 def _within(v, target, tol=1e-3):
     return abs(v - target) <= tol
 
 
+def _wait_for_pose(controller, targets, poller=None, tol=1e-3, axes=("X","Y","ZA")):
+    """
+    Block until the ProgramPosition of every axis in targets is within tol.
+
+    targets is a dict like {"X": x, "ZA": depth}. With a StatusPoller the wait reads the
+    shared sample stream; without one it polls the controller every 0.1 s as before.
+    Returns the pose of all axes.
+    """
+    if poller is not None:
+        sample = poller.wait_until(
+            lambda s: all(_within(s.program_position[ax], t, tol) for ax, t in targets.items())
+        )
+        return {ax: sample.program_position[ax] for ax in axes}
+
+    while True:
+        pos = _get_program_pos(controller, axes=axes)
+        if all(_within(pos[ax], t, tol) for ax, t in targets.items()):
+            return pos
+        time.sleep(0.1)
+
+
 def enable_metrologyprobe(controller, state, output_num=0, axis="X", execution_task_index=1):
     """
     Enable or disable the metrology probe, then confirm state.
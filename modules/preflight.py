@@ -0,0 +1,174 @@
+"""
+Pre-flight check of every cam file in a cut job, parsed and checked on a process pool.
+
+Each worker parses its cams through core_utils.load_cutcam_arrays, which writes the .npy
+sidecar next to each .Cam file, so the cutting loop afterwards only memory-maps the parsed
+tables (the cache is warm for the run).
+"""
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import core_utils
+from job_bundle import Z_LIMITS, check_cam
+
+
+CamCheck = namedtuple("CamCheck", ["job", "camnum", "cam_path", "points", "problems"])
+CamCheck.__doc__ = """
+Result of checking one cam file. job is the folder holding its Master.txt; problems is a
+list of strings (empty if the cam passed).
+"""
+
+PreflightReport = namedtuple("PreflightReport", ["jobs", "checks", "problems", "seconds", "report_path"])
+
+
+def find_job_dirs(root):
+    """
+    root itself if it holds a Master.txt, otherwise every folder under root that does
+    (e.g. one CutCamming folder per rotation), sorted.
+    """
+    root = Path(root)
+    if (root / "Master.txt").is_file():
+        return [root]
+    return sorted(p.parent for p in root.rglob("Master.txt"))
+
+
+def check_cam_file(job, camnum, cam_path, ystart, zstart, yend, safelift=None, z_limits=Z_LIMITS,
+                   continuity_tol=0.05, min_points=2):
+    """
+    Parse one cam file (warming its sidecar cache) and check it against its Master.txt row.
+
+    The cut loops cam with RelativePosition, so the cut Z is zstart + follower. Checks that
+    the file exists and has at least min_points points, that the leader is strictly
+    increasing, that zstart + follower stays inside z_limits and below the retract height
+    (follower < safelift), and (continuity_tol not None) that the follower at ystart is
+    within continuity_tol of 0, so engaging the cam at the plunge height does not step Z.
+    This holds for bidirectional jobs too: core_utils.line_table shifts a reversed line's
+    table to 0 at yend and plunges to zstart + z_entry, so its entry never steps Z.
+
+    Returns
+    -------
+    CamCheck
+    """
+    cam_path = Path(cam_path)
+    if not cam_path.is_file():
+        return CamCheck(str(job), camnum, str(cam_path), 0, [f"cam {camnum:04d}: missing {cam_path}"])
+
+    try:
+        leader, follower = core_utils.load_cutcam_arrays(cam_path)
+    except (OSError, ValueError) as e:
+        return CamCheck(str(job), camnum, str(cam_path), 0, [f"cam {camnum:04d}: could not parse: {e}"])
+    leader = np.asarray(leader)
+    follower = np.asarray(follower)
+
+    problems = []
+    if leader.size < min_points:
+        problems.append(f"cam {camnum:04d}: {leader.size} points, expected at least {min_points}")
+    else:
+        problems += check_cam(camnum, leader, follower, zstart, z_limits=z_limits, safelift=safelift)
+        if safelift is not None and follower.max() >= safelift:
+            problems.append(f"cam {camnum:04d}: cam Z reaches zstart + {follower.max():.4f}, "
+                            f"at or above the retract height zstart + {safelift:.4f}")
+        if continuity_tol is not None and leader[0] <= ystart <= leader[-1]:
+            z_at_start = float(np.interp(ystart, leader, follower))
+            if abs(z_at_start) > continuity_tol:
+                problems.append(f"cam {camnum:04d}: cam offset at ystart {ystart:.4f} is {z_at_start:.4f}, "
+                                f"engaging it steps Z away from the plunge height")
+        if leader[0] > min(ystart, yend) or leader[-1] < max(ystart, yend):
+            problems.append(f"cam {camnum:04d}: cam covers Y {leader[0]:.4f}..{leader[-1]:.4f}, "
+                            f"line runs {ystart:.4f}..{yend:.4f}")
+
+    return CamCheck(str(job), camnum, str(cam_path), int(leader.size), problems)
+
+
+def _check_task(task):
+    # top-level so it can be sent to worker processes
+    args, kwargs = task
+    return check_cam_file(*args, **kwargs)
+
+
+def preflight(root, cuttype="", safelift=None, z_limits=Z_LIMITS, continuity_tol=0.05, min_points=2,
+              max_workers=None, chunksize=8, report_path=None):
+    """
+    Check every cam of every job under root on a process pool and write one report.
+
+    Parameters
+    ----------
+    root : str or Path
+        A job folder (holding Master.txt) or a folder of them, e.g. one per rotation.
+    cuttype : str
+        Cut type in the cam file names, CutCam{cuttype}####.Cam.
+    safelift, z_limits, continuity_tol, min_points :
+        See check_cam_file.
+    max_workers : int, optional
+        Worker processes (default os.cpu_count()). 1 runs everything in this process.
+    report_path : str or Path, optional
+        Where to write the report. Defaults to root/preflight_report.txt.
+
+    Returns
+    -------
+    PreflightReport(jobs, checks, problems, seconds, report_path)
+        checks is a list of CamCheck in job and Master.txt order; problems is every
+        problem string, Master.txt problems first.
+    """
+    t0 = time.perf_counter()
+    root = Path(root)
+    jobs = find_job_dirs(root)
+    if not jobs:
+        raise FileNotFoundError(f"no Master.txt found under {root}")
+
+    problems = []
+    tasks = []
+    kwargs = {"safelift": safelift, "z_limits": z_limits, "continuity_tol": continuity_tol,
+              "min_points": min_points}
+    for job in jobs:
+        index = core_utils.MasterIndex(job / "Master.txt", base_path=job, cuttype=cuttype)
+        if len(index) == 0:
+            problems.append(f"{job}: Master.txt has no cut lines")
+        seen = set()
+        for row in index:
+            if row.camnum in seen:
+                problems.append(f"{job}: cam {row.camnum:04d} listed twice in Master.txt")
+                continue
+            seen.add(row.camnum)
+            tasks.append(((job, row.camnum, row.cam_path, row.ystart, row.zstart, row.yend), kwargs))
+
+    if max_workers == 1:
+        checks = [_check_task(task) for task in tasks]
+    else:
+        workers = min(max_workers or os.cpu_count() or 1, max(1, len(tasks)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            checks = list(pool.map(_check_task, tasks, chunksize=chunksize))
+
+    for check in checks:
+        problems += [f"{check.job}: {p}" for p in check.problems]
+    seconds = time.perf_counter() - t0
+
+    report_path = Path(report_path) if report_path is not None else root / "preflight_report.txt"
+    points = sum(c.points for c in checks)
+    lines = [
+        f"preflight {time.strftime('%Y-%m-%d %H:%M:%S')} | root {root} | cuttype '{cuttype}'",
+        f"{len(jobs)} job folder(s), {len(checks)} cams, {points} cam points, "
+        f"{len(problems)} problem(s), {seconds:.1f} s",
+        "",
+    ]
+    for job in jobs:
+        job_checks = [c for c in checks if c.job == str(job)]
+        bad = sum(1 for c in job_checks if c.problems)
+        lines.append(f"{job}: {len(job_checks)} cams, {bad} with problems")
+    lines.append("")
+    lines += problems if problems else ["all cams passed"]
+    report_path.write_text("\n".join(lines) + "\n")
+
+    print(f"preflight: {len(checks)} cams in {len(jobs)} job folder(s) checked in {seconds:.1f} s, "
+          f"{len(problems)} problem(s); report {report_path}")
+    for p in problems[:20]:
+        print(f"[warn] {p}")
+    if len(problems) > 20:
+        print(f"[warn] ... {len(problems) - 20} more in {report_path}")
+
+    return PreflightReport(jobs, checks, problems, seconds, report_path)
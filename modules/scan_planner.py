@@ -0,0 +1,213 @@
+import math
+
+import numpy as np
+
+
+ORDERS = ("raster", "serpentine", "nearest")
+
+
+def _undershoot_range(start, stop, step):
+    """
+    Values start, start+step, ... while value < stop, accumulated the way the
+    Aerobasic/Python `while val < stop: val += step` loops do (same rounding).
+    """
+    if step <= 0:
+        raise ValueError(f"step must be > 0, got {step}")
+    n = max(0, int(math.ceil((stop - start) / step))) + 2
+    steps = np.full(n, float(step))
+    steps[0] = float(start)
+    vals = np.add.accumulate(steps)
+    # the loop stops at the first value >= stop
+    keep = np.logical_and.accumulate(vals < stop)
+    return vals[keep]
+
+
+def circular_grid(circlediam, xstep, ystep, Xcenter, Ycenter):
+    """
+    Raster grid over a circular aperture, in the order lens/plane metrology visit it.
+
+    X columns run from Xcenter - R while x < Xcenter + R; in each column Y runs from
+    Ycenter - yspan while y < Ycenter + yspan. Columns outside the circle are skipped.
+
+    Returns
+    -------
+    xs, ys : np.ndarray
+        Point coordinates, legacy raster order.
+    cols : np.ndarray[int]
+        Column number of each point (0 for the first non-empty column).
+    """
+    R = circlediam / 2.0
+    xvals = _undershoot_range(Xcenter - R, Xcenter + R, xstep)
+
+    xs, ys, cols = [], [], []
+    col = 0
+    for xval in xvals:
+        arg = R**2 - (xval - Xcenter)**2
+        if arg < 0:
+            continue
+        yspan = math.sqrt(arg)
+        yvals = _undershoot_range(Ycenter - yspan, Ycenter + yspan, ystep)
+        if yvals.size == 0:
+            continue
+        xs.append(np.full(yvals.size, xval))
+        ys.append(yvals)
+        cols.append(np.full(yvals.size, col))
+        col += 1
+
+    if not xs:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=int)
+    return np.concatenate(xs), np.concatenate(ys), np.concatenate(cols)
+
+
+def move_times(xs, ys, start=None, speeds=(25.0, 25.0)):
+    """
+    Time (s) of each XY move, starting from start (x, y) if given.
+
+    X and Y are commanded with their own speeds in one moveabsolute, so a move
+    takes as long as its slower axis. Acceleration is ignored.
+    """
+    x = np.asarray(xs, dtype=float)
+    y = np.asarray(ys, dtype=float)
+    if start is not None:
+        x = np.concatenate([[start[0]], x])
+        y = np.concatenate([[start[1]], y])
+    return np.maximum(np.abs(np.diff(x)) / speeds[0], np.abs(np.diff(y)) / speeds[1])
+
+
+def nearest_neighbour_order(xs, ys, start=None, speeds=(25.0, 25.0)):
+    """
+    Greedy nearest-neighbour tour (by XY move time) through all points.
+
+    Starts at the point closest to start, or at the first point if start is None.
+    O(N^2), fine for the few thousand points of a metrology raster.
+    """
+    x = np.asarray(xs, dtype=float)
+    y = np.asarray(ys, dtype=float)
+    n = x.size
+    if n == 0:
+        return np.empty(0, dtype=int)
+
+    def cost(px, py):
+        return np.maximum(np.abs(x - px) / speeds[0], np.abs(y - py) / speeds[1])
+
+    visited = np.zeros(n, dtype=bool)
+    order = np.empty(n, dtype=int)
+    current = 0 if start is None else int(np.argmin(cost(*start)))
+    for k in range(n):
+        order[k] = current
+        visited[current] = True
+        if k == n - 1:
+            break
+        d = cost(x[current], y[current])
+        d[visited] = np.inf
+        current = int(np.argmin(d))
+    return order
+
+
+def order_points(xs, ys, cols, order="raster", start=None, speeds=(25.0, 25.0)):
+    """
+    Index array putting circular_grid points in the requested visiting order.
+
+    Parameters
+    ----------
+    order : str
+        "raster" (legacy: every column bottom to top), "serpentine" (alternate
+        columns run top to bottom, no full-diameter return traverse) or "nearest"
+        (greedy nearest-neighbour tour from start).
+    start : tuple, optional
+        (x, y) the probe starts from; only used by "nearest".
+    """
+    n = len(xs)
+    if order == "raster":
+        return np.arange(n)
+    if order == "serpentine":
+        cols = np.asarray(cols)
+        idx = np.arange(n)
+        # reverse every odd column, keep column order
+        key_y = np.where(cols % 2 == 1, -idx, idx)
+        return np.lexsort((key_y, cols))
+    if order == "nearest":
+        return nearest_neighbour_order(xs, ys, start=start, speeds=speeds)
+    raise ValueError(f"unknown order {order!r}, expected one of {ORDERS}")
+
+
+def plan_circular_scan(circlediam, xstep, ystep, Xcenter, Ycenter, order="raster",
+                       start=None, speeds=(25.0, 25.0)):
+    """
+    Build and order the circular-aperture grid used by lens_metrology and plane_metrology.
+
+    Returns
+    -------
+    xs, ys : np.ndarray
+        Point coordinates in visiting order.
+    """
+    xs, ys, cols = circular_grid(circlediam, xstep, ystep, Xcenter, Ycenter)
+    idx = order_points(xs, ys, cols, order=order, start=start, speeds=speeds)
+    return xs[idx], ys[idx]
+
+
+def flange_points(numpoints, circlediam, Xcenter, Ycenter, start=None):
+    """
+    Evenly spaced points around a circle, as flange_metrology visits them.
+
+    With start=None the scan begins at theta=0 (legacy). With start=(x, y) it begins
+    at the point nearest start and continues in the same (counter-clockwise) direction.
+
+    Returns
+    -------
+    xs, ys : np.ndarray
+    """
+    R = circlediam / 2.0
+    theta = np.arange(numpoints) * (2.0 * math.pi / numpoints)
+    xs = Xcenter + R * np.cos(theta)
+    ys = Ycenter + R * np.sin(theta)
+    if start is not None and numpoints:
+        first = int(np.argmin(np.hypot(xs - start[0], ys - start[1])))
+        xs, ys = np.roll(xs, -first), np.roll(ys, -first)
+    return xs, ys
+
+
+def estimate_travel(xs, ys, start=None, speeds=(25.0, 25.0), per_point_s=0.0):
+    """
+    Pre-run estimate of XY travel for an ordered point list.
+
+    Parameters
+    ----------
+    per_point_s : float
+        Fixed time spent at each point (Z drop/retract, dwells, gauge read).
+
+    Returns
+    -------
+    dict
+        points, distance_mm (XY path length), travel_s (XY moves only) and total_s.
+    """
+    x = np.asarray(xs, dtype=float)
+    y = np.asarray(ys, dtype=float)
+    if start is not None:
+        xp = np.concatenate([[start[0]], x])
+        yp = np.concatenate([[start[1]], y])
+    else:
+        xp, yp = x, y
+    distance = float(np.hypot(np.diff(xp), np.diff(yp)).sum())
+    travel = float(move_times(x, y, start=start, speeds=speeds).sum())
+    return {
+        "points": int(x.size),
+        "distance_mm": distance,
+        "travel_s": travel,
+        "total_s": travel + per_point_s * x.size,
+    }
+
+
+def compare_orders(circlediam, xstep, ystep, Xcenter, Ycenter, start=None,
+                   speeds=(25.0, 25.0), orders=ORDERS):
+    """
+    Print and return estimate_travel for each ordering of the same circular grid.
+    """
+    xs, ys, cols = circular_grid(circlediam, xstep, ystep, Xcenter, Ycenter)
+    results = {}
+    for order in orders:
+        idx = order_points(xs, ys, cols, order=order, start=start, speeds=speeds)
+        results[order] = estimate_travel(xs[idx], ys[idx], start=start, speeds=speeds)
+        r = results[order]
+        print(f"{order:>10}: {r['points']} pts | {r['distance_mm']:9.1f} mm | {r['travel_s']:8.1f} s XY travel")
+    return results
@@ -0,0 +1,819 @@
+"""
+In-process stand-in for the subset of the Automation1 Python API used in this package.
+
+Nothing here talks to hardware. Commands are scheduled on a virtual clock with a simple
+kinematic model (trapezoidal moves, in-position time, movedelay, table upload time), so
+cutting and metrology routines can be run, timed and profiled on any machine.
+
+Usage
+-----
+import sim_automation1
+sim_automation1.install()          # before importing core_utils / metrology / calibration
+
+import automation1 as a1           # this is now sim_automation1
+controller = a1.Controller.connect()
+controller.start()
+cq = controller.runtime.commands.begin_command_queue(task=1, command_capacity=64, should_block_if_full=True)
+
+with sim_automation1.virtual_sleep():
+    core_utils.cutcamming(controller, cq, ...)
+
+print(controller.now, controller.profile())
+
+Notes
+-----
+- Time only advances when Python waits: cq.wait_for_empty() jumps to the end of the
+  queue, each get_status_items costs status_latency, a full queue blocks until a slot
+  frees, and inside virtual_sleep() time.sleep(dt) advances the clock by dt and
+  returns at once. Wall-clock calls (time.perf_counter, time.monotonic) are not virtual.
+- Moves on different axes in one moveabsolute are independent (each axis at its own
+  speed), like the uncoordinated moves the routines queue. moveabsolute does not hold
+  the queue; waitformotiondone / waitforinposition / movedelay do.
+- Camming follows the table linearly in the leader's commanded position. RelativePosition
+  output adds the table value to the follower position at cammingon.
+- Queued AeroScript (cq.execute) understands the camming-bit waits built by
+  core_utils.camming_wait_script and the $iglobal set/wait statements built by
+  global_set_script / global_wait_script; anything else is logged and skipped.
+- Queues are scheduled when commands are submitted, so a wait on a global must be
+  submitted after the statement that sets it (on whichever queue); otherwise it faults
+  as waiting forever.
+"""
+import re
+import sys
+import types
+import importlib.util
+import math
+import time
+import enum
+import bisect
+import weakref
+import threading
+import contextlib
+from collections import deque, namedtuple, defaultdict
+from pathlib import Path
+
+import numpy as np
+
+
+CAMMING_MASK = 1 << 16
+DRIVE_ENABLED_MASK = 1 << 0
+
+
+class AxisStatusItem(enum.Enum):
+    ProgramPosition = "ProgramPosition"
+    PositionFeedback = "PositionFeedback"
+    ProgramVelocity = "ProgramVelocity"
+    AxisStatus = "AxisStatus"
+    DriveStatus = "DriveStatus"
+
+
+class CammingUnits(enum.Enum):
+    Primary = "Primary"
+    Counts = "Counts"
+
+
+class CammingInterpolation(enum.Enum):
+    Linear = "Linear"
+    CubicSpline = "CubicSpline"
+
+
+class CammingWrapping(enum.Enum):
+    NoWrap = "NoWrap"
+    Wrap = "Wrap"
+
+
+class CammingSource(enum.Enum):
+    PositionCommand = "PositionCommand"
+    PositionFeedback = "PositionFeedback"
+
+
+class CammingOutput(enum.Enum):
+    RelativePosition = "RelativePosition"
+    AbsolutePosition = "AbsolutePosition"
+
+
+class ControllerException(RuntimeError):
+    """Raised where the real controller would fault the task or reject the call."""
+
+
+SimCommand = namedtuple("SimCommand", ["task", "name", "args", "queued", "start", "end"])
+SimCommand.__doc__ = """
+One executed command: queued/start/end are virtual times (s). For moves, end is when the
+queue moves on (immediately), not when the axis arrives.
+"""
+
+
+# ---------------------------------------------------------------------------------------
+# status items
+# ---------------------------------------------------------------------------------------
+
+class _AxisItemConfiguration:
+    def __init__(self):
+        self.items = []
+
+    def add(self, item, axis):
+        self.items.append((item, axis))
+
+
+class StatusItemConfiguration:
+    def __init__(self):
+        self.axis = _AxisItemConfiguration()
+
+
+_StatusValue = namedtuple("_StatusValue", ["value"])
+
+
+class _AxisResults:
+    def __init__(self, values):
+        self._values = values
+
+    def get(self, item, axis):
+        try:
+            return self._values[(item, axis)]
+        except KeyError:
+            raise ControllerException(f"status item {item} for axis {axis} was not requested") from None
+
+
+class StatusItemResults:
+    def __init__(self, axis_values):
+        self.axis = _AxisResults(axis_values)
+
+
+# ---------------------------------------------------------------------------------------
+# kinematics
+# ---------------------------------------------------------------------------------------
+
+def _trapezoid_time(distance, speed, accel):
+    """
+    Duration of a rest-to-rest move with trapezoidal (or triangular) velocity.
+    """
+    d = abs(distance)
+    if d == 0.0:
+        return 0.0
+    if speed <= 0:
+        raise ControllerException(f"move speed must be > 0, got {speed}")
+    if accel is None or accel <= 0:
+        return d / speed
+    if d >= speed * speed / accel:
+        return d / speed + speed / accel
+    return 2.0 * math.sqrt(d / accel)
+
+
+def _trapezoid_position(p0, p1, speed, accel, tau):
+    d = p1 - p0
+    dist = abs(d)
+    if dist == 0.0:
+        return p1
+    sign = 1.0 if d > 0 else -1.0
+    if accel is None or accel <= 0:
+        return p0 + sign * min(dist, speed * tau)
+
+    total = _trapezoid_time(dist, speed, accel)
+    if tau >= total:
+        return p1
+    if dist >= speed * speed / accel:
+        t_acc, v_peak = speed / accel, speed
+    else:
+        t_acc = total / 2.0
+        v_peak = accel * t_acc
+
+    if tau < t_acc:
+        s = 0.5 * accel * tau * tau
+    elif tau < total - t_acc:
+        s = 0.5 * v_peak * t_acc + v_peak * (tau - t_acc)
+    else:
+        rem = total - tau
+        s = dist - 0.5 * accel * rem * rem
+    return p0 + sign * s
+
+
+class _Move:
+    kind = "move"
+
+    def __init__(self, t0, p0, p1, speed, accel):
+        self.t0, self.p0, self.p1, self.speed, self.accel = t0, p0, p1, speed, accel
+        self.t1 = t0 + _trapezoid_time(p1 - p0, speed, accel)
+
+    def position(self, controller, t):
+        return _trapezoid_position(self.p0, self.p1, self.speed, self.accel, t - self.t0)
+
+
+class _Cam:
+    kind = "cam"
+
+    def __init__(self, t0, leader, table_num, table, base):
+        self.t0, self.t1 = t0, math.inf
+        self.leader, self.table_num, self.table, self.base = leader, table_num, table, base
+
+    def position(self, controller, t):
+        t = min(t, self.t1)
+        lead = controller._axis(self.leader).position(controller, t)
+        return self.base + float(np.interp(lead, self.table.leader, self.table.follower)) + self.table.offset
+
+
+class _Axis:
+    def __init__(self, name, position=0.0, enabled=True):
+        self.name = name
+        self.initial = float(position)
+        self.enabled = enabled
+        self.events = []
+        self._starts = []
+        self.free_at = 0.0
+
+    def add(self, event):
+        idx = bisect.bisect_right(self._starts, event.t0)
+        self._starts.insert(idx, event.t0)
+        self.events.insert(idx, event)
+
+    def event_at(self, t):
+        idx = bisect.bisect_right(self._starts, t) - 1
+        return self.events[idx] if idx >= 0 else None
+
+    def position(self, controller, t):
+        event = self.event_at(t)
+        if event is None:
+            return self.initial
+        return event.position(controller, t)
+
+    def velocity(self, controller, t, dt=1e-4):
+        return (self.position(controller, t) - self.position(controller, max(0.0, t - dt))) / dt
+
+    def camming(self, t):
+        event = self.event_at(t)
+        return event is not None and event.kind == "cam" and t < event.t1
+
+    def active_cam(self):
+        for event in reversed(self.events):
+            if event.kind == "cam" and event.t1 == math.inf:
+                return event
+        return None
+
+
+_Table = namedtuple("_Table", ["leader", "follower", "offset", "units", "interpolation", "wrap"])
+
+
+# ---------------------------------------------------------------------------------------
+# command queue
+# ---------------------------------------------------------------------------------------
+
+def _as_list(axes):
+    return [axes] if isinstance(axes, str) else list(axes)
+
+
+class _MotionCommands:
+    def __init__(self, queue):
+        self._q = queue
+
+    def enable(self, axes, execution_task_index=None):
+        def run(c, t):
+            for ax in _as_list(axes):
+                c._axis(ax).enabled = True
+            return t + c.command_time
+        self._q._submit("enable", {"axes": _as_list(axes)}, run)
+
+    def disable(self, axes, execution_task_index=None):
+        def run(c, t):
+            for ax in _as_list(axes):
+                c._axis(ax).enabled = False
+            return t + c.command_time
+        self._q._submit("disable", {"axes": _as_list(axes)}, run)
+
+    def moveabsolute(self, axes, positions, speeds, execution_task_index=None):
+        axes, positions, speeds = _as_list(axes), list(positions), list(speeds)
+        self._q._submit("moveabsolute", {"axes": axes, "positions": positions, "speeds": speeds},
+                        lambda c, t: c._move(axes, positions, speeds, t, relative=False))
+
+    def moveincremental(self, axes, distances, speeds, execution_task_index=None):
+        axes, distances, speeds = _as_list(axes), list(distances), list(speeds)
+        self._q._submit("moveincremental", {"axes": axes, "distances": distances, "speeds": speeds},
+                        lambda c, t: c._move(axes, distances, speeds, t, relative=True))
+
+    def waitformotiondone(self, axes, execution_task_index=None):
+        axes = _as_list(axes)
+        self._q._submit("waitformotiondone", {"axes": axes},
+                        lambda c, t: max(t, max(c._axis(ax).free_at for ax in axes)) + c.command_time)
+
+    def waitforinposition(self, axes, execution_task_index=None):
+        axes = _as_list(axes)
+        self._q._submit("waitforinposition", {"axes": axes},
+                        lambda c, t: max(t, max(c._axis(ax).free_at for ax in axes) + c.inpos_time))
+
+    def movedelay(self, axes, delay_time, execution_task_index=None):
+        axes = _as_list(axes)
+        self._q._submit("movedelay", {"axes": axes, "delay_time": delay_time},
+                        lambda c, t: t + delay_time / 1000.0)
+
+
+class _IOCommands:
+    def __init__(self, queue):
+        self._q = queue
+
+    def digitaloutputset(self, axis, output_num, value, execution_task_index=None):
+        def run(c, t):
+            c._set_output(axis, output_num, value, t)
+            return t + c.command_time
+        self._q._submit("digitaloutputset", {"axis": axis, "output_num": output_num, "value": value}, run)
+
+
+class _AdvancedMotionCommands:
+    def __init__(self, queue):
+        self._q = queue
+
+    def cammingloadtablefromarray(self, table_num, leader_values, follower_values, num_values,
+                                  units_mode, interpolation_mode, wrap_mode, table_offset=0.0,
+                                  execution_task_index=None):
+        leader = np.asarray(leader_values, dtype=np.float64)[:num_values]
+        follower = np.asarray(follower_values, dtype=np.float64)[:num_values]
+        table = _Table(leader, follower, float(table_offset), units_mode, interpolation_mode, wrap_mode)
+
+        def run(c, t):
+            if table_num in c.tables:
+                raise ControllerException(f"camming table {table_num} is already loaded; free it first")
+            if leader.size < 2 or leader.size != follower.size:
+                raise ControllerException(f"camming table {table_num}: need >= 2 matching leader/follower values")
+            if np.any(np.diff(leader) <= 0):
+                raise ControllerException(f"camming table {table_num}: leader values must be strictly increasing")
+            c.tables[table_num] = table
+            return t + c.command_time + leader.size / c.table_load_rate
+
+        self._q._submit("cammingloadtablefromarray", {"table_num": table_num, "num_values": int(num_values)}, run)
+
+    def cammingfreetable(self, table_num, execution_task_index=None):
+        def run(c, t):
+            for ax in c.axes.values():
+                cam = ax.active_cam()
+                if cam is not None and cam.table_num == table_num:
+                    raise ControllerException(f"camming table {table_num} is in use by {ax.name}")
+            c.tables.pop(table_num, None)
+            return t + c.command_time
+        self._q._submit("cammingfreetable", {"table_num": table_num}, run)
+
+    def cammingon(self, follower_axis, leader_axis, table_num, source, output, execution_task_index=None):
+        def run(c, t):
+            if table_num not in c.tables:
+                raise ControllerException(f"camming table {table_num} is not loaded")
+            follower = c._axis(follower_axis)
+            c._axis(leader_axis)
+            if follower.active_cam() is not None:
+                raise ControllerException(f"{follower_axis} is already camming")
+            t0 = max(t, follower.free_at)
+            base = follower.position(c, t0) if output == CammingOutput.RelativePosition else 0.0
+            follower.add(_Cam(t0, leader_axis, table_num, c.tables[table_num], base))
+            return t0 + c.command_time
+        self._q._submit("cammingon", {"follower_axis": follower_axis, "leader_axis": leader_axis,
+                                      "table_num": table_num}, run)
+
+    def cammingoff(self, follower_axis, execution_task_index=None):
+        def run(c, t):
+            cam = c._axis(follower_axis).active_cam()
+            if cam is not None:
+                cam.t1 = max(t, cam.t0)
+                c._axis(follower_axis).free_at = max(c._axis(follower_axis).free_at, cam.t1)
+            return t + c.command_time
+        self._q._submit("cammingoff", {"follower_axis": follower_axis}, run)
+
+
+class _Commands:
+    def __init__(self, queue):
+        self.motion = _MotionCommands(queue)
+        self.io = _IOCommands(queue)
+        self.advanced_motion = _AdvancedMotionCommands(queue)
+
+
+_GLOBAL_SET = re.compile(r"^\s*\$iglobal\[(\d+)\]\s*=\s*(-?\d+)\s*$")
+_GLOBAL_WAIT = re.compile(r"^\s*wait\(\$iglobal\[(\d+)\]\s*(>=|==)\s*(-?\d+)(?:\s*,\s*(\d+))?\)\s*$")
+_CAMMING_WAIT = re.compile(
+    r"^\s*wait\(\(StatusGetAxisItem\((\w+),\s*AxisStatusItem\.AxisStatus\)\s*&\s*(\d+)\)\s*(==|!=)\s*0"
+    r"(?:\s*,\s*(\d+))?\)\s*$"
+)
+
+
+class CommandQueue:
+    """
+    Simulated command queue for one task. Obtain it from begin_command_queue.
+    """
+
+    def __init__(self, controller, task, command_capacity, should_block_if_full):
+        self._c = controller
+        self.task_index = task
+        self.command_capacity = command_capacity
+        self.should_block_if_full = should_block_if_full
+        self.commands = _Commands(self)
+        self.is_paused = False
+        self.ended = False
+        self.tail = controller.now
+        self._pending = []
+        self._inflight = deque()
+
+    def _free_slots(self):
+        while self._inflight and self._inflight[0] <= self._c.now:
+            self._inflight.popleft()
+        return self.command_capacity - len(self._inflight) - len(self._pending)
+
+    def _submit(self, name, args, run):
+        c = self._c
+        with c._lock:
+            if self.ended:
+                raise ControllerException(f"command queue on task {self.task_index} has been ended")
+            while self._free_slots() <= 0:
+                if not self.should_block_if_full:
+                    raise ControllerException(f"command queue on task {self.task_index} is full")
+                if not self._inflight:
+                    raise ControllerException(f"command queue on task {self.task_index} is full while paused")
+                c.now = self._inflight[0]
+
+            if self.is_paused:
+                self._pending.append((name, args, run, c.now))
+            else:
+                self._run(name, args, run, c.now)
+
+    def _run(self, name, args, run, queued):
+        c = self._c
+        start = max(self.tail, queued)
+        try:
+            end = run(c, start)
+        except ControllerException as exc:
+            c.faults.append((self.task_index, start, name, str(exc)))
+            raise ControllerException(f"task {self.task_index} fault in {name}: {exc}") from None
+        self.tail = end
+        self._inflight.append(end)
+        c.command_log.append(SimCommand(self.task_index, name, args, queued, start, end))
+
+    def pause(self):
+        with self._c._lock:
+            self.is_paused = True
+
+    def resume(self):
+        with self._c._lock:
+            self.is_paused = False
+            pending, self._pending = self._pending, []
+            for name, args, run, _ in pending:
+                self._run(name, args, run, self._c.now)
+
+    def wait_for_empty(self):
+        with self._c._lock:
+            if self.is_paused and self._pending:
+                raise ControllerException(f"wait_for_empty on paused task {self.task_index} would never return")
+            self._c.now = max(self._c.now, self.tail)
+
+    @property
+    def length(self):
+        with self._c._lock:
+            return self.command_capacity - self._free_slots()
+
+    def execute(self, aeroscript):
+        """
+        Queue an AeroScript statement. Camming-bit waits are simulated; others are logged only.
+        """
+        match = _GLOBAL_SET.match(aeroscript)
+        if match is not None:
+            index, value = int(match.group(1)), int(match.group(2))
+
+            def run(c, t):
+                c._set_global(index, value, t)
+                return t + c.command_time
+
+            self._submit("execute", {"script": aeroscript}, run)
+            return
+
+        match = _GLOBAL_WAIT.match(aeroscript)
+        if match is not None:
+            index, compare, value, timeout_ms = match.groups()
+            index, value = int(index), int(value)
+
+            def run(c, t):
+                ready = c._global_time(index, compare, value, t)
+                limit = math.inf if timeout_ms is None else t + int(timeout_ms) / 1000.0
+                if ready is None or ready > limit:
+                    reason = "would wait forever" if timeout_ms is None else f"timed out after {timeout_ms} ms"
+                    raise ControllerException(f"wait for $iglobal[{index}] {compare} {value} {reason}")
+                return ready + c.command_time
+
+            self._submit("execute", {"script": aeroscript}, run)
+            return
+
+        match = _CAMMING_WAIT.match(aeroscript)
+        if match is None:
+            print(f"[warn] sim: AeroScript not interpreted, skipped: {aeroscript!r}")
+            self._submit("execute", {"script": aeroscript}, lambda c, t: t + c.command_time)
+            return
+
+        axis, mask, compare, timeout_ms = match.groups()
+        mask, engaged = int(mask), compare == "!="
+
+        def run(c, t):
+            ready = c._bit_time(axis, mask, engaged, t)
+            limit = math.inf if timeout_ms is None else t + int(timeout_ms) / 1000.0
+            if ready is None or ready > limit:
+                state = "set" if engaged else "clear"
+                reason = "would wait forever" if timeout_ms is None else f"timed out after {timeout_ms} ms"
+                raise ControllerException(f"wait for {axis} status bit {mask} {state} {reason}")
+            return ready + c.command_time
+
+        self._submit("execute", {"script": aeroscript}, run)
+
+
+# ---------------------------------------------------------------------------------------
+# controller
+# ---------------------------------------------------------------------------------------
+
+class _RuntimeIO:
+    def __init__(self, controller):
+        self._c = controller
+
+    def digitaloutputset(self, axis, output_num, value, execution_task_index=1):
+        with self._c._lock:
+            self._c._set_output(axis, output_num, value, self._c.now)
+
+    def digitaloutputget(self, axis, output_num, execution_task_index=1):
+        with self._c._lock:
+            return self._c._get_output(axis, output_num, self._c.now)
+
+
+class _RuntimeCommands:
+    def __init__(self, controller):
+        self._c = controller
+        self.io = _RuntimeIO(controller)
+
+    def begin_command_queue(self, task=1, command_capacity=64, should_block_if_full=True):
+        with self._c._lock:
+            queue = self._c.queues.get(task)
+            if queue is not None and not queue.ended:
+                raise ControllerException(f"a command queue is already running on task {task}")
+            queue = CommandQueue(self._c, task, command_capacity, should_block_if_full)
+            self._c.queues[task] = queue
+            return queue
+
+    def end_command_queue(self, command_queue):
+        with self._c._lock:
+            command_queue.ended = True
+            self._c.command_log.append(SimCommand(command_queue.task_index, "end_command_queue", {},
+                                                  self._c.now, self._c.now, self._c.now))
+
+
+class _RuntimeStatus:
+    def __init__(self, controller):
+        self._c = controller
+
+    def get_status_items(self, config):
+        c = self._c
+        with c._lock:
+            c.now += c.status_latency
+            t = c.now
+            values = {}
+            for item, axis in config.axis.items:
+                ax = c._axis(axis)
+                if item in (AxisStatusItem.ProgramPosition, AxisStatusItem.PositionFeedback):
+                    value = ax.position(c, t)
+                elif item == AxisStatusItem.ProgramVelocity:
+                    value = ax.velocity(c, t)
+                elif item == AxisStatusItem.AxisStatus:
+                    value = CAMMING_MASK if ax.camming(t) else 0
+                elif item == AxisStatusItem.DriveStatus:
+                    value = DRIVE_ENABLED_MASK if ax.enabled else 0
+                else:
+                    raise ControllerException(f"status item {item} is not simulated")
+                values[(item, axis)] = _StatusValue(value)
+            return StatusItemResults(values)
+
+
+class _Runtime:
+    def __init__(self, controller):
+        self.commands = _RuntimeCommands(controller)
+        self.status = _RuntimeStatus(controller)
+
+
+_controllers = weakref.WeakSet()
+
+
+class Controller:
+    """
+    Simulated controller.
+
+    Parameters
+    ----------
+    axes : iterable[str]
+        Axis names. Default X, Y, U, ZA, ZB, ZC, ZD.
+    positions : dict, optional
+        Initial axis positions (default 0).
+    accel : float or dict
+        Acceleration in mm/s^2 (or deg/s^2), one value or per axis. Default 500.
+    inpos_time : float
+        Settling time (s) added by waitforinposition after a move ends. Default 0.02.
+    command_time : float
+        Time (s) the queue spends on each non-motion command. Default 0.5 ms.
+    status_latency : float
+        Virtual time (s) each get_status_items round trip costs. Default 2 ms.
+    table_load_rate : float
+        Camming table values uploaded per second. Default 200000.
+    require_enable : bool
+        If True, moving a disabled axis faults the task. Default False (axes start enabled).
+    """
+
+    def __init__(self, axes=("X", "Y", "U", "ZA", "ZB", "ZC", "ZD"), positions=None, accel=500.0,
+                 inpos_time=0.02, command_time=0.0005, status_latency=0.002, table_load_rate=200_000.0,
+                 require_enable=False):
+        positions = positions or {}
+        self.axes = {ax: _Axis(ax, positions.get(ax, 0.0), enabled=not require_enable) for ax in axes}
+        self.accel = accel
+        self.inpos_time = inpos_time
+        self.command_time = command_time
+        self.status_latency = status_latency
+        self.table_load_rate = table_load_rate
+        self.require_enable = require_enable
+
+        self.now = 0.0
+        self.tables = {}
+        self.queues = {}
+        self.outputs = defaultdict(list)
+        self.globals = defaultdict(list)
+        self.command_log = []
+        self.faults = []
+        self.running = False
+        self._lock = threading.RLock()
+
+        self.runtime = _Runtime(self)
+        _controllers.add(self)
+
+    @classmethod
+    def connect(cls, host=None, **kwargs):
+        return cls(**kwargs)
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def disconnect(self):
+        self.running = False
+
+    # -- clock -----------------------------------------------------------------------
+
+    def advance(self, seconds):
+        with self._lock:
+            self.now += max(0.0, float(seconds))
+
+    # -- internals -------------------------------------------------------------------
+
+    def _axis(self, name):
+        try:
+            return self.axes[name]
+        except KeyError:
+            raise ControllerException(f"unknown axis {name!r}") from None
+
+    def _accel(self, axis):
+        return self.accel.get(axis, 500.0) if isinstance(self.accel, dict) else self.accel
+
+    def _move(self, axes, targets, speeds, t, relative):
+        if not (len(axes) == len(targets) == len(speeds)):
+            raise ControllerException("axes, positions and speeds must have the same length")
+        for name, target, speed in zip(axes, targets, speeds):
+            ax = self._axis(name)
+            if not ax.enabled:
+                raise ControllerException(f"axis {name} is not enabled")
+            t0 = max(t, ax.free_at)
+            if ax.camming(t0):
+                raise ControllerException(f"axis {name} is camming and cannot be commanded")
+            p0 = ax.position(self, t0)
+            move = _Move(t0, p0, p0 + target if relative else float(target), float(speed), self._accel(name))
+            ax.add(move)
+            ax.free_at = move.t1
+        return t + self.command_time
+
+    def _set_output(self, axis, output_num, value, t):
+        events = self.outputs[(axis, output_num)]
+        events.append((t, int(value)))
+        events.sort(key=lambda e: e[0])
+
+    def _get_output(self, axis, output_num, t):
+        value = 0
+        for te, v in self.outputs.get((axis, output_num), []):
+            if te <= t:
+                value = v
+        return value
+
+    def _set_global(self, index, value, t):
+        events = self.globals[index]
+        events.append((t, int(value)))
+        events.sort(key=lambda e: e[0])
+
+    def _global_time(self, index, compare, value, t):
+        """
+        Earliest time >= t at which $iglobal[index] compare value holds, or None.
+        """
+        def holds(v):
+            return v >= value if compare == ">=" else v == value
+
+        current = 0
+        later = []
+        for te, v in self.globals.get(index, []):
+            if te <= t:
+                current = v
+            else:
+                later.append((te, v))
+        if holds(current):
+            return t
+        for te, v in later:
+            if holds(v):
+                return te
+        return None
+
+    def _bit_time(self, axis, mask, engaged, t):
+        """
+        Earliest time >= t at which (AxisStatus & mask) != 0 equals engaged, or None.
+        """
+        ax = self._axis(axis)
+
+        def state(tt):
+            bits = CAMMING_MASK if ax.camming(tt) else 0
+            return (bits & mask) != 0
+
+        if state(t) == engaged:
+            return t
+        for event in ax.events:
+            for edge in (event.t0, event.t1) if event.kind == "cam" else ():
+                if edge >= t and edge != math.inf and state(edge) == engaged:
+                    return edge
+        return None
+
+    # -- reporting -------------------------------------------------------------------
+
+    def position(self, axis, t=None):
+        """
+        Program position of axis at virtual time t (default now).
+        """
+        with self._lock:
+            return self._axis(axis).position(self, self.now if t is None else t)
+
+    def trajectory(self, axis, dt=0.01, t0=0.0, t1=None):
+        """
+        Sampled (t, position) arrays of axis between t0 and t1 (default now).
+        """
+        with self._lock:
+            t1 = self.now if t1 is None else t1
+            ts = np.arange(t0, t1 + dt, dt)
+            return ts, np.array([self._axis(axis).position(self, t) for t in ts])
+
+    def profile(self):
+        """
+        Per-command count and total queue time (s), largest first.
+        """
+        totals = defaultdict(lambda: [0, 0.0])
+        for cmd in self.command_log:
+            totals[cmd.name][0] += 1
+            totals[cmd.name][1] += cmd.end - cmd.start
+        return dict(sorted(((k, tuple(v)) for k, v in totals.items()), key=lambda kv: -kv[1][1]))
+
+
+# ---------------------------------------------------------------------------------------
+# module helpers
+# ---------------------------------------------------------------------------------------
+
+@contextlib.contextmanager
+def virtual_sleep():
+    """
+    Make time.sleep advance every simulated controller's clock instead of blocking.
+
+    The polling loops in this package (pose checks, enable_metrologyprobe, gauge settle)
+    sleep between status queries; inside this context they run instantly and their waits
+    are accounted for in virtual time.
+    """
+    real_sleep = time.sleep
+
+    def _sleep(seconds):
+        for controller in list(_controllers):
+            controller.advance(seconds)
+
+    time.sleep = _sleep
+    try:
+        yield
+    finally:
+        time.sleep = real_sleep
+
+
+def _check_lockfile(path):
+    # as cutcamming does with its lockfile: warn and carry on
+    lockfile = Path(path) / "lockfile.lock"
+    if lockfile.exists():
+        print(f"[warn] {lockfile} exists, this job has already been cut; proceeding (simulated run)")
+
+
+def install():
+    """
+    Register this module as `automation1`, so `import automation1 as a1` gets the simulator.
+
+    Call before importing core_utils, metrology, calibration or status_poller. If the
+    metalens package cannot be imported (off the lab PC), a stand-in is registered whose
+    core_utils._check_lockfile only warns about an existing lockfile.lock, so cutalumina
+    and cutlens_segments run too. Vision jobs still need test_touch_vision and
+    its camera / UNet dependencies.
+    """
+    sys.modules["automation1"] = sys.modules[__name__]
+    if importlib.util.find_spec("metalens") is None:
+        metalens = types.ModuleType("metalens")
+        metalens.core_utils = types.ModuleType("metalens.core_utils")
+        metalens.core_utils._check_lockfile = _check_lockfile
+        sys.modules["metalens"] = metalens
+        sys.modules["metalens.core_utils"] = metalens.core_utils
+    return sys.modules[__name__]
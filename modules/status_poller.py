@@ -0,0 +1,204 @@
+import time
+import threading
+from collections import namedtuple
+
+try:
+    import automation1 as a1
+except ImportError:  # offline runs pass a stand-in module as api=
+    a1 = None
+
+
+StatusSample = namedtuple("StatusSample", ["seq", "time", "program_position", "axis_status"])
+
+
+class StatusPoller:
+    """
+    One background thread sampling axis status into a ring buffer.
+
+    Every metrology and cutting loop used to build its own StatusItemConfiguration and
+    call get_status_items on each poll. A single poller makes one round trip per period
+    with a configuration built once, and all waiters read from its buffer.
+
+    Parameters
+    ----------
+    controller : object
+        Automation1 controller instance (or a stand-in with runtime.status.get_status_items).
+    axes : list[str]
+        Axes to sample, e.g. ["X", "Y", "ZA"].
+    rate_hz : float
+        Sampling rate. Default 50 Hz.
+    capacity : int
+        Number of samples kept in the ring buffer. Default 512.
+    api : module, optional
+        Module providing StatusItemConfiguration and AxisStatusItem. Defaults to automation1.
+
+    Notes
+    -----
+    The buffer has a single writer (the poll thread). A slot is written before the
+    sequence number is published, so readers never need a lock to get a consistent
+    sample. Use as a context manager, or call start() and stop().
+
+    Example
+    -------
+    with StatusPoller(controller, ["X", "Y", "ZA"]) as poller:
+        sample = poller.wait_until(lambda s: abs(s.program_position["ZA"] - depth) <= 1e-3, timeout=30)
+    """
+
+    def __init__(self, controller, axes, rate_hz=50.0, capacity=512, api=None):
+        self.controller = controller
+        self.axes = list(axes)
+        self.period = 1.0 / float(rate_hz)
+        self.capacity = int(capacity)
+        self.api = api if api is not None else a1
+
+        # precompiled once, reused for every round trip
+        self._cfg = self.api.StatusItemConfiguration()
+        for ax in self.axes:
+            self._cfg.axis.add(self.api.AxisStatusItem.ProgramPosition, ax)
+            self._cfg.axis.add(self.api.AxisStatusItem.AxisStatus, ax)
+
+        self._buffer = [None] * self.capacity
+        self._seq = -1
+        self._error = None
+        self._new_sample = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        """
+        Start the poll thread and block until the first sample is in the buffer.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return self
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="StatusPoller", daemon=True)
+        self._thread.start()
+        self.wait_until(lambda s: True, timeout=max(5.0, 10 * self.period), fresh=False)
+        return self
+
+    def stop(self):
+        """
+        Stop the poll thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(1.0, 10 * self.period))
+            self._thread = None
+
+    def sample_once(self):
+        """
+        Make one controller round trip and return a StatusSample (not stored).
+        """
+        api = self.api
+        res = self.controller.runtime.status.get_status_items(self._cfg)
+        return StatusSample(
+            seq=None,
+            time=time.monotonic(),
+            program_position={ax: res.axis.get(api.AxisStatusItem.ProgramPosition, ax).value for ax in self.axes},
+            axis_status={ax: int(res.axis.get(api.AxisStatusItem.AxisStatus, ax).value) for ax in self.axes},
+        )
+
+    def _run(self):
+        next_t = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                sample = self.sample_once()
+            except Exception as exc:  # surfaced to callers of latest()/wait_until()
+                self._error = exc
+                with self._new_sample:
+                    self._new_sample.notify_all()
+                return
+
+            seq = self._seq + 1
+            self._buffer[seq % self.capacity] = sample._replace(seq=seq)
+            self._seq = seq  # publish after the slot is written
+
+            with self._new_sample:
+                self._new_sample.notify_all()
+
+            next_t += self.period
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_t = time.monotonic()
+
+    def _check(self):
+        if self._error is not None:
+            raise RuntimeError("status poller stopped after a controller error") from self._error
+
+    def latest(self):
+        """
+        Return the most recent StatusSample, or None if nothing has been sampled yet.
+        """
+        self._check()
+        seq = self._seq
+        if seq < 0:
+            return None
+        return self._buffer[seq % self.capacity]
+
+    def history(self, n=None):
+        """
+        Return up to n of the most recent samples (all buffered samples if None), oldest first.
+        """
+        self._check()
+        seq = self._seq
+        count = min(seq + 1, self.capacity) if n is None else min(n, seq + 1, self.capacity)
+        samples = [self._buffer[s % self.capacity] for s in range(seq - count + 1, seq + 1)]
+        return [s for s in samples if s is not None]
+
+    def wait_until(self, predicate, timeout=None, fresh=True):
+        """
+        Block until a sample satisfies predicate and return that sample.
+
+        Parameters
+        ----------
+        predicate : callable
+            Called with a StatusSample, returns bool.
+        timeout : float, optional
+            Seconds to wait before raising TimeoutError. None waits forever.
+        fresh : bool
+            If True (default), only samples taken after this call started count, so a
+            sample from before a move was queued cannot satisfy the wait.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        checked = self._seq if fresh else -1
+
+        while True:
+            self._check()
+            seq = self._seq
+            if seq > checked:
+                # look at every sample we have not checked yet that is still in the buffer
+                for s in range(max(checked + 1, seq - self.capacity + 1), seq + 1):
+                    sample = self._buffer[s % self.capacity]
+                    if sample is not None and sample.seq == s and predicate(sample):
+                        return sample
+                checked = seq
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError(f"status condition not met within {timeout} s")
+
+            with self._new_sample:
+                if self._seq == checked and self._error is None:
+                    self._new_sample.wait(self.period * 4 if remaining is None else min(remaining, self.period * 4))
+
+    def position(self, axis):
+        """
+        Latest ProgramPosition of axis.
+        """
+        return self.latest().program_position[axis]
+
+    def camming(self, axis, mask=1 << 16):
+        """
+        Latest camming bit (AxisStatus bit 16) of axis.
+        """
+        return bool(self.latest().axis_status[axis] & mask)
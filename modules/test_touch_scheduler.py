@@ -0,0 +1,212 @@
+"""
+Adaptive test-touch cadence.
+
+The cut loops stop for a test touch every lines_per_test lines. TestTouchScheduler keeps
+that as the starting interval and stretches it while the depth drift between touches stays
+inside tolerance, and shortens it when the drift grows. Drift comes from the vision-measured
+touch depth (cutlens_segments) or from the wear-shift table (cutalumina).
+
+Touches still go to the test-touch table slots: slot camnum // lines_per_test as before,
+moved on to the next unused slot if that one was already touched, so no slot is used twice.
+The table only has slots for the fixed cadence, so once the job length is known (start())
+the interval never drops below remaining lines / remaining slots. If the drift does not stay
+inside tolerance at that interval, or the slots run out, TestTouchBudgetError stops the job.
+"""
+import math
+from collections import namedtuple
+
+from core_utils import load_test_touch_table
+from z_compensation import depth_from_length, touch_length_mm
+
+
+class TestTouchBudgetError(RuntimeError):
+    """The test-touch slots left cannot cover the rest of the job within tolerance."""
+
+
+TouchRecord = namedtuple("TouchRecord", ["camnum", "test_touch_index", "lines", "interval", "reason"])
+TouchRecord.__doc__ = """
+One scheduled test touch: after line camnum, lines cut since the previous touch, the interval
+in force and why it was due ("interval" or "wear").
+"""
+
+
+class TestTouchScheduler:
+    """
+    Decides after each line whether to test touch, and on which test-touch table slot.
+
+    Parameters
+    ----------
+    lines_per_test : int
+        The fixed cadence used so far; starting interval and the slot mapping.
+    tolerance_mm : float
+        Largest depth drift accepted between two touches.
+    testtouchpath : str or Path, optional
+        Test-touch table; only slots present in it are used. Without it every slot is
+        assumed present.
+    min_lines, max_lines : int
+        Limits on the interval (default 1 and 4 * lines_per_test).
+    grow, shrink : float
+        Interval factors when the drift was under relax * tolerance / over tolerance.
+    relax : float
+        Fraction of the tolerance below which the interval is stretched.
+    wear_shift_table : dict, optional
+        camnum -> wear shift (load_wear_shift_table). A touch is also due as soon as the
+        predicted wear since the last touch reaches the tolerance, and that wear is the
+        drift observed at each touch.
+    blade_diameter_mm : float, optional
+        Needed by update() to turn vision touch lengths into depths.
+
+    Use as cutalumina / cutlens_segments(..., tt_scheduler=scheduler); lines_per_test is
+    then only the slot mapping. The cut loops call start() with the number of lines.
+    """
+
+    def __init__(self, lines_per_test, tolerance_mm, testtouchpath=None, min_lines=1, max_lines=None,
+                 grow=2.0, shrink=0.5, relax=0.5, wear_shift_table=None, blade_diameter_mm=None):
+        self.lines_per_test = int(lines_per_test)
+        self.tolerance_mm = float(tolerance_mm)
+        self.min_lines = max(1, int(min_lines))
+        self.max_lines = int(max_lines) if max_lines is not None else 4 * self.lines_per_test
+        self.grow = grow
+        self.shrink = shrink
+        self.relax = relax
+        self.wear_shift_table = wear_shift_table
+        self.blade_diameter_mm = blade_diameter_mm
+        self.slots = sorted(load_test_touch_table(testtouchpath)) if testtouchpath is not None else None
+
+        self.interval = min(max(self.lines_per_test, self.min_lines), self.max_lines)
+        self.lines_since = 0
+        self.last_camnum = None
+        self.last_slot = -1
+        self.last_depth_mm = None
+        self.touches = []
+        self.n_lines = None
+        self.lines_done = 0
+        self._budget_error = None
+
+    def start(self, n_lines):
+        """
+        Call before the first line with the number of lines in the job; enables the slot budget.
+        """
+        self.n_lines = int(n_lines)
+        self.lines_done = 0
+        return self
+
+    def _slot(self, camnum):
+        slot = max(camnum // self.lines_per_test, self.last_slot + 1)
+        if self.slots is None:
+            return slot
+        for s in self.slots:
+            if s >= slot:
+                return s
+        return None
+
+    def min_interval(self, first_slot=None):
+        """
+        Smallest interval the remaining slots allow: lines not yet covered by a touch over the
+        slots from first_slot on (default: after the last touched one). Without start() or a
+        test-touch table there is no budget and this is min_lines.
+        """
+        if self.n_lines is None or self.slots is None:
+            return self.min_lines
+        first = self.last_slot + 1 if first_slot is None else first_slot
+        slots_left = sum(1 for s in self.slots if s >= first)
+        lines_left = self.n_lines - self.lines_done + self.lines_since
+        if slots_left == 0:
+            # the rest of the job is cut without another touch
+            return max(self.min_lines, lines_left)
+        return max(self.min_lines, math.ceil(lines_left / slots_left))
+
+    def _wear(self, camnum):
+        return self.wear_shift_table.get(int(camnum), 0.0)
+
+    def after_line(self, camnum):
+        """
+        Call after each cut line. Returns the test-touch table index to touch now, or None.
+        Raises TestTouchBudgetError if the remaining slots cannot hold the tolerance.
+        """
+        if self._budget_error is not None:
+            raise TestTouchBudgetError(self._budget_error)
+        camnum = int(camnum)
+        if self.last_camnum is None:
+            # wear since the start of the job counts toward the first touch
+            self.last_camnum = camnum
+        self.lines_since += 1
+        self.lines_done += 1
+        if self.n_lines is not None and self.lines_done >= self.n_lines:
+            # nothing left to cut, a touch would only use up a slot
+            return None
+
+        slot = self._slot(camnum)
+        floor = self.min_interval(slot) if slot is not None else self.min_lines
+        interval = max(self.interval, floor)
+        reason = None
+        if self.lines_since >= interval:
+            reason = "interval"
+        elif (self.wear_shift_table is not None and self.lines_since >= floor
+              and abs(self._wear(camnum) - self._wear(self.last_camnum)) >= self.tolerance_mm):
+            reason = "wear"
+        if reason is None:
+            return None
+
+        if slot is None:
+            raise TestTouchBudgetError(f"no unused test-touch slot after #{self.last_slot} for line {camnum:04d}")
+
+        record = TouchRecord(camnum, slot, self.lines_since, interval, reason)
+        last_camnum = self.last_camnum
+        self.lines_since = 0
+        self.last_camnum = camnum
+        self.last_slot = slot
+        if self.wear_shift_table is not None:
+            self.observe_drift(self._wear(camnum) - self._wear(last_camnum), record.lines)
+            if self._budget_error is not None:
+                raise TestTouchBudgetError(self._budget_error)
+        self.touches.append(record)
+        return slot
+
+    def observe_drift(self, drift_mm, lines=None):
+        """
+        Adapt the interval to a depth drift seen over `lines` lines (default: the lines
+        before the last touch). The drift rate is projected over the current interval.
+        With a slot budget (start() and a test-touch table), if it is over tolerance even at
+        min_interval(), after_line raises TestTouchBudgetError.
+        """
+        if lines is None:
+            lines = self.touches[-1].lines if self.touches else self.interval
+        rate = abs(drift_mm) / max(1, lines)
+        floor = self.min_interval()
+        if self.n_lines is not None and self.slots is not None and rate * floor > self.tolerance_mm:
+            self._budget_error = (f"projected drift {rate * floor:.4f} mm over the {floor} lines the "
+                                  f"remaining test-touch slots allow exceeds tolerance {self.tolerance_mm:.4f} mm")
+        projected = rate * self.interval
+        old = self.interval
+        if projected > self.tolerance_mm:
+            self.interval = max(self.min_lines, int(math.floor(self.interval * self.shrink)))
+        elif projected <= self.relax * self.tolerance_mm:
+            self.interval = min(self.max_lines, int(math.ceil(self.interval * self.grow)))
+        if self.interval != old:
+            print(f"test touch interval {old} -> {self.interval} lines (projected drift {projected:.4f} mm, "
+                  f"tolerance {self.tolerance_mm:.4f} mm)")
+        return self.interval
+
+    def observe_depth(self, depth_mm):
+        """
+        Feed a measured touch depth; the change from the previous one is the drift.
+        """
+        if self.last_depth_mm is not None:
+            self.observe_drift(depth_mm - self.last_depth_mm)
+        self.last_depth_mm = depth_mm
+        return self.interval
+
+    def update(self, touch_info, result):
+        """
+        Feed a vision result (fits vision_config["on_result"]); skipped without a touch length.
+        """
+        length = touch_length_mm(result)
+        if length is None or self.blade_diameter_mm is None:
+            return self.interval
+        try:
+            depth = depth_from_length(length, self.blade_diameter_mm)
+        except ValueError as e:
+            print(f"[warn] test touch #{touch_info.get('test_touch_index')}: {e}")
+            return self.interval
+        return self.observe_depth(depth)
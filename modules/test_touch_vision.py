@@ -1,5 +1,10 @@
 from pathlib import Path
 import logging
+import queue
+import threading
+import time
+
+import numpy as np
 
 from dinolite import DinoLiteSession, build_testtouch_image_name
 from unet_predictor import load_unet_weights, predict_unet_mask
@@ -77,8 +82,258 @@ def move_camera_to_test_touch(cq, camera_testtouchpath, test_touch_index, camera
     }
 
 
+class CameraSession:
+    """
+    Long-lived Dino-Lite session shared by the test touches of a job.
+
+    The device is opened on the first capture and kept open, so device open, exposure
+    settling and teardown are paid once per job instead of once per touch. Before each
+    capture the session is health-checked and reopened if it is not healthy; a capture
+    that raises closes the session, reopens it and tries again up to `retries` times.
+
+    Parameters
+    ----------
+    camera_session_kwargs : dict
+        Passed to session_factory, as vision_config["camera_session_kwargs"].
+    session_factory : callable, optional
+        Makes the session (a context manager with capture_image(path)). Defaults to
+        DinoLiteSession; FakeDinoLiteSession stands in for it without a camera.
+    health_check : callable, optional
+        health_check(session) -> bool. Default: the session's is_open / is_connected
+        attribute or method if it has one, otherwise healthy unless the last capture failed.
+    retries : int
+        Reconnect-and-retry attempts per capture.
+
+    Use as vision_config["camera"]; cutlens_segments closes it at job end, and it reopens
+    by itself if used again. Outside a cut job close it (or use it as a context manager).
+    """
+
+    def __init__(self, camera_session_kwargs=None, session_factory=None, health_check=None, retries=1):
+        self.camera_session_kwargs = dict(camera_session_kwargs or {})
+        self.session_factory = session_factory if session_factory is not None else DinoLiteSession
+        self.health_check = health_check
+        self.retries = retries
+        self.opens = 0
+        self.reconnects = 0
+        self.captures = 0
+        self._session = None
+        self._failed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def is_open(self):
+        return self._session is not None
+
+    def open(self):
+        if self._session is None:
+            session = self.session_factory(**self.camera_session_kwargs)
+            self._session = session.__enter__()
+            self._failed = False
+            self.opens += 1
+        return self._session
+
+    def close(self):
+        session, self._session = self._session, None
+        if session is not None:
+            try:
+                session.__exit__(None, None, None)
+            except Exception as e:
+                print(f"[warn] closing camera session failed: {e!r}")
+
+    def healthy(self):
+        if self._session is None or self._failed:
+            return False
+        if self.health_check is not None:
+            try:
+                return bool(self.health_check(self._session))
+            except Exception:
+                return False
+        for name in ("is_open", "is_connected"):
+            state = getattr(self._session, name, None)
+            if state is not None:
+                return bool(state() if callable(state) else state)
+        return True
+
+    def reconnect(self):
+        self.close()
+        self.reconnects += 1
+        return self.open()
+
+    def capture_image(self, output_path):
+        """
+        capture_image on the shared session, opening or reconnecting it as needed.
+        """
+        if self._session is not None and not self.healthy():
+            self.reconnect()
+
+        attempt = 0
+        while True:
+            session = self.open()
+            try:
+                capture_result = session.capture_image(output_path)
+            except Exception as e:
+                self._failed = True
+                if attempt >= self.retries:
+                    self.close()
+                    raise
+                attempt += 1
+                print(f"[warn] camera capture failed ({e!r}), reconnecting ({attempt}/{self.retries})")
+                self.reconnect()
+                continue
+            self.captures += 1
+            return capture_result
+
+    def capture_frame(self, output_path):
+        """
+        Capture to memory: {"image": frame array, "image_path": output_path, "fovx_mm": ...}.
+
+        Uses the session's capture_frame() if it has one, so nothing is written here (pass
+        the frame to an ImageArchiver to keep it). Otherwise falls back to capture_image,
+        which writes output_path, and the result has no "image".
+        """
+        if self._session is not None and not self.healthy():
+            self.reconnect()
+        if not hasattr(self.open(), "capture_frame"):
+            return self.capture_image(output_path)
+
+        attempt = 0
+        while True:
+            session = self.open()
+            try:
+                frame_result = session.capture_frame()
+            except Exception as e:
+                self._failed = True
+                if attempt >= self.retries:
+                    self.close()
+                    raise
+                attempt += 1
+                print(f"[warn] camera capture failed ({e!r}), reconnecting ({attempt}/{self.retries})")
+                self.reconnect()
+                continue
+            self.captures += 1
+            capture_result = dict(frame_result)
+            capture_result["image_path"] = str(output_path)
+            return capture_result
+
+
+class ImageArchiver:
+    """
+    Writes captured frames to disk on a background thread, in submit order.
+
+    capture_test_touch_image hands the frame to inference in memory and submits it here,
+    so the PNG encode and file write are off the vision cycle. flush() waits for the
+    queue to drain; cutlens_segments calls it at job end and leaves the writer thread
+    running for the next job. close() (or leaving the with block) drains the queue and
+    stops the thread.
+    """
+
+    def __init__(self, max_queued=32):
+        self._queue = queue.Queue(maxsize=max_queued)
+        self.written = 0
+        self.errors = []
+        self._thread = threading.Thread(target=self._run, name="ImageArchiver", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, output_path, image):
+        if self._thread is None:
+            raise RuntimeError("ImageArchiver is closed")
+        self._queue.put((Path(output_path), image))
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        import cv2
+
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                output_path, image = item
+                try:
+                    output_path.parent.mkdir(parents=True, exist_ok=True)
+                    if not cv2.imwrite(str(output_path), image):
+                        raise OSError(f"cv2.imwrite could not write {output_path}")
+                    self.written += 1
+                except Exception as e:
+                    self.errors.append((str(output_path), repr(e)))
+                    print(f"[warn] archiving {output_path} failed: {e!r}")
+            finally:
+                self._queue.task_done()
+
+
+class FakeDinoLiteSession:
+    """
+    DinoLiteSession stand-in for timing and dry runs without a camera.
+
+    Sleeps open_s on enter (device open and exposure settling), capture_s per capture and
+    close_s on exit, and writes a placeholder file at each capture path. With fail_after,
+    captures after the first fail_after raise OSError, as after a USB drop; a new session
+    works again. capture_frame returns a blank frame_shape frame.
+    """
+
+    def __init__(self, open_s=1.0, capture_s=0.05, close_s=0.2, fovx_mm=4.0, fail_after=None,
+                 frame_shape=(1080, 1920, 3), **kwargs):
+        self.open_s = open_s
+        self.frame_shape = frame_shape
+        self.capture_s = capture_s
+        self.close_s = close_s
+        self.fovx_mm = fovx_mm
+        self.fail_after = fail_after
+        self.captures = 0
+        self.is_open = False
+
+    def __enter__(self):
+        time.sleep(self.open_s)
+        self.is_open = True
+        return self
+
+    def __exit__(self, *exc):
+        time.sleep(self.close_s)
+        self.is_open = False
+
+    def capture_image(self, output_path):
+        if not self.is_open:
+            raise OSError("camera session is not open")
+        if self.fail_after is not None and self.captures >= self.fail_after:
+            raise OSError("camera disconnected")
+        time.sleep(self.capture_s)
+        self.captures += 1
+        output_path = Path(output_path)
+        output_path.write_bytes(b"")
+        return {"image_path": str(output_path), "fovx_mm": self.fovx_mm}
+
+    def capture_frame(self):
+        if not self.is_open:
+            raise OSError("camera session is not open")
+        if self.fail_after is not None and self.captures >= self.fail_after:
+            raise OSError("camera disconnected")
+        time.sleep(self.capture_s)
+        self.captures += 1
+        return {"image": np.zeros(self.frame_shape, dtype=np.uint8), "fovx_mm": self.fovx_mm}
+
+
 def capture_test_touch_image(test_touch_index, spindle, cuttype, image_output_dir,
-                             camera_session_kwargs, naming):
+                             camera_session_kwargs, naming, camera=None, archiver=None):
     image_output_dir = Path(image_output_dir)
     image_output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -92,21 +347,388 @@ def capture_test_touch_image(test_touch_index, spindle, cuttype, image_output_di
     )
     output_path = image_output_dir / image_name
 
-    with DinoLiteSession(**camera_session_kwargs) as s:
-        capture_result = s.capture_image(output_path)
+    if camera is not None and archiver is not None:
+        # frame goes to inference in memory; the file is written behind
+        capture_result = camera.capture_frame(output_path)
+        if capture_result.get("image") is not None:
+            archiver.submit(output_path, capture_result["image"])
+    elif camera is not None:
+        capture_result = camera.capture_image(output_path)
+    else:
+        with DinoLiteSession(**camera_session_kwargs) as s:
+            capture_result = s.capture_image(output_path)
 
     return capture_result
 
 
-def run_ml_on_test_touch_image(image_path, fov_mm, models, threshold=0.22, overlay_dir=None):
-    image_path = Path(image_path)
+def _input_channels(model):
+    for module in model.modules():
+        if hasattr(module, "in_channels"):
+            return module.in_channels
+    return 1
 
-    unet_result = predict_unet_mask(
-        image_path=image_path,
-        model=models["unet_model"],
-        device=models["device"],
-        threshold=threshold,
+
+def _frame_to_chw(image, in_channels):
+    # uint8 gray or BGR frame -> float32 (C, H, W) in [0, 1]; has to match what
+    # predict_unet_mask does after reading the file, see check_array_preprocessing
+    x = np.asarray(image).astype(np.float32)
+    if np.asarray(image).dtype == np.uint8:
+        x /= 255.0
+    if x.ndim == 2:
+        x = x[:, :, None]
+    if in_channels == 1 and x.shape[2] != 1:
+        x = x.mean(axis=2, keepdims=True)
+    return np.ascontiguousarray(x.transpose(2, 0, 1))
+
+
+def predict_unet_mask_from_array(image, model, device, threshold):
+    """
+    predict_unet_mask for a frame already in memory (uint8, gray or BGR), skipping the
+    file read. Returns the same raw_image / binary_mask dict.
+    """
+    import torch
+
+    raw_image = np.asarray(image)
+    x = torch.from_numpy(_frame_to_chw(raw_image, _input_channels(model)))[None].to(device)
+
+    model.eval()
+    with torch.inference_mode():
+        prob = torch.sigmoid(model(x))[0, 0].cpu().numpy()
+
+    return {
+        "raw_image": raw_image,
+        "binary_mask": (prob > threshold).astype(np.uint8),
+    }
+
+
+def _predict_via_file(image, model, device, threshold):
+    # predict_unet_mask on a frame saved losslessly to a temporary PNG
+    import tempfile
+    import cv2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp) / "frame.png"
+        if not cv2.imwrite(str(tmp_path), np.asarray(image)):
+            raise OSError(f"could not write {tmp_path}")
+        return predict_unet_mask(image_path=tmp_path, model=model, device=device, threshold=threshold)
+
+
+def check_array_preprocessing(image, model, device, threshold=0.22, max_mismatch=0.0):
+    """
+    Compare predict_unet_mask_from_array with predict_unet_mask on the same frame.
+
+    image is an array or an image path; an array is saved losslessly to a temporary PNG
+    for predict_unet_mask. Returns (ok, mismatch), mismatch being the fraction of mask
+    pixels that differ (1.0 if the mask shapes differ).
+    """
+    if isinstance(image, (str, Path)):
+        file_result = predict_unet_mask(image_path=Path(image), model=model, device=device, threshold=threshold)
+        image = read_test_touch_image(image)
+    else:
+        file_result = _predict_via_file(image, model, device, threshold)
+    array_result = predict_unet_mask_from_array(image, model, device, threshold)
+
+    a = np.asarray(array_result["binary_mask"]).astype(bool)
+    b = np.asarray(file_result["binary_mask"]).astype(bool)
+    mismatch = 1.0 if a.shape != b.shape else float(np.mean(a != b))
+    return mismatch <= max_mismatch, mismatch
+
+
+# per process: id(UNet model) -> the array path matched predict_unet_mask
+_array_path_ok = {}
+
+
+def array_path_verified(image, model, device, threshold=0.22):
+    """
+    Whether in-memory frames can skip predict_unet_mask for this model. Checked once per
+    model and process with check_array_preprocessing on the first frame given.
+    """
+    key = id(model)
+    if key not in _array_path_ok:
+        ok, mismatch = check_array_preprocessing(image, model, device, threshold)
+        if not ok:
+            print(f"[warn] in-memory preprocessing differs from predict_unet_mask ({100.0 * mismatch:.2f} % "
+                  f"of mask pixels), frames go through a temporary file instead")
+        _array_path_ok[key] = ok
+    return _array_path_ok[key]
+
+
+def segment_frame(image, model, device, threshold):
+    """
+    predict_unet_mask for an in-memory frame: predict_unet_mask_from_array once that is
+    verified to give the same mask, otherwise predict_unet_mask on a temporary PNG.
+    """
+    if array_path_verified(image, model, device, threshold):
+        return predict_unet_mask_from_array(image, model, device, threshold)
+    return _predict_via_file(image, model, device, threshold)
+
+
+VISION_STAGES = ("preprocess", "unet", "postprocess", "regression")
+
+
+class VisionRuntime:
+    """
+    UNet and delta regressor loaded once, warmed up and ready for test-touch inference.
+
+    Pass as vision_config["models"] in place of load_vision_models(...);
+    run_ml_on_test_touch_image then runs through it and its result carries per-stage
+    timings. VisionWorker builds one per worker process.
+
+    Parameters
+    ----------
+    unet_model_path, delta_model_path : str or Path
+        Model weights.
+    device : str
+        Torch device.
+    num_threads : int, optional
+        torch.set_num_threads (intra-op threads), e.g. the number of physical cores
+        left free by the motion PC. None keeps torch's default.
+    interop_threads : int, optional
+        torch.set_num_interop_threads; only takes effect before torch runs anything.
+    warmup : int
+        Forward passes on a blank warmup_shape frame at load, so the first real touch
+        does not pay the lazy initialization. Their timings are discarded.
+    threshold : float
+        Default UNet mask threshold.
+    reference_image : str or Path, optional
+        A saved test-touch image to check the batched preprocessing against
+        predict_unet_mask at load (check_array_preprocessing). Without it the first real
+        frame is checked. If they differ, frames are segmented one by one through
+        predict_unet_mask instead of batched.
+
+    Stage timings (ms) of the last call are in last_timings; timing_summary() gives the
+    mean per stage since load.
+    """
+
+    def __init__(self, unet_model_path, delta_model_path, device="cpu", num_threads=None,
+                 interop_threads=None, warmup=2, warmup_shape=(1080, 1920, 3), threshold=0.22,
+                 reference_image=None):
+        import torch
+
+        self._torch = torch
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+        if interop_threads is not None:
+            try:
+                torch.set_num_interop_threads(interop_threads)
+            except RuntimeError as e:
+                print(f"[warn] interop threads not set: {e}")
+
+        self.device = device
+        self.threshold = threshold
+        self.unet_model = load_unet_weights(unet_model_path, device)
+        self.delta_model = load_delta_regressor(delta_model_path, device)
+        for model in (self.unet_model, self.delta_model):
+            if hasattr(model, "eval"):
+                model.eval()
+        self.in_channels = _input_channels(self.unet_model)
+
+        self.last_timings = {}
+        self._stage_ms = {stage: [] for stage in VISION_STAGES}
+
+        # a blank frame says little about preprocessing, so warmup is not checked
+        self._warming = True
+        blank = np.zeros(warmup_shape, dtype=np.uint8)
+        for _ in range(warmup):
+            self.analyze_batch([blank], [1.0], ["warmup"])
+        self._warming = False
+        self.reset_timings()
+        if reference_image is not None:
+            array_path_verified(reference_image, self.unet_model, self.device, self.threshold)
+
+    @property
+    def models(self):
+        # the load_vision_models dict, for code that takes one
+        return {"unet_model": self.unet_model, "delta_model": self.delta_model, "device": self.device}
+
+    def _clock(self):
+        if str(self.device).startswith("cuda"):
+            self._torch.cuda.synchronize()
+        return time.perf_counter()
+
+    def _record(self, stage, seconds):
+        ms = 1000.0 * seconds
+        self.last_timings[stage] = self.last_timings.get(stage, 0.0) + ms
+        self._stage_ms[stage].append(ms)
+
+    def reset_timings(self):
+        self.last_timings = {}
+        self._stage_ms = {stage: [] for stage in VISION_STAGES}
+
+    def timing_summary(self):
+        """
+        Mean ms per call of each stage since load (or reset_timings).
+        """
+        return {stage: (sum(v) / len(v) if v else None) for stage, v in self._stage_ms.items()}
+
+    def read_image(self, image_path):
+        return read_test_touch_image(image_path)
+
+    def segment_batch(self, images, threshold=None):
+        """
+        UNet masks for same-shape frames in one forward pass.
+
+        Returns
+        -------
+        list[dict]
+            raw_image and binary_mask per frame, as predict_unet_mask.
+        """
+        torch = self._torch
+        threshold = self.threshold if threshold is None else threshold
+        raw_images = [np.asarray(image) for image in images]
+        shapes = {image.shape for image in raw_images}
+        if len(shapes) != 1:
+            raise ValueError(f"segment_batch needs frames of one shape, got {sorted(shapes)}")
+
+        if not self._warming and not array_path_verified(raw_images[0], self.unet_model, self.device, threshold):
+            t0 = self._clock()
+            results = [_predict_via_file(image, self.unet_model, self.device, threshold) for image in raw_images]
+            self._record("unet", self._clock() - t0)
+            return results
+
+        t0 = self._clock()
+        x = np.stack([_frame_to_chw(image, self.in_channels) for image in raw_images])
+        x = torch.from_numpy(x).to(self.device)
+        t1 = self._clock()
+        with torch.inference_mode():
+            logits = self.unet_model(x)
+        t2 = self._clock()
+        masks = (torch.sigmoid(logits)[:, 0] > threshold).to(torch.uint8).cpu().numpy()
+        t3 = self._clock()
+
+        self._record("preprocess", t1 - t0)
+        self._record("unet", t2 - t1)
+        self._record("postprocess", t3 - t2)
+
+        return [{"raw_image": raw, "binary_mask": mask} for raw, mask in zip(raw_images, masks)]
+
+    def regress(self, unet_result, fov_mm, image_name):
+        t0 = time.perf_counter()
+        with self._torch.inference_mode():
+            reg_result = predict_all_touches_from_mask(
+                raw_image=unet_result["raw_image"],
+                binary_mask=unet_result["binary_mask"],
+                fov_mm=fov_mm,
+                model=self.delta_model,
+                device=self.device,
+                image_name=image_name,
+            )
+        self._record("regression", time.perf_counter() - t0)
+        return reg_result
+
+    def analyze_batch(self, images, fov_mms, image_names, threshold=None):
+        """
+        Segment several test-touch frames in one UNet pass, then regress each.
+
+        images are arrays or image paths. Returns a list of (unet_result, regressor_result)
+        in input order; last_timings holds the stage totals for the batch.
+        """
+        self.last_timings = {}
+        images = [self.read_image(image) if isinstance(image, (str, Path)) else image for image in images]
+        unet_results = self.segment_batch(images, threshold=threshold)
+        return [
+            (unet_result, self.regress(unet_result, fov_mm, name))
+            for unet_result, fov_mm, name in zip(unet_results, fov_mms, image_names)
+        ]
+
+
+def read_test_touch_image(image_path):
+    import cv2
+
+    image = cv2.imread(str(image_path), cv2.IMREAD_COLOR)
+    if image is None:
+        raise FileNotFoundError(f"could not read {image_path}")
+    return image
+
+
+def expected_touch_offset_mm(camera_move_result, touch_info, spindle_to_camera_mm=None, axis_signs=(1, 1)):
+    """
+    Where the newest touch should appear in the image, in mm from the image center
+    (image x right, image y down).
+
+    The camera sits at the camera test-touch table pose for this touch and the spindle
+    touched at touch_info X, Y. spindle_to_camera_mm is the (X, Y) offset that puts the
+    camera right over a spindle position; None assumes the camera table is aimed at the
+    touch, so the touch is expected at the center. axis_signs maps machine X, Y onto
+    image x, y.
+    """
+    if spindle_to_camera_mm is None:
+        return (0.0, 0.0)
+    dx = touch_info["X"] + spindle_to_camera_mm[0] - camera_move_result["camera_X"]
+    dy = touch_info["Y"] + spindle_to_camera_mm[1] - camera_move_result["camera_Y"]
+    return (axis_signs[0] * dx, axis_signs[1] * dy)
+
+
+def roi_bounds(image_shape, fov_mm, center_mm=(0.0, 0.0), size_mm=(1.5, 1.5), margin_mm=0.5, size_multiple=32):
+    """
+    Pixel crop (y0, y1, x0, x1) of size_mm plus margin_mm on each side around center_mm
+    (mm from the image center), for an image fov_mm wide.
+
+    The crop is grown to a multiple of size_multiple pixels (for the UNet's downsampling)
+    and kept inside the image. None if the center is outside the image or the crop would
+    be the whole frame anyway.
+    """
+    height, width = image_shape[:2]
+    mm_per_px = fov_mm / width
+    cx = width / 2.0 + center_mm[0] / mm_per_px
+    cy = height / 2.0 + center_mm[1] / mm_per_px
+    if not (0 <= cx < width and 0 <= cy < height):
+        return None
+
+    def span(center, size, limit):
+        n = int(np.ceil((size + 2.0 * margin_mm) / mm_per_px))
+        n = min(limit, int(np.ceil(n / size_multiple)) * size_multiple)
+        lo = int(round(center - n / 2.0))
+        lo = min(max(lo, 0), limit - n)
+        return lo, lo + n
+
+    x0, x1 = span(cx, size_mm[0], width)
+    y0, y1 = span(cy, size_mm[1], height)
+    if (x1 - x0) == width and (y1 - y0) == height:
+        return None
+    return (y0, y1, x0, x1)
+
+
+def _roi_for_cycle(vision_config, camera_move_result, touch_info):
+    roi_config = vision_config.get("roi")
+    if not roi_config:
+        return None
+    center_mm = expected_touch_offset_mm(
+        camera_move_result,
+        touch_info,
+        spindle_to_camera_mm=roi_config.get("spindle_to_camera_mm"),
+        axis_signs=roi_config.get("axis_signs", (1, 1)),
     )
+    return {
+        "center_mm": center_mm,
+        "size_mm": roi_config.get("size_mm", (1.5, 1.5)),
+        "margin_mm": roi_config.get("margin_mm", 0.5),
+        "size_multiple": roi_config.get("size_multiple", 32),
+    }
+
+
+def _segment_and_regress(image_path, fov_mm, models, threshold, image):
+    if isinstance(models, VisionRuntime):
+        (unet_result, reg_result), = models.analyze_batch(
+            [image if image is not None else image_path], [fov_mm], [image_path.stem], threshold=threshold
+        )
+        return unet_result, reg_result, dict(models.last_timings)
+
+    if image is not None:
+        # in-memory frame from capture_frame; image_path only names it (may not exist yet)
+        unet_result = segment_frame(
+            image=image,
+            model=models["unet_model"],
+            device=models["device"],
+            threshold=threshold,
+        )
+    else:
+        unet_result = predict_unet_mask(
+            image_path=image_path,
+            model=models["unet_model"],
+            device=models["device"],
+            threshold=threshold,
+        )
 
     reg_result = predict_all_touches_from_mask(
         raw_image=unet_result["raw_image"],
@@ -116,6 +738,38 @@ def run_ml_on_test_touch_image(image_path, fov_mm, models, threshold=0.22, overl
         device=models["device"],
         image_name=image_path.stem,
     )
+    return unet_result, reg_result, None
+
+
+def run_ml_on_test_touch_image(image_path, fov_mm, models, threshold=0.22, overlay_dir=None, image=None,
+                               roi=None):
+    image_path = Path(image_path)
+
+    # roi (roi_bounds keyword arguments): segment a crop around the expected touch first,
+    # full frame only if no touch is found in it
+    roi_used = None
+    timings = None
+    if roi is not None:
+        if image is None:
+            image = models.read_image(image_path) if isinstance(models, VisionRuntime) \
+                else read_test_touch_image(image_path)
+        bounds = roi_bounds(np.shape(image), fov_mm, **roi)
+        if bounds is not None:
+            y0, y1, x0, x1 = bounds
+            crop = np.ascontiguousarray(image[y0:y1, x0:x1])
+            crop_fov_mm = fov_mm * (x1 - x0) / np.shape(image)[1]
+            unet_result, reg_result, timings = _segment_and_regress(image_path, crop_fov_mm, models,
+                                                                    threshold, crop)
+            if len(reg_result["predictions"]) > 0:
+                roi_used = bounds
+            else:
+                print(f"[warn] {image_path.name}: no touch in ROI {bounds}, segmenting the full frame")
+
+    if roi_used is None:
+        roi_timings = timings
+        unet_result, reg_result, timings = _segment_and_regress(image_path, fov_mm, models, threshold, image)
+        if roi_timings is not None and timings is not None:
+            timings = {stage: ms + roi_timings.get(stage, 0.0) for stage, ms in timings.items()}
 
     selected_prediction = None
     overlay_path = None
@@ -152,6 +806,8 @@ def run_ml_on_test_touch_image(image_path, fov_mm, models, threshold=0.22, overl
         "regressor_result": reg_result,
         "selected_prediction": selected_prediction,
         "overlay_path": str(overlay_path) if overlay_path is not None else None,
+        "timings": timings,
+        "roi": roi_used,
     }
 
 
@@ -211,6 +867,8 @@ def perform_test_touch_vision_cycle(cq, path, spindle, cuttype, touch_info, visi
         image_output_dir=vision_config["image_output_dir"],
         camera_session_kwargs=vision_config["camera_session_kwargs"],
         naming=vision_config["naming"],
+        camera=vision_config.get("camera"),
+        archiver=vision_config.get("archiver"),
     )
 
     ml_result = run_ml_on_test_touch_image(
@@ -219,6 +877,8 @@ def perform_test_touch_vision_cycle(cq, path, spindle, cuttype, touch_info, visi
         models=vision_config["models"],
         threshold=vision_config.get("unet_threshold", 0.22),
         overlay_dir=vision_config.get("overlay_dir", None),
+        image=capture_result.get("image"),
+        roi=_roi_for_cycle(vision_config, camera_move_result, touch_info),
     )
 
     append_test_touch_prediction_log(
@@ -233,3 +893,151 @@ def perform_test_touch_vision_cycle(cq, path, spindle, cuttype, touch_info, visi
         "capture_result": capture_result,
         "ml_result": ml_result,
     }
+
+
+# --- background inference -----------------------------------------------------------
+# The camera move and capture have to stay in the motion sequence; the UNet, delta
+# regressor, overlay and log do not. A VisionWorker runs those in a separate process
+# on a warm VisionRuntime, and the cut loop picks the results up between lines.
+
+_worker_models = None
+
+
+def _init_vision_worker(unet_model_path, delta_model_path, device, num_threads=None, reference_image=None):
+    global _worker_models
+    _worker_models = VisionRuntime(unet_model_path, delta_model_path, device, num_threads=num_threads,
+                                   reference_image=reference_image)
+
+
+def _analyze_test_touch_image(image_path, fov_mm, threshold, overlay_dir, path, touch_info, image=None,
+                              roi=None):
+    ml_result = run_ml_on_test_touch_image(
+        image_path=image_path,
+        fov_mm=fov_mm,
+        models=_worker_models,
+        threshold=threshold,
+        overlay_dir=overlay_dir,
+        image=image,
+        roi=roi,
+    )
+
+    append_test_touch_prediction_log(
+        path=path,
+        touch_info=touch_info,
+        ml_result=ml_result,
+    )
+
+    # the mask and raw image stay in the worker; only the prediction comes back
+    return {
+        "image_path": ml_result["image_path"],
+        "fov_mm": ml_result["fov_mm"],
+        "num_predictions": len(ml_result["regressor_result"]["predictions"]),
+        "selected_prediction": ml_result["selected_prediction"],
+        "overlay_path": ml_result["overlay_path"],
+        "timings": ml_result["timings"],
+        "roi": ml_result["roi"],
+    }
+
+
+class VisionWorker:
+    """
+    Process pool that runs test-touch inference, overlay and logging off the cut loop.
+
+    Parameters
+    ----------
+    unet_model_path, delta_model_path : str or Path
+        Model weights, loaded once in each worker process.
+    device : str
+        Torch device for the worker, usually "cpu".
+    max_workers : int
+        Worker processes. Keep 1 so test_touch.log is written in touch order.
+    num_threads : int, optional
+        Torch intra-op threads in each worker (see VisionRuntime).
+    reference_image : str or Path, optional
+        Saved test-touch image each worker checks its preprocessing against (see VisionRuntime).
+
+    Use as vision_config["worker"] in cutlens_segments, or with start_test_touch_vision_cycle.
+    Create it under `if __name__ == "__main__":` on Windows, and shut it down (or use it as
+    a context manager) when done.
+    """
+
+    def __init__(self, unet_model_path, delta_model_path, device="cpu", max_workers=1, num_threads=None,
+                 reference_image=None):
+        from concurrent.futures import ProcessPoolExecutor
+
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_vision_worker,
+            initargs=(str(unet_model_path), str(delta_model_path), device, num_threads,
+                      str(reference_image) if reference_image is not None else None),
+        )
+
+    def submit(self, path, touch_info, capture_result, threshold=0.22, overlay_dir=None, roi=None):
+        """
+        Queue inference for a captured image; returns a concurrent.futures.Future.
+        An in-memory frame (capture_result["image"]) is sent to the worker as is.
+        """
+        return self._pool.submit(
+            _analyze_test_touch_image,
+            str(capture_result["image_path"]),
+            float(capture_result["fovx_mm"]),
+            threshold,
+            str(overlay_dir) if overlay_dir is not None else None,
+            str(path),
+            dict(touch_info),
+            capture_result.get("image"),
+            roi,
+        )
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def start_test_touch_vision_cycle(cq, path, spindle, cuttype, touch_info, vision_config, worker):
+    """
+    Camera move and capture as in perform_test_touch_vision_cycle, then hand the image to
+    worker and return at once. The result dict has a "future" whose result() is the
+    inference summary (selected_prediction, overlay_path, ...).
+    """
+    camera_move_result = move_camera_to_test_touch(
+        cq=cq,
+        camera_testtouchpath=vision_config["camera_testtouchpath"],
+        test_touch_index=touch_info["test_touch_index"],
+        camera_zaxis=vision_config["camera_zaxis"],
+        xy_speed=vision_config.get("camera_xy_speed", 20),
+        z_speed=vision_config.get("camera_z_speed", 10),
+        settle_ms=vision_config.get("camera_settle_ms", 500),
+    )
+
+    capture_result = capture_test_touch_image(
+        test_touch_index=touch_info["test_touch_index"],
+        spindle=spindle,
+        cuttype=cuttype,
+        image_output_dir=vision_config["image_output_dir"],
+        camera_session_kwargs=vision_config["camera_session_kwargs"],
+        naming=vision_config["naming"],
+        camera=vision_config.get("camera"),
+        archiver=vision_config.get("archiver"),
+    )
+
+    future = worker.submit(
+        path=path,
+        touch_info=touch_info,
+        capture_result=capture_result,
+        threshold=vision_config.get("unet_threshold", 0.22),
+        overlay_dir=vision_config.get("overlay_dir", None),
+        roi=_roi_for_cycle(vision_config, camera_move_result, touch_info),
+    )
+
+    return {
+        "touch_info": touch_info,
+        "camera_move_result": camera_move_result,
+        "capture_result": capture_result,
+        "future": future,
+    }
@@ -0,0 +1,273 @@
+"""
+Blade wear fitted from the run logs, and wear-shift tables generated from the fit.
+
+Each vision-measured test touch gives the depth the blade reached at the nominal touch Z
+(z_compensation.depth_from_length). As the blade wears it reaches less deep, so the touch
+depths against the cut length (and cut length x depth) accumulated before each touch give
+the wear rate. cutting.log supplies which lines were cut before each touch, the cam files
+their length along the blade path.
+
+The fitted WearModel evaluates wear for every line of a new job at once and writes the
+camnum -> wear shift table that cutalumina reads with load_wear_shift_table.
+"""
+import ast
+import re
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+import core_utils
+from z_compensation import depth_from_length
+
+
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+_CUT_LINE = re.compile(r"^(\S+ \S+) - (\S+): Finished cutting line #(\d+)")
+_TOUCH_INFO = re.compile(r"^(\S+ \S+) - Performed test touch #(\d+) \| (\{.*\})\s*$")
+_TOUCH_LENGTH = re.compile(r"^(\S+ \S+) - Performed test touch #(\d+) \| pred_length_mm=(\S+)")
+
+WearSamples = namedtuple("WearSamples", ["test_touch_index", "camnum", "cum_length", "cum_removed", "depth_loss"])
+WearSamples.__doc__ = """
+Arrays, one entry per measured test touch: the cut length (mm) and length x depth (mm^2)
+cut before it, and depth_loss = -(measured depth, corrected to the touch table Z), which
+grows with wear up to a per-run constant.
+"""
+
+
+def _time(stamp):
+    return datetime.strptime(stamp, _TIME_FORMAT)
+
+
+def parse_cutting_log(path):
+    """
+    (time, zaxis, camnum) of every "Finished cutting line" entry of a cutting.log, in order.
+    """
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            m = _CUT_LINE.match(line)
+            if m:
+                entries.append((_time(m.group(1)), m.group(2), int(m.group(3))))
+    return entries
+
+
+def parse_test_touch_log(path):
+    """
+    Test touches of a test_touch.log that have a vision length, in order.
+
+    Returns
+    -------
+    list[dict]
+        time, test_touch_index, camnum, Z (None if the touch's info line is missing) and
+        pred_length_mm.
+    """
+    touches = []
+    info = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            m = _TOUCH_INFO.match(line)
+            if m:
+                try:
+                    info[int(m.group(2))] = ast.literal_eval(m.group(3))
+                except (ValueError, SyntaxError):
+                    pass
+                continue
+            m = _TOUCH_LENGTH.match(line)
+            if m and m.group(3) != "None":
+                index = int(m.group(2))
+                touch = info.get(index, {})
+                touches.append({
+                    "time": _time(m.group(1)),
+                    "test_touch_index": index,
+                    "camnum": touch.get("camnum"),
+                    "Z": touch.get("Z"),
+                    "pred_length_mm": float(m.group(3)),
+                })
+    return touches
+
+
+def _line_depths(camnums, cut_depth_mm):
+    if cut_depth_mm is None:
+        return np.ones(len(camnums))
+    if isinstance(cut_depth_mm, dict):
+        return np.array([cut_depth_mm.get(int(c), 0.0) for c in camnums], dtype=float)
+    return np.full(len(camnums), float(cut_depth_mm))
+
+
+def line_features(cam_dir, cuttype="", cut_depth_mm=None):
+    """
+    Per-line blade path length and removal of a job, in Master.txt order.
+
+    The length is the arc length of the cam (Y, Z) path between ystart and yend.
+    cut_depth_mm (scalar, or dict camnum -> depth) weights it into length x depth; None
+    uses 1, so removal equals length.
+
+    Returns
+    -------
+    camnums, lengths, removed : np.ndarray
+    """
+    cam_dir = Path(cam_dir)
+    master_path = cam_dir / "Master.txt"
+    index = core_utils.MasterIndex(master_path, base_path=cam_dir, cuttype=cuttype)
+
+    camnums = np.array([row.camnum for row in index], dtype=int)
+    lengths = np.zeros(len(camnums))
+    for k, row in enumerate(index):
+        leader, follower = core_utils.load_cutcam_arrays(row.cam_path)
+        leader = np.asarray(leader)
+        follower = np.asarray(follower)
+        y0, y1 = sorted((row.ystart, row.yend))
+        inside = (leader >= y0) & (leader <= y1)
+        if inside.sum() < 2:
+            lengths[k] = y1 - y0
+            continue
+        lengths[k] = np.hypot(np.diff(leader[inside]), np.diff(follower[inside])).sum()
+
+    return camnums, lengths, lengths * _line_depths(camnums, cut_depth_mm)
+
+
+def collect_wear_samples(cam_dir, log_dir, blade_diameter_mm, cuttype="", cut_depth_mm=None, testtouchpath=None):
+    """
+    Wear samples of one run (one blade): cutting.log and test_touch.log in log_dir, the
+    Master.txt and cam files in cam_dir.
+
+    testtouchpath, if given, corrects each touch depth for a touch Z off the table Z (a
+    zshift); without it the touches are taken to be at the table Z.
+
+    Returns
+    -------
+    WearSamples
+    """
+    log_dir = Path(log_dir)
+    cuts = parse_cutting_log(log_dir / "cutting.log")
+    touches = parse_test_touch_log(log_dir / "test_touch.log")
+    tt_table = core_utils.load_test_touch_table(testtouchpath) if testtouchpath is not None else {}
+
+    camnums, lengths, removed = line_features(cam_dir, cuttype=cuttype, cut_depth_mm=cut_depth_mm)
+    row_of = {int(c): k for k, c in enumerate(camnums)}
+    missing = sorted({c for _, _, c in cuts if c not in row_of})
+    if missing:
+        print(f"[warn] {len(missing)} camnum(s) in cutting.log not in {cam_dir}, counted as 0 length: {missing[:5]}")
+
+    # cumulative cut before each log entry, vectorized over the log
+    rows = np.array([row_of.get(c, -1) for _, _, c in cuts], dtype=int)
+    cut_length = np.where(rows >= 0, lengths[rows], 0.0)
+    cut_removed = np.where(rows >= 0, removed[rows], 0.0)
+    cum_length = np.concatenate([[0.0], np.cumsum(cut_length)])
+    cum_removed = np.concatenate([[0.0], np.cumsum(cut_removed)])
+    cut_times = [t for t, _, _ in cuts]
+
+    out = {k: [] for k in WearSamples._fields}
+    for touch in touches:
+        try:
+            depth = depth_from_length(touch["pred_length_mm"], blade_diameter_mm)
+        except ValueError as e:
+            print(f"[warn] test touch #{touch['test_touch_index']}: {e}, skipped")
+            continue
+        # touched deeper than the table Z -> that much extra depth is not wear
+        z_table = tt_table.get(touch["test_touch_index"], (None, None, None))[2]
+        if z_table is not None and touch["Z"] is not None:
+            depth += touch["Z"] - z_table
+
+        n = int(np.searchsorted(cut_times, touch["time"], side="right")) if cut_times else 0
+        out["test_touch_index"].append(touch["test_touch_index"])
+        out["camnum"].append(touch["camnum"] if touch["camnum"] is not None else -1)
+        out["cum_length"].append(cum_length[n])
+        out["cum_removed"].append(cum_removed[n])
+        out["depth_loss"].append(-depth)
+
+    return WearSamples(*(np.asarray(out[k], dtype=float if k not in ("test_touch_index", "camnum") else int)
+                         for k in WearSamples._fields))
+
+
+class WearModel:
+    """
+    Blade wear (mm) = coef_length * cut length + coef_removed * cut length x depth.
+
+    Build with fit_wear_model. rms is the fit residual, n the number of touches used.
+    """
+
+    def __init__(self, coef_length, coef_removed=0.0, rms=None, n=0):
+        self.coef_length = float(coef_length)
+        self.coef_removed = float(coef_removed)
+        self.rms = rms
+        self.n = n
+
+    def __repr__(self):
+        rms = f"{self.rms:.2e}" if self.rms is not None else "None"
+        return (f"WearModel(coef_length={self.coef_length:.3e}, coef_removed={self.coef_removed:.3e}, "
+                f"rms={rms}, n={self.n})")
+
+    def wear(self, cum_length, cum_removed=None):
+        """
+        Wear after cum_length (and cum_removed); arrays evaluate elementwise.
+        """
+        cum_length = np.asarray(cum_length, dtype=float)
+        cum_removed = cum_length if cum_removed is None else np.asarray(cum_removed, dtype=float)
+        return self.coef_length * cum_length + self.coef_removed * cum_removed
+
+    def shift_table(self, cam_dir, cuttype="", cut_depth_mm=None, start_length=0.0, start_removed=0.0):
+        """
+        camnum -> wear shift for every line of a job, cut in Master.txt order.
+
+        Each line gets the wear accumulated before it, negated (a worn blade has to go
+        deeper). start_length / start_removed are what the blade has already cut.
+        """
+        camnums, lengths, removed = line_features(cam_dir, cuttype=cuttype, cut_depth_mm=cut_depth_mm)
+        before_length = start_length + np.concatenate([[0.0], np.cumsum(lengths)[:-1]])
+        before_removed = start_removed + np.concatenate([[0.0], np.cumsum(removed)[:-1]])
+        shifts = -self.wear(before_length, before_removed)
+        return dict(zip(camnums.tolist(), shifts.tolist()))
+
+
+def fit_wear_model(samples, use_removed=None):
+    """
+    Least-squares wear rates from one or more WearSamples.
+
+    Each sample set (run) gets its own constant, since the depth at zero wear differs
+    between runs; the rates are shared. use_removed None fits the length x depth term only
+    when it is not proportional to the length (i.e. the cut depths vary).
+
+    Returns
+    -------
+    WearModel
+    """
+    if isinstance(samples, WearSamples):
+        samples = [samples]
+    samples = [s for s in samples if len(s.depth_loss)]
+    if not samples:
+        raise ValueError("no test touch samples to fit")
+
+    length = np.concatenate([s.cum_length for s in samples])
+    removed = np.concatenate([s.cum_removed for s in samples])
+    y = np.concatenate([s.depth_loss for s in samples])
+    run = np.concatenate([np.full(len(s.depth_loss), k) for k, s in enumerate(samples)])
+
+    if use_removed is None:
+        use_removed = np.linalg.matrix_rank(np.column_stack([length, removed])) > 1
+
+    columns = [length] + ([removed] if use_removed else [])
+    constants = (run[:, None] == np.arange(len(samples))[None, :]).astype(float)
+    design = np.column_stack(columns + [constants])
+    if len(y) <= design.shape[1]:
+        print(f"[warn] {len(y)} touches for {design.shape[1]} parameters, wear fit is underdetermined")
+
+    coef, *_ = np.linalg.lstsq(design, y, rcond=None)
+    rms = float(np.sqrt(np.mean((design @ coef - y) ** 2)))
+    if coef[0] < 0:
+        print(f"[warn] fitted wear rate is negative ({coef[0]:.3e} mm/mm), check the logs and blade diameter")
+
+    return WearModel(coef[0], coef[1] if use_removed else 0.0, rms=rms, n=len(y))
+
+
+def write_wear_shift_table(path, table):
+    """
+    Write camnum -> wear shift in the format load_wear_shift_table reads.
+    """
+    path = Path(path)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# camnum wearshift\n")
+        for camnum in sorted(table):
+            f.write(f"{camnum} {table[camnum]:.6f}\n")
+    return path
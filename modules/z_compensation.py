@@ -0,0 +1,151 @@
+"""
+Closed-loop Z correction from the vision-measured test-touch length.
+
+A test touch leaves a mark whose length along the cut is the chord of the blade at the
+touch depth, so the vision cycle's pred_length_mm gives the depth the blade actually
+reached. The touches are made at the nominal test-touch Z (the static zshift only), so the
+difference to the expected depth is the current Z error of the setup (blade, spindle growth,
+part drift). ZCompensator filters it and turns it into a Z offset for the following lines.
+"""
+import math
+import time
+from collections import namedtuple
+
+
+ZUpdate = namedtuple("ZUpdate", [
+    "test_touch_index", "length_mm", "depth_mm", "filtered_depth_mm", "offset_mm", "accepted", "time",
+])
+ZUpdate.__doc__ = """
+One compensation step. accepted is False when the measurement was skipped (no touch found,
+outside the blade, or an outlier); offset_mm is the offset in force afterwards.
+"""
+
+
+def touch_length_mm(result):
+    """
+    pred_length_mm of the selected touch in a vision result, or None. Takes the cycle
+    dict of perform_test_touch_vision_cycle or the VisionWorker inference summary.
+    """
+    if result is None:
+        return None
+    if "ml_result" in result:
+        result = result["ml_result"]
+    pred = result.get("selected_prediction")
+    if pred is None or pred.get("pred_length_mm") is None:
+        return None
+    return float(pred["pred_length_mm"])
+
+
+def depth_from_length(length_mm, blade_diameter_mm):
+    """
+    Depth (mm) of a blade touch whose mark is length_mm long: the sagitta of a chord of
+    that length on the blade circle.
+    """
+    r = 0.5 * blade_diameter_mm
+    half = 0.5 * length_mm
+    if half > r:
+        raise ValueError(f"mark length {length_mm} mm is longer than the blade diameter {blade_diameter_mm} mm")
+    return r - math.sqrt(r * r - half * half)
+
+
+def length_from_depth(depth_mm, blade_diameter_mm):
+    """
+    Mark length (mm) of a touch depth_mm deep, the inverse of depth_from_length.
+    """
+    r = 0.5 * blade_diameter_mm
+    return 2.0 * math.sqrt(max(0.0, 2.0 * r * depth_mm - depth_mm * depth_mm))
+
+
+class ZCompensator:
+    """
+    Z offset for the cut lines, updated from each test touch's vision result.
+
+    Parameters
+    ----------
+    blade_diameter_mm : float
+        Blade outer diameter, for the length -> depth conversion.
+    target_depth_mm : float
+        Depth the test touch should reach at the nominal test-touch Z.
+    alpha : float
+        Exponential filter weight of a new depth measurement (1 = no filtering).
+    gain : float
+        Fraction of the filtered depth error applied as offset.
+    max_step_mm : float, optional
+        Largest change of the offset per test touch.
+    offset_limits : (float, float)
+        Clamp on the offset, mm (negative = deeper).
+    outlier_mm : float, optional
+        Measurements further than this from the filtered depth are skipped.
+    initial_offset_mm : float
+        Offset before the first touch, e.g. from the previous run.
+
+    Use as cutlens_segments(..., z_compensator=comp): the offset in force is added to each
+    line's zstart (the camming tables are RelativePosition, so the whole line shifts), and
+    each vision result updates it for the lines after it. update also fits
+    vision_config["on_result"] to drive it from elsewhere.
+    """
+
+    def __init__(self, blade_diameter_mm, target_depth_mm, alpha=0.5, gain=1.0, max_step_mm=0.005,
+                 offset_limits=(-0.02, 0.02), outlier_mm=None, initial_offset_mm=0.0):
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError(f"alpha must be in (0, 1], got {alpha}")
+        self.blade_diameter_mm = float(blade_diameter_mm)
+        self.target_depth_mm = float(target_depth_mm)
+        self.alpha = float(alpha)
+        self.gain = float(gain)
+        self.max_step_mm = max_step_mm
+        self.offset_limits = offset_limits
+        self.outlier_mm = outlier_mm
+        self.filtered_depth_mm = None
+        self.offset_mm = self._clamp(float(initial_offset_mm))
+        self.history = []
+
+    def _clamp(self, offset):
+        lo, hi = self.offset_limits
+        return min(max(offset, lo), hi)
+
+    def _record(self, touch_info, length, depth, accepted):
+        update = ZUpdate(touch_info.get("test_touch_index"), length, depth, self.filtered_depth_mm,
+                         self.offset_mm, accepted, time.time())
+        self.history.append(update)
+        return update
+
+    def update(self, touch_info, result):
+        """
+        Fold one test touch's vision result into the offset.
+
+        Returns
+        -------
+        ZUpdate
+        """
+        length = touch_length_mm(result)
+        if length is None:
+            print(f"[warn] test touch #{touch_info.get('test_touch_index')}: no touch length, Z offset held "
+                  f"at {self.offset_mm:+.4f} mm")
+            return self._record(touch_info, None, None, False)
+
+        try:
+            depth = depth_from_length(length, self.blade_diameter_mm)
+        except ValueError as e:
+            print(f"[warn] test touch #{touch_info.get('test_touch_index')}: {e}, Z offset held")
+            return self._record(touch_info, length, None, False)
+
+        if (self.outlier_mm is not None and self.filtered_depth_mm is not None
+                and abs(depth - self.filtered_depth_mm) > self.outlier_mm):
+            print(f"[warn] test touch #{touch_info.get('test_touch_index')}: depth {depth:.4f} mm is an "
+                  f"outlier (filtered {self.filtered_depth_mm:.4f} mm), Z offset held")
+            return self._record(touch_info, length, depth, False)
+
+        if self.filtered_depth_mm is None:
+            self.filtered_depth_mm = depth
+        else:
+            self.filtered_depth_mm += self.alpha * (depth - self.filtered_depth_mm)
+
+        # too shallow -> go deeper (more negative Z)
+        wanted = -self.gain * (self.target_depth_mm - self.filtered_depth_mm)
+        step = wanted - self.offset_mm
+        if self.max_step_mm is not None:
+            step = min(max(step, -self.max_step_mm), self.max_step_mm)
+        self.offset_mm = self._clamp(self.offset_mm + step)
+
+        return self._record(touch_info, length, depth, True)